@@ -2,9 +2,20 @@
 CV Analysis Tool - Flask Application Entry Point
 """
 
+import os
+
 from app import create_app
 
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    debug = True
+    # Started here rather than at import time: extraction pool processes are
+    # spawned and re-import this module, and must not run workers themselves.
+    # In debug mode the reloader runs this block in a watcher process and again
+    # in the serving child (WERKZEUG_RUN_MAIN=true); only the child runs a worker,
+    # so two embedded workers never compete for the same leases.
+    if app.config['EMBEDDED_WORKER'] and (not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        from app.worker import start_embedded_worker
+        start_embedded_worker(app)
+    app.run(debug=debug)
@@ -7,8 +7,7 @@ import os
 from flask import Flask, session
 from markupsafe import Markup
 from datetime import datetime, timedelta
-import markdown
-from flask_session import Session
+import click
 
 def create_app(test_config=None):
     """Create and configure the Flask application."""
@@ -37,11 +36,13 @@ def create_app(test_config=None):
     app.config['SESSION_PERMANENT'] = True
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=2)
     
-    # Ensure session directory exists
-    os.makedirs(app.config['SESSION_FILE_DIR'], exist_ok=True)
+    # Ensure session directory exists (only used with SESSION_BACKEND=filesystem)
+    if app.config['SESSION_BACKEND'] != 'sqlite':
+        os.makedirs(app.config['SESSION_FILE_DIR'], exist_ok=True)
     
-    # Initialize Flask-Session
-    Session(app)
+    # Initialize the session backend (SQLite by default, see app/session_store.py)
+    from app.session_store import init_session
+    init_session(app)
     
     # Configure file upload settings
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB max file size
@@ -50,15 +51,30 @@ def create_app(test_config=None):
     # Create upload folder if it doesn't exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
-    # Initialize database
+    # The schema is created lazily by the first database connection in each
+    # process (see app.db.get_db); `flask init-db` creates it ahead of time
     from app.db import init_db, close_db
-    with app.app_context():
-        init_db()
     
     @app.teardown_appcontext
     def teardown_db(exception):
         close_db(exception)
     
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create or upgrade the database schema."""
+        init_db()
+        click.echo('Initialized the database.')
+    
+    @app.cli.command('backfill-search')
+    def backfill_search_command():
+        """Add results stored before the search index existed to it."""
+        from app.db import backfill_search_index
+        click.echo(f'Indexed {backfill_search_index()} CVs.')
+    
+    # Record request latencies for /metrics (see app/metrics.py)
+    from app.metrics import init_metrics
+    init_metrics(app)
+    
     # Register blueprints
     from app.blueprints import register_blueprints
     register_blueprints(app)
@@ -72,11 +88,13 @@ def create_app(test_config=None):
         return {'now': datetime.now()}
     
     # Add custom filter for markdown rendering
+    from app.utils.rendering import render_markdown
+    
     @app.template_filter('markdown')
-    def render_markdown(text):
+    def markdown_filter(text):
         if not text:
             return ""
-        # Convert markdown to HTML and mark as safe
-        return Markup(markdown.markdown(text, extensions=['tables', 'fenced_code']))
+        # Convert markdown to HTML (cached by content hash) and mark as safe
+        return Markup(render_markdown(text))
     
     return app
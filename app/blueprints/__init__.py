@@ -10,6 +10,9 @@ from app.blueprints.interview import bp as interview_bp
 from app.blueprints.summary import bp as summary_bp
 from app.blueprints.feedback import bp as feedback_bp
 from app.blueprints.job_criteria import bp as job_criteria_bp
+from app.blueprints.api import bp as api_bp
+from app.blueprints.metrics import bp as metrics_bp
+from app.blueprints.search import bp as search_bp
 
 def register_blueprints(app):
     """Register all blueprints with the app."""
@@ -19,4 +22,7 @@ def register_blueprints(app):
     app.register_blueprint(interview_bp, url_prefix='/interview')
     app.register_blueprint(summary_bp, url_prefix='/summary')
     app.register_blueprint(feedback_bp, url_prefix='/feedback')
-    app.register_blueprint(job_criteria_bp, url_prefix='/job-criteria')
\ No newline at end of file
+    app.register_blueprint(job_criteria_bp, url_prefix='/job-criteria')
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(search_bp, url_prefix='/search')
\ No newline at end of file
@@ -5,33 +5,135 @@ Analysis routes for the CV Analysis Tool Flask application.
 
 import os
 import uuid
+import json
 import time
-import threading
 import logging
-import pandas as pd
-import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask import (
     Blueprint, flash, redirect, render_template, request, 
-    url_for, current_app, session, jsonify, send_file
+    url_for, current_app, session, jsonify, Response, stream_with_context
 )
 from werkzeug.utils import secure_filename
 
 from app.services.api_client import APIClient
-from app.services.text_extraction import extract_text_from_file
+from app.services.agent_response import parse_agent_response
+from app.services.dedupe import (
+    band_hashes, compute_signature, exclude_batch_duplicates, find_batch_duplicates, signature_from_bytes,
+    signature_to_bytes, similarity
+)
+from app.services.scoring import (
+    SCORE_FIELDS, SORT_KEYS, CandidateScores, extract_scores, load_candidate_scores, rank_candidates
+)
+from app.services.text_extraction import (
+    ExtractionError, extract_text_from_bytes, extract_text_from_file, submit_extraction, wait_for_extraction
+)
 from app.services.openai_client import summarize_cv_analyses
-from app.blueprints.utils import allowed_file, store_analysis_results, get_results
-from app.db import create_job, update_job, get_job, clean_old_jobs
+from app.services.export import EXPORTERS, EXPORT_FORMATS, parse_export_columns
+from app.blueprints.utils import (
+    allowed_file, get_cv_entries, get_batch, iter_cv_results, sse_event, sse_response
+)
+from app.job_events import get_job_version, wait_for_job_update, forget_job
+from app.metrics import inc, observe, timed, flush as flush_metrics
+from app.utils.helpers import get_job_criteria_version
+from app.db import (
+    create_job, update_job, get_job, clean_old_jobs, resume_job, start_batch, store_cv_result, store_batch_fields,
+    get_finished_cv_results, make_analysis_cache_key, get_cached_analysis, store_cached_analysis,
+    get_batch as db_get_batch, get_cv_result, store_cv_signature, find_signature_candidates
+)
 
 bp = Blueprint('analysis', __name__)
 
+# Most candidates returned per ranking page
+RANKING_MAX_PAGE_SIZE = 200
+
 @bp.route('/')
 def index():
-    """Display analysis results for all CVs."""
-    results_data = get_results()
-    if not results_data or 'results' not in results_data:
+    """Display analysis results for all CVs.
+    
+    Pass job_id to show the results of that job, including the CVs finished
+    so far while it is still running or after it failed. Stored batches
+    whose job was cleaned up can be opened the same way (e.g. from the
+    cross-batch ranking).
+    """
+    job_id = request.args.get('job_id')
+    if job_id and (get_job(job_id) is not None or db_get_batch(job_id) is not None):
+        session['results_id'] = job_id
+    
+    cv_entries = get_cv_entries()
+    batch = get_batch()
+    if not cv_entries and not batch:
         flash('No CV analysis results available', 'warning')
         return redirect(url_for('home.index'))
-    return render_template('analysis.html', results=results_data['results'])
+    
+    # Jobs are cleaned up after a while; their results are complete by then
+    job = get_job(session.get('results_id'))
+    return render_template(
+        'analysis.html',
+        cv_entries=cv_entries,
+        cv_count=batch['cv_count'] if batch else len(cv_entries),
+        job=job if job and job['status'] != 'completed' else None,
+        sort_keys=SORT_KEYS,
+        score_fields=SCORE_FIELDS
+    )
+
+@bp.route('/ranking')
+def ranking():
+    """Rank and filter analyzed CVs by their structured scores.
+    
+    Query parameters:
+        scope: batch (default; the current results) or all (every stored batch)
+        sort: overall (default), skills_match, experience_years or criteria_coverage
+        min_<score>: lowest accepted value of a score, for any sort key
+        page: 1-based page number (default: 1)
+        per_page: page size, at most RANKING_MAX_PAGE_SIZE (default: 50)
+    
+    Scores are stored when each CV is analyzed, so ranking never calls an
+    LLM. Returns JSON when requested via the Accept header, otherwise the
+    ranking table for htmx to swap in.
+    """
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    scope = request.args.get('scope', 'batch')
+    sort = request.args.get('sort', 'overall')
+    try:
+        if scope not in ('batch', 'all'):
+            raise ValueError(f"Unknown scope: {scope}")
+        minimums = {
+            key: float(request.args[f'min_{key}'])
+            for key in SORT_KEYS if request.args.get(f'min_{key}', '').strip()
+        }
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 50)), 1), RANKING_MAX_PAGE_SIZE)
+        if scope == 'all':
+            table = load_candidate_scores()
+        else:
+            table = load_candidate_scores(session['results_id']) if session.get('results_id') else CandidateScores([])
+        total, candidates = rank_candidates(table, sort, minimums, (page - 1) * per_page, per_page)
+    except ValueError as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        return render_template('components/ranking.html', error=str(e))
+    
+    if wants_json:
+        return jsonify({
+            'scope': scope,
+            'sort': sort,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'candidates': candidates,
+        })
+    
+    query = request.args.to_dict()
+    return render_template(
+        'components/ranking.html',
+        candidates=candidates,
+        total=total,
+        first=(page - 1) * per_page + 1,
+        score_fields=SCORE_FIELDS,
+        current_results_id=session.get('results_id'),
+        prev_url=url_for('analysis.ranking', **dict(query, page=page - 1)) if page > 1 else None,
+        next_url=url_for('analysis.ranking', **dict(query, page=page + 1)) if page * per_page < total else None
+    )
 
 @bp.route('/upload-cv', methods=['POST'])
 def upload_cv():
@@ -48,40 +150,47 @@ def upload_cv():
     # Create a job ID
     job_id = str(uuid.uuid4())
     
-    # Save files temporarily
-    saved_files = []
-    for file in files:
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            saved_files.append((filename, filepath))
+    # Extract text straight from the uploaded streams; nothing is written to disk
+    cvs = extract_uploaded_cvs(files)
     
-    # Initialize job status in the database
+    # Enqueue the job; a worker (python -m app.worker) claims and processes it
     job_data = {
-        'status': 'processing',
+        'status': 'queued',
         'progress': 0,
-        'message': 'Starting analysis...',
+        'message': 'Waiting for an analysis worker...',
         'results_id': None,
-        'started_at': time.time()
+        'started_at': time.time(),
+        'payload': {
+            'cvs': cvs,
+            'options': {'bypass_cache': request.form.get('bypass_cache') == 'true'}
+        },
+        'max_attempts': current_app.config['JOB_MAX_ATTEMPTS']
     }
     create_job(job_id, job_data)
     
-    # Start processing in a background thread
-    app = current_app._get_current_object()
-    thread = threading.Thread(
-        target=process_files_with_progress,
-        args=(app, job_id, saved_files)
-    )
-    thread.daemon = True
-    thread.start()
-    
     # Return job ID for progress tracking via AJAX
     return jsonify({
         'job_id': job_id,
-        'status': 'processing'
+        'status': 'queued'
     }), 202
 
+@bp.route('/resume', methods=['POST'])
+def resume():
+    """Requeue a failed analysis job, keeping the CVs it already analyzed."""
+    job_id = request.args.get('job_id') or request.form.get('job_id')
+    resumed = bool(job_id) and resume_job(job_id)
+    
+    if request.accept_mimetypes.best == 'application/json':
+        if not resumed:
+            return jsonify({'status': 'not_resumable', 'message': 'Only failed jobs can be resumed'}), 409
+        return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+    
+    if resumed:
+        flash('Resuming analysis; CVs already analyzed are kept', 'info')
+    else:
+        flash('Only failed jobs can be resumed', 'error')
+    return redirect(url_for('analysis.index', job_id=job_id) if job_id else url_for('home.index'))
+
 @bp.route('/check-progress')
 def check_progress():
     """Check the progress of an analysis job."""
@@ -101,29 +210,284 @@ def check_progress():
         'message': job['message']
     })
 
+@bp.route('/progress-stream')
+def progress_stream():
+    """Push job progress to the browser as server-sent events.
+    
+    Wakes on in-process notifications from update_job, so updates from an
+    embedded worker arrive immediately. Jobs run by a separate worker process
+    are re-read every PROGRESS_STREAM_POLL_INTERVAL seconds on a single
+    connection. The stream ends when the job finishes; the browser then calls
+    /check-progress once to pick up the results ID. Otherwise it ends after
+    PROGRESS_STREAM_MAX_SECONDS and EventSource reconnects by itself.
+    """
+    job_id = request.args.get('job_id')
+    poll_interval = current_app.config['PROGRESS_STREAM_POLL_INTERVAL']
+    max_seconds = current_app.config['PROGRESS_STREAM_MAX_SECONDS']
+    
+    def generate():
+        deadline = time.time() + max_seconds
+        version = get_job_version(job_id)
+        last_state = None
+        # Reconnect quickly when the stream is closed at the deadline
+        yield "retry: 1000\n\n"
+        while time.time() < deadline:
+            job = get_job(job_id)
+            if not job:
+                yield sse_event('progress', json.dumps({'status': 'not_found', 'message': 'Job not found'}))
+                return
+            
+            state = {'status': job['status'], 'progress': job['progress'], 'message': job['message']}
+            if state != last_state:
+                yield sse_event('progress', json.dumps(state))
+                last_state = state
+            if job['status'] in ('completed', 'failed'):
+                forget_job(job_id)
+                return
+            
+            new_version = wait_for_job_update(job_id, version, timeout=poll_interval)
+            if new_version == version:
+                # Comment line keeps proxies from timing out an idle stream
+                yield ": keep-alive\n\n"
+            version = new_version
+    
+    return sse_response(generate())
+
 @bp.route('/export')
 def export_results():
-    """Export analysis results as CSV."""
-    results_data = get_results()
-    if not results_data or 'results' not in results_data:
+    """Export analysis results as CSV, JSONL or XLSX.
+    
+    Query parameters:
+        format: csv (default), jsonl or xlsx
+        columns: column names to include, repeated or comma-separated; see
+            app.services.export.EXPORT_COLUMNS, plus agent:<name> for one
+            agent's extracted content
+    
+    Rows are streamed from the database as they are encoded, so memory use
+    does not grow with the batch size and nothing is written to disk.
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        flash(f'Unsupported export format: {export_format}', 'error')
+        return redirect(url_for('analysis.index'))
+    
+    try:
+        columns = parse_export_columns(request.args.getlist('columns'))
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('analysis.index'))
+    
+    # get_batch also migrates results stored by older releases
+    batch = get_batch()
+    if not batch or not batch['cv_count']:
         flash('No results available to export', 'error')
         return redirect(url_for('analysis.index'))
     
-    df = pd.DataFrame(results_data['results'])
-    csv_data = df.to_csv(index=False)
-    temp = tempfile.NamedTemporaryFile(delete=False)
-    temp.write(csv_data.encode('utf-8'))
-    temp.close()
-    
-    return send_file(
-        temp.name,
-        as_attachment=True,
-        download_name="cv_analysis_results.csv",
-        mimetype="text/csv"
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    return Response(
+        stream_with_context(EXPORTERS[export_format](columns, iter_cv_results())),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=cv_analysis_results.{extension}'}
+    )
+
+def extract_uploaded_cvs(files):
+    """Extract the text of uploaded CV files, in parallel on the extraction pool.
+    
+    Returns one {'name': ..., 'text': ...} dict per accepted file, in upload
+    order, ready to be stored as the job payload.
+    """
+    return extract_cv_documents([
+        (file.filename, file.read()) for file in files
+        if file and allowed_file(file.filename)
+    ])
+
+def extract_cv_documents(documents):
+    """Extract the text of (filename, bytes) pairs, in parallel on the extraction pool.
+    
+    Returns one {'name': ..., 'text': ...} dict per document, in order. A
+    document that could not be read gets {'name': ..., 'error': ...} instead;
+    it is recorded as a failed CV without being sent for analysis.
+    """
+    config = current_app.config
+    with timed('cv_analysis_stage_duration_seconds', stage='extract'):
+        pending = []
+        for filename, data in documents:
+            filename = secure_filename(filename)
+            future = submit_extraction(
+                config['TEXT_EXTRACTION_PROCESSES'], extract_text_from_bytes,
+                data, filename,
+                config['TEXT_EXTRACTION_MAX_PAGES'], config['TEXT_EXTRACTION_MAX_CHARS']
+            )
+            pending.append((filename, future))
+        
+        cvs = []
+        for filename, future in pending:
+            try:
+                cvs.append({'name': filename, 'text': wait_for_extraction(future, config['TEXT_EXTRACTION_TIMEOUT'])})
+            except ExtractionError as e:
+                cvs.append({'name': filename, 'error': str(e)})
+        return cvs
+
+def get_cv_text(app, cv):
+    """Return the text of a queued CV.
+    
+    Jobs queued before uploads were extracted in the request still carry a
+    file path instead of text. Raises ExtractionError for a CV whose text
+    could not be extracted.
+    """
+    if 'error' in cv:
+        raise ExtractionError(cv['error'])
+    if 'text' in cv:
+        return cv['text']
+    return wait_for_extraction(
+        submit_extraction(
+            app.config['TEXT_EXTRACTION_PROCESSES'], extract_text_from_file,
+            cv['path'], app.config['TEXT_EXTRACTION_MAX_PAGES'], app.config['TEXT_EXTRACTION_MAX_CHARS']
+        ),
+        app.config['TEXT_EXTRACTION_TIMEOUT']
     )
 
-def process_files_with_progress(app, job_id, saved_files):
-    """Process files with progress tracking within app context."""
+def analyze_single_cv(app, index, cv, criteria_version='', use_cache=True):
+    """Send one CV to the FastAgent API.
+
+    Runs on a worker thread, so it pushes its own app context. Errors are
+    captured in the returned result instead of being raised, so one bad CV
+    never aborts the rest of the batch. Identical CV text analyzed against
+    the same revision and job criteria is served from the analysis cache.
+    
+    Returns (result, succeeded); failed CVs are retried when the job resumes.
+    """
+    logger = logging.getLogger(__name__)
+    filename = cv['name']
+    with app.app_context():
+        try:
+            cv_text = get_cv_text(app, cv)
+            
+            use_cache = use_cache and app.config['ANALYSIS_CACHE_ENABLED']
+            cache_key = make_analysis_cache_key(cv_text, app.config['DEFAULT_REVISION_ID'], criteria_version)
+            with timed('cv_analysis_stage_duration_seconds', stage='cache_lookup'):
+                response = get_cached_analysis(cache_key, app.config['ANALYSIS_CACHE_TTL']) if use_cache else None
+            cached = response is not None
+            
+            if response is None:
+                identifier = f"cv_{index+1}"
+                with timed('cv_analysis_stage_duration_seconds', stage='fastagent'):
+                    response = APIClient.create_chat(cv_text, identifier=identifier)
+                # Only successful analyses are worth caching
+                if "error" not in response and "agent_response" in response:
+                    store_cached_analysis(
+                        cache_key, response,
+                        app.config['ANALYSIS_CACHE_TTL'],
+                        app.config['ANALYSIS_CACHE_MAX_ENTRIES']
+                    )
+            
+            succeeded = "error" not in response and "agent_response" in response
+            inc('cv_analysis_cvs_total', outcome='cached' if cached else 'ok' if succeeded else 'error')
+            agent_contents = (parse_agent_response(response["agent_response"]) or {}) if succeeded else {}
+            return {
+                "CV Name": filename,
+                "Analysis": response.get("agent_response", "Analysis failed"),
+                "Thread ID": response.get("thread_id", ""),
+                "Message ID": response.get("message_id", ""),
+                # Decoded once here; prompts and exports read these instead of the raw JSON
+                "Agent Contents": agent_contents,
+                "Scores": extract_scores(agent_contents)
+            }, succeeded
+        except Exception as e:
+            logger.error(f'Error processing {filename}: {str(e)}')
+            inc('cv_analysis_cvs_total', outcome='error')
+            return {
+                "CV Name": filename,
+                "Analysis": f"Error: {str(e)}",
+                "Thread ID": "",
+                "Message ID": "",
+                "Agent Contents": {},
+                "Scores": extract_scores({})
+            }, False
+
+def find_duplicate_cvs(app, job_id, cvs, analysis_key, use_history=True):
+    """Find near-duplicate CVs of a batch before any of them is analyzed.
+    
+    Each CV is compared with the earlier CVs of the batch and, with
+    use_history, with the CVs analyzed under the same revision and job
+    criteria (analysis_key) in the last DEDUPE_HISTORY_SECONDS.
+    
+    Returns (signatures, duplicates): the MinHash signature of every CV with
+    enough text to compare (see compute_signature), by position, and for each near-duplicate a (batch ID, position,
+    similarity) triple naming the CV whose analysis it reuses.
+    """
+    config = app.config
+    if not config['DEDUPE_ENABLED']:
+        return {}, {}
+    
+    signatures = {}
+    for i, cv in enumerate(cvs):
+        # Unreadable CVs carry an error, and jobs queued by older releases a
+        # file path, instead of text; neither is compared
+        signature = compute_signature(cv['text']) if 'text' in cv and 'error' not in cv else None
+        if signature is not None:
+            signatures[i] = signature
+    
+    threshold = config['DEDUPE_THRESHOLD']
+    duplicates = {
+        i: (job_id, original, score)
+        for i, (original, score) in find_batch_duplicates(sorted(signatures.items()), threshold).items()
+    }
+    if use_history and config['DEDUPE_HISTORY_SECONDS'] > 0:
+        since = time.time() - config['DEDUPE_HISTORY_SECONDS']
+        for i, signature in signatures.items():
+            if i in duplicates:
+                continue
+            best = None
+            for batch_id, position, data in find_signature_candidates(band_hashes(signature), analysis_key, since, job_id):
+                score = similarity(signature, signature_from_bytes(data))
+                if score >= threshold and (best is None or score > best[2]):
+                    best = (batch_id, position, score)
+            if best is not None:
+                duplicates[i] = best
+    return signatures, duplicates
+
+def duplicate_result(filename, original, duplicate, succeeded):
+    """Build the result of a near-duplicate CV from the result of its original."""
+    batch_id, position, score = duplicate
+    duplicate_of = {
+        "batch_id": batch_id,
+        "position": position,
+        "cv_name": original["CV Name"],
+        "similarity": round(score, 3)
+    }
+    if not succeeded:
+        return {
+            "CV Name": filename,
+            "Analysis": f"Error: not analyzed as a near-duplicate of {original['CV Name']}, whose analysis failed",
+            "Thread ID": "",
+            "Message ID": "",
+            "Agent Contents": {},
+            "Scores": extract_scores({}),
+            "Duplicate Of": duplicate_of
+        }
+    return dict(original, **{"CV Name": filename, "Duplicate Of": duplicate_of})
+
+def process_files_with_progress(app, job_id, cvs, options=None):
+    """Process CVs with progress tracking within app context.
+    
+    cvs is the job payload: one {'name': ..., 'text': ...} dict per CV.
+    
+    CVs are analyzed concurrently on a bounded thread pool (see
+    ANALYSIS_MAX_WORKERS). Results keep the upload order regardless of the
+    order in which the CVs finish. Pass options={'bypass_cache': True} to
+    force fresh analyses.
+    
+    Each result is stored as soon as it is available. When a job is run
+    again (after a worker crash or an explicit resume), CVs of the batch that
+    were already analyzed successfully are skipped. Errors are raised to
+    the worker, which requeues the job until JOB_MAX_ATTEMPTS is reached.
+    
+    Near-duplicate CVs (see find_duplicate_cvs) are not sent to the FastAgent
+    API; they get a copy of their original's analysis, flagged with
+    "Duplicate Of".
+    """
+    options = options or {}
     logger = logging.getLogger(__name__)
     with app.app_context():
         try:
@@ -133,58 +497,103 @@ def process_files_with_progress(app, job_id, saved_files):
                 logger.error(f"Job {job_id} not found in DB")
                 return
             
-            total_files = len(saved_files)
-            results = []
-            for i, (filename, filepath) in enumerate(saved_files):
-                try:
-                    progress_percent = i / total_files
-                    update_job(job_id, {
-                        'progress': 0.1 + (progress_percent * 0.8),
-                        'message': f'Analyzing {filename} ({i+1} of {total_files})...'
-                    })
-                    
-                    cv_text = extract_text_from_file(filepath)
-                    identifier = f"cv_{len(results)+1}"
-                    response = APIClient.create_chat(cv_text, identifier=identifier)
-                    
-                    results.append({
-                        "CV Name": filename,
-                        "Analysis": response.get("agent_response", "Analysis failed"),
-                        "Thread ID": response.get("thread_id", ""),
-                        "Message ID": response.get("message_id", "")
-                    })
-                except Exception as e:
-                    logger.error(f'Error processing {filename}: {str(e)}')
-                    results.append({
-                        "CV Name": filename,
-                        "Analysis": f"Error: {str(e)}",
-                        "Thread ID": "",
-                        "Message ID": ""
-                    })
-                finally:
-                    try:
-                        os.remove(filepath)
-                    except:
-                        pass
+            batch_started = time.perf_counter()
+            total_files = len(cvs)
+            results = [None] * total_files
+            criteria_version = get_job_criteria_version()
+            use_cache = not options.get('bypass_cache')
+            
+            # Keep what an earlier, interrupted run of this job already analyzed
+            finished = {i: result for i, result in get_finished_cv_results(job_id).items() if i < total_files}
+            for i, result in finished.items():
+                results[i] = result
+            pending = [i for i in range(total_files) if i not in finished]
+            
+            # Near-duplicates reuse the analysis of the CV they duplicate instead of being analyzed again
+            analysis_key = f"{app.config['DEFAULT_REVISION_ID']}:{criteria_version}"
+            with timed('cv_analysis_stage_duration_seconds', stage='dedupe'):
+                signatures, duplicates = find_duplicate_cvs(app, job_id, cvs, analysis_key, use_history=use_cache)
+            duplicates = {i: duplicate for i, duplicate in duplicates.items() if i not in finished}
+            to_analyze = [i for i in pending if i not in duplicates]
+            max_workers = max(1, min(app.config['ANALYSIS_MAX_WORKERS'], len(to_analyze) or 1))
+            
+            update_job(job_id, {
+                'progress': 0.1 + (len(finished) / total_files * 0.8 if total_files else 0),
+                'message': (
+                    f'Resuming: {len(finished)} of {total_files} CVs already analyzed...' if finished
+                    else f'Analyzing {total_files} CVs...'
+                )
+            })
+            # The batch exists from the start so results can be read as each CV finishes
+            start_batch(job_id, total_files)
+            
+            completed = len(finished)
+            
+            def store(i, succeeded):
+                nonlocal completed
+                with timed('cv_analysis_stage_duration_seconds', stage='store'):
+                    store_cv_result(
+                        job_id, i, results[i], status='ok' if succeeded else 'error', cv_text=cvs[i].get('text')
+                    )
+                    if succeeded and i in signatures and i not in duplicates and app.config['DEDUPE_HISTORY_SECONDS'] > 0:
+                        store_cv_signature(
+                            job_id, i, signature_to_bytes(signatures[i]), band_hashes(signatures[i]),
+                            analysis_key, app.config['DEDUPE_HISTORY_SECONDS']
+                        )
+                completed += 1
+                update_job(job_id, {
+                    'progress': 0.1 + (completed / total_files * 0.8),
+                    'message': f'Analyzed {results[i]["CV Name"]} ({completed} of {total_files})...'
+                }, coalesce=True)
+            
+            def store_duplicate(i, original, succeeded):
+                results[i] = duplicate_result(cvs[i]['name'], original, duplicates[i], succeeded)
+                inc('cv_analysis_cvs_total', outcome='duplicate' if succeeded else 'error')
+                store(i, succeeded)
+            
+            # Duplicates of CVs analyzed earlier are done right away; the others wait for their original
+            waiting = {}
+            for i, (batch_id, position, _) in sorted(duplicates.items()):
+                if batch_id != job_id:
+                    original = get_cv_result(batch_id, position)
+                    if original is None:
+                        # Removed since it was matched; analyze this CV after all
+                        del duplicates[i]
+                        to_analyze.append(i)
+                    else:
+                        store_duplicate(i, original, True)
+                elif results[position] is not None:
+                    store_duplicate(i, results[position], True)
+                else:
+                    waiting.setdefault(position, []).append(i)
+            
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cv-analysis') as executor:
+                futures = {
+                    executor.submit(analyze_single_cv, app, i, cvs[i], criteria_version, use_cache): i
+                    for i in to_analyze
+                }
+                
+                # Progress is driven by completions, which may arrive in any order
+                for future in as_completed(futures):
+                    i = futures[future]
+                    results[i], succeeded = future.result()
+                    store(i, succeeded)
+                    for duplicate in waiting.pop(i, []):
+                        store_duplicate(duplicate, results[i], succeeded)
             
             update_job(job_id, {'progress': 0.9, 'message': 'Generating summary...'})
             
             summary = None
             if results and app.config['AZURE_OPENAI_KEY'] and app.config['AZURE_OPENAI_ENDPOINT']:
                 try:
-                    summary = summarize_cv_analyses(results)
+                    with timed('cv_analysis_stage_duration_seconds', stage='summary'):
+                        summary = summarize_cv_analyses(exclude_batch_duplicates(results, job_id))
                 except Exception as e:
                     logger.error(f'Error generating summary: {str(e)}')
                     summary = f"Error generating summary: {str(e)}"
             
-            results_data = {
-                'results': results,
-                'thread_ids': [r.get("Thread ID", "") for r in results],
-                'summary': summary,
-                'created_at': time.time()
-            }
-            
-            store_analysis_results(job_id, results_data)
+            # CV rows are already stored; only the batch summary is left
+            store_batch_fields(job_id, {'summary': summary})
             
             update_job(job_id, {
                 'status': 'completed',
@@ -193,19 +602,20 @@ def process_files_with_progress(app, job_id, saved_files):
                 'results_id': job_id,
                 'completed_at': time.time()
             })
+            observe('cv_analysis_stage_duration_seconds', time.perf_counter() - batch_started, stage='batch')
             
         except Exception as e:
+            # The worker decides between a retry and failing the job for good
             logger.error(f'Error in process_files_with_progress: {str(e)}')
-            job = get_job(job_id)
-            if job:
-                update_job(job_id, {
-                    'status': 'failed',
-                    'message': str(e)
-                })
+            raise
         finally:
-            for _, filepath in saved_files:
+            for cv in cvs:
                 try:
-                    if os.path.exists(filepath):
-                        os.remove(filepath)
+                    if 'path' in cv and os.path.exists(cv['path']):
+                        os.remove(cv['path'])
                 except:
                     pass
+            try:
+                flush_metrics()
+            except Exception as e:
+                logger.error(f'Error flushing metrics: {str(e)}')
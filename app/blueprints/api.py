@@ -0,0 +1,279 @@
+"""
+Batch analysis API for programmatic bulk submission (e.g. from an ATS).
+
+    POST /api/v1/batches                      submit CVs, returns a job ID
+    GET  /api/v1/batches/<job_id>             job status and progress
+    GET  /api/v1/batches/<job_id>/results     results, paged in completion order
+    POST /api/v1/batches/<job_id>/resume      requeue a failed batch
+    GET  /api/v1/rate-limits                  current upstream rate limits
+
+Batches are queued exactly like uploads from the web UI and processed by the
+analysis workers. Results become available one CV at a time, as each
+analysis finishes, and a failed batch can be resumed without re-analyzing
+the CVs it already finished. Send an ``Idempotency-Key`` header to make
+submissions safe to retry: a repeated key returns the original batch instead
+of queueing (and paying for) the same CVs again, for
+IDEMPOTENCY_KEY_RETENTION_SECONDS (24 hours by default).
+
+If API_TOKEN is configured, every request must send
+``Authorization: Bearer <token>``.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import time
+import sqlite3
+import uuid
+from flask import Blueprint, current_app, jsonify, request, url_for
+
+from app.blueprints.analysis import extract_cv_documents
+from app.blueprints.utils import allowed_file
+from app.services.openai_client import extract_agent_contents
+from app.services.rate_limiter import get_rate_limit_snapshot
+from app.db import (
+    create_job, get_job, get_job_by_idempotency_key, resume_job, start_batch, get_batch, count_cv_results, get_cv_results_page
+)
+
+bp = Blueprint('api', __name__)
+
+# Largest results page a client may ask for
+MAX_PAGE_SIZE = 100
+
+class APIError(Exception):
+    """An error reported to the client as a JSON body with the given status."""
+    
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+@bp.errorhandler(APIError)
+def handle_api_error(e):
+    return jsonify({'error': e.message}), e.status
+
+@bp.before_request
+def require_token():
+    """Check the bearer token when API_TOKEN is set."""
+    token = current_app.config['API_TOKEN']
+    if not token:
+        return None
+    auth = request.headers.get('Authorization', '')
+    if not auth.startswith('Bearer ') or not hmac.compare_digest(auth[len('Bearer '):], token):
+        return jsonify({'error': 'Invalid or missing API token'}), 401
+    return None
+
+def read_submission():
+    """Read the submitted CVs from a JSON or multipart request.
+    
+    JSON bodies look like::
+    
+        {"cvs": [{"name": "jane.pdf", "content_base64": "..."},
+                 {"name": "john.txt", "text": "pre-extracted text"}],
+         "bypass_cache": false}
+    
+    Multipart requests send files under ``cv_files`` (and may add a
+    ``bypass_cache`` field).
+    
+    Returns (documents, texts, bypass_cache, request_hash): documents are
+    (filename, bytes) pairs still to be extracted and texts are ready
+    {'name', 'text'} dicts, each tagged with its position in the submission.
+    """
+    digest = hashlib.sha256()
+    documents = []
+    texts = []
+    
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get('cvs'), list):
+            raise APIError("Expected a JSON object with a 'cvs' list")
+        bypass_cache = bool(body.get('bypass_cache'))
+        items = body['cvs']
+        for position, item in enumerate(items):
+            name = item.get('name') if isinstance(item, dict) else None
+            if not name:
+                raise APIError(f"cvs[{position}] needs a 'name'")
+            if isinstance(item.get('text'), str):
+                if not item['text'].strip():
+                    raise APIError(f"cvs[{position}].text is empty")
+                text = item['text'][:current_app.config['TEXT_EXTRACTION_MAX_CHARS']]
+                texts.append((position, {'name': name, 'text': text}))
+                digest.update(f"{name}\0text\0".encode('utf-8') + item['text'].encode('utf-8'))
+            elif isinstance(item.get('content_base64'), str):
+                if not allowed_file(name):
+                    raise APIError(f"cvs[{position}] has an unsupported file type: {name}")
+                try:
+                    data = base64.b64decode(item['content_base64'], validate=True)
+                except (binascii.Error, ValueError):
+                    raise APIError(f"cvs[{position}].content_base64 is not valid base64")
+                documents.append((position, (name, data)))
+                digest.update(f"{name}\0file\0".encode('utf-8') + data)
+            else:
+                raise APIError(f"cvs[{position}] needs 'text' or 'content_base64'")
+    else:
+        bypass_cache = request.form.get('bypass_cache') in ('true', '1')
+        items = [file for file in request.files.getlist('cv_files') if file and file.filename]
+        for position, file in enumerate(items):
+            if not allowed_file(file.filename):
+                raise APIError(f"Unsupported file type: {file.filename}")
+            data = file.read()
+            documents.append((position, (file.filename, data)))
+            digest.update(f"{file.filename}\0file\0".encode('utf-8') + data)
+    
+    if not items:
+        raise APIError("No CVs submitted")
+    if len(items) > current_app.config['API_MAX_BATCH_SIZE']:
+        raise APIError(f"At most {current_app.config['API_MAX_BATCH_SIZE']} CVs per batch", 413)
+    
+    digest.update(b"\0bypass_cache" if bypass_cache else b"")
+    return documents, texts, bypass_cache, digest.hexdigest()
+
+def batch_status(job_id):
+    """Build the status body of a batch, or None if it is unknown."""
+    job = get_job(job_id)
+    batch = get_batch(job_id)
+    if job is None and batch is None:
+        return None
+    
+    if job is not None:
+        status, progress, message = job['status'], job['progress'], job['message']
+    else:
+        # Finished jobs are eventually cleaned up; their results remain
+        status, progress, message = 'completed', 1.0, 'Analysis complete'
+    
+    return {
+        'job_id': job_id,
+        'status': status,
+        'progress': progress,
+        'message': message,
+        'cv_count': batch['cv_count'] if batch else None,
+        'completed_count': count_cv_results(job_id) if batch else 0,
+        'summary': batch['summary'] if batch else None,
+        'links': {
+            'self': url_for('api.get_batch_status', job_id=job_id),
+            'results': url_for('api.get_batch_results', job_id=job_id),
+        },
+    }
+
+@bp.route('/batches', methods=['POST'])
+def create_batch():
+    """Queue a batch of CVs for analysis."""
+    idempotency_key = request.headers.get('Idempotency-Key') or None
+    if idempotency_key and len(idempotency_key) > 255:
+        raise APIError("Idempotency-Key must be at most 255 characters")
+    
+    documents, texts, bypass_cache, request_hash = read_submission()
+    
+    if idempotency_key:
+        existing = get_job_by_idempotency_key(idempotency_key)
+        if existing is not None:
+            return replay(existing, request_hash)
+    
+    # Extract files in parallel, then restore submission order
+    extracted = extract_cv_documents([document for _, document in documents])
+    ordered = texts + [(position, cv) for (position, _), cv in zip(documents, extracted)]
+    cvs = [cv for _, cv in sorted(ordered, key=lambda item: item[0])]
+    
+    job_id = str(uuid.uuid4())
+    try:
+        create_job(job_id, {
+            'status': 'queued',
+            'progress': 0,
+            'message': 'Waiting for an analysis worker...',
+            'results_id': None,
+            'started_at': time.time(),
+            'payload': {'cvs': cvs, 'options': {'bypass_cache': bypass_cache}},
+            'max_attempts': current_app.config['JOB_MAX_ATTEMPTS'],
+            'idempotency_key': idempotency_key,
+            'request_hash': request_hash,
+        })
+    except sqlite3.IntegrityError:
+        # A concurrent request with the same key won the race
+        existing = get_job_by_idempotency_key(idempotency_key) if idempotency_key else None
+        if existing is None:
+            raise
+        return replay(existing, request_hash)
+    
+    # Create the batch now so its size is known while the job is still queued
+    start_batch(job_id, len(cvs))
+    
+    return jsonify(batch_status(job_id)), 202
+
+def replay(job, request_hash):
+    """Answer a retried submission with the job it originally created."""
+    if job['request_hash'] != request_hash:
+        raise APIError("Idempotency-Key was already used with a different request", 422)
+    response = jsonify(batch_status(job['job_id']))
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response, 200
+
+@bp.route('/batches/<job_id>')
+def get_batch_status(job_id):
+    """Return the status and progress of a batch."""
+    status = batch_status(job_id)
+    if status is None:
+        raise APIError("Batch not found", 404)
+    return jsonify(status)
+
+@bp.route('/batches/<job_id>/resume', methods=['POST'])
+def resume_batch(job_id):
+    """Requeue a failed batch; CVs that were analyzed successfully are kept."""
+    if batch_status(job_id) is None:
+        raise APIError("Batch not found", 404)
+    if not resume_job(job_id):
+        raise APIError("Only failed batches can be resumed", 409)
+    return jsonify(batch_status(job_id)), 202
+
+@bp.route('/batches/<job_id>/results')
+def get_batch_results(job_id):
+    """Return CV results in the order they finished.
+    
+    Query parameters:
+        cursor: the next_cursor of the previous page (default: start)
+        limit: page size, at most 100 (default: 50)
+    
+    Poll with the last next_cursor until the batch status is completed and
+    has_more is false. A CV that is retried after a worker failure or a
+    resume may be delivered again under a new seq; use its position to
+    de-duplicate. Results with status 'error' are retried on resume.
+    """
+    status = batch_status(job_id)
+    if status is None:
+        raise APIError("Batch not found", 404)
+    
+    try:
+        cursor = int(request.args.get('cursor', 0))
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise APIError("cursor and limit must be integers")
+    
+    page = get_cv_results_page(job_id, cursor, limit + 1)
+    has_more = len(page) > limit
+    page = page[:limit]
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': status['status'],
+        'results': [
+            {
+                'position': result['position'],
+                'seq': result['seq'],
+                'status': result['status'],
+                'cv_name': result['CV Name'],
+                'analysis': result['Analysis'],
+                'agents': extract_agent_contents(result),
+                'scores': result.get('Scores'),
+                'thread_id': result['Thread ID'],
+                'message_id': result['Message ID'],
+            }
+            for result in page
+        ],
+        'next_cursor': page[-1]['seq'] if page else cursor,
+        'has_more': has_more,
+    })
+
+@bp.route('/rate-limits')
+def get_rate_limits():
+    """Return the configured and current adaptive limits of each upstream."""
+    return jsonify(get_rate_limit_snapshot())
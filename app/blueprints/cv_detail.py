@@ -7,18 +7,17 @@ from flask import (
     url_for
 )
 
-from app.blueprints.utils import get_results
+from app.blueprints.utils import get_cv_result
 
 bp = Blueprint('cv_detail', __name__)
 
 @bp.route('/<int:index>')
 def view(index):
     """View individual CV analysis."""
-    results_data = get_results()
+    result = get_cv_result(index)
     
-    if not results_data or 'results' not in results_data or index >= len(results_data['results']):
+    if result is None:
         flash('CV analysis not found', 'error')
         return redirect(url_for('analysis.index'))
     
-    result = results_data['results'][index]
     return render_template('cv_detail.html', result=result, index=index)
\ No newline at end of file
@@ -2,48 +2,74 @@
 Interview questions routes for the CV Analysis Tool Flask application.
 """
 
-import tempfile
+from io import BytesIO
 from flask import (
     Blueprint, flash, redirect, render_template, request, 
-    url_for, session, send_file
+    url_for, send_file
 )
+from markupsafe import escape
 
-from app.services.openai_client import generate_interview_questions
-from app.blueprints.utils import get_results
+from app.services.openai_client import (
+    generate_interview_questions, stream_interview_questions, INTERVIEW_QUESTIONS_PROMPT_VERSION,
+    INTERVIEW_QUESTIONS_FAILED
+)
+from app.blueprints.utils import (
+    get_batch, get_cv_names, get_cv_result_by_name, get_interview_questions, store_interview_questions,
+    sse_event, sse_response
+)
 
 bp = Blueprint('interview', __name__)
 
+def get_stored_questions(cv_name):
+    """Return previously generated questions for a CV, if any.
+    
+    Questions live in the interview_questions table, keyed by results ID, CV
+    name and prompt version, so every recruiter on a batch shares them and
+    they outlive the session. Questions that older releases kept with the
+    batch are moved into the table the first time they are read.
+    """
+    questions = get_interview_questions(cv_name, INTERVIEW_QUESTIONS_PROMPT_VERSION)
+    if questions is None:
+        questions = ((get_batch() or {}).get('interview_questions') or {}).get(cv_name)
+        if questions:
+            store_questions(cv_name, questions)
+    return questions
+
+def store_questions(cv_name, questions):
+    """Save generated questions for every session on the current results."""
+    store_interview_questions(cv_name, INTERVIEW_QUESTIONS_PROMPT_VERSION, questions)
+
 @bp.route('/')
 def index():
     """Display interview questions generator."""
-    results_data = get_results()
+    cv_options = get_cv_names()
     
-    if not results_data or 'results' not in results_data:
+    if not cv_options:
         flash('No CV analysis results available', 'warning')
         return redirect(url_for('home.index'))
     
-    # Initialize interview questions in session if not exists
-    if 'interview_questions' not in session:
-        session['interview_questions'] = {}
-    
-    cv_options = [result["CV Name"] for result in results_data['results']]
     selected_cv = request.args.get('cv')
     
     # If no CV selected, use the first one
     if not selected_cv and cv_options:
         selected_cv = cv_options[0]
     
+    questions = get_stored_questions(selected_cv)
+    regenerate = request.args.get('regenerate') == '1'
+    
+    # ?stream=1 renders a panel that streams questions from /interview/stream,
+    # unless stored questions can be shown (pass regenerate=1 to replace them)
     return render_template('interview.html', 
                           cv_options=cv_options, 
                           selected_cv=selected_cv,
-                          questions=session.get('interview_questions', {}).get(selected_cv, None))
+                          questions=questions,
+                          regenerate=regenerate,
+                          stream=request.args.get('stream') == '1' and (regenerate or not questions))
 
 @bp.route('/generate', methods=['POST'])
 def generate_questions():
     """Generate interview questions for a selected CV."""
-    results_data = get_results()
-    
-    if not results_data or 'results' not in results_data:
+    if not get_batch():
         flash('No results available', 'error')
         return redirect(url_for('interview.index'))
     
@@ -53,24 +79,23 @@ def generate_questions():
         return redirect(url_for('interview.index'))
     
     # Find the CV in results
-    cv_index = None
-    for i, result in enumerate(results_data['results']):
-        if result['CV Name'] == selected_cv:
-            cv_index = i
-            break
+    analysis = get_cv_result_by_name(selected_cv)
     
-    if cv_index is None:
+    if analysis is None:
         flash('Selected CV not found', 'error')
         return redirect(url_for('interview.index'))
     
+    # Stored questions are served unless the user explicitly asks to regenerate
+    if request.form.get('regenerate') != '1' and get_stored_questions(selected_cv):
+        return redirect(url_for('interview.index', cv=selected_cv))
+    
     try:
-        questions = generate_interview_questions(results_data['results'][cv_index])
-        
-        # Store in session
-        if 'interview_questions' not in session:
-            session['interview_questions'] = {}
-        
-        session['interview_questions'][selected_cv] = questions
+        questions = generate_interview_questions(analysis)
+        # Stored questions are shared by everyone on the batch, so failures never are
+        if not questions or not questions.strip() or questions == INTERVIEW_QUESTIONS_FAILED:
+            flash('Error generating questions: the AI service did not return any questions', 'error')
+            return redirect(url_for('interview.index', cv=selected_cv))
+        store_questions(selected_cv, questions)
         
         # Redirect back to interview page with the selected CV
         return redirect(url_for('interview.index', cv=selected_cv))
@@ -78,23 +103,71 @@ def generate_questions():
         flash(f'Error generating questions: {str(e)}', 'error')
         return redirect(url_for('interview.index'))
 
+@bp.route('/stream')
+def stream():
+    """Generate interview questions for a CV, streaming them as server-sent events.
+    
+    Emits 'delta' events with escaped text as tokens arrive and a final
+    'complete' event with the rendered questions once they are stored.
+    Stored questions are sent as a single 'complete' event unless
+    ?regenerate=1 is given.
+    """
+    selected_cv = request.args.get('cv')
+    analysis = get_cv_result_by_name(selected_cv) if selected_cv else None
+    stored = None
+    if analysis is not None and request.args.get('regenerate') != '1':
+        stored = get_stored_questions(selected_cv)
+    
+    def generate():
+        if analysis is None:
+            yield sse_event('complete', render_template(
+                'components/interview_questions.html', error='Selected CV not found'
+            ))
+            return
+        
+        if stored:
+            yield sse_event('complete', render_template(
+                'components/interview_questions.html', questions=stored, selected_cv=selected_cv
+            ))
+            return
+        
+        chunks = []
+        try:
+            for delta in stream_interview_questions(analysis):
+                chunks.append(delta)
+                yield sse_event('delta', escape(delta))
+            
+            questions = "".join(chunks)
+            if not questions.strip():
+                yield sse_event('complete', render_template(
+                    'components/interview_questions.html',
+                    error='Error generating questions: the AI service did not return any questions'
+                ))
+                return
+            store_questions(selected_cv, questions)
+            
+            yield sse_event('complete', render_template(
+                'components/interview_questions.html', questions=questions, selected_cv=selected_cv
+            ))
+        except Exception as e:
+            yield sse_event('complete', render_template(
+                'components/interview_questions.html', error=f'Error generating questions: {str(e)}'
+            ))
+    
+    return sse_response(generate())
+
 @bp.route('/download/<cv_name>')
 def download_questions(cv_name):
     """Download interview questions as a text file."""
-    if 'interview_questions' not in session or cv_name not in session['interview_questions']:
+    questions = get_stored_questions(cv_name)
+    if not questions:
         flash('No questions available for download', 'error')
         return redirect(url_for('interview.index'))
     
-    questions = session['interview_questions'][cv_name]
-    
-    # Create a temporary file
-    temp = tempfile.NamedTemporaryFile(delete=False)
-    temp.write(questions.encode('utf-8'))
-    temp.close()
-    
+    # Sent from memory; send_file also encodes non-ASCII CV names in the filename
     return send_file(
-        temp.name,
+        BytesIO(questions.encode('utf-8')),
         as_attachment=True,
         download_name=f"interview_questions_{cv_name.replace(' ', '_')}.txt",
         mimetype="text/plain"
-    )
\ No newline at end of file
+    )
@@ -2,16 +2,15 @@
 Job criteria routes for the CV Analysis Tool Flask application.
 """
 
-import os
 from flask import (
     Blueprint, flash, redirect, render_template, request, 
     url_for, current_app, session, jsonify
 )
-from werkzeug.utils import secure_filename
 
-from app.services.text_extraction import extract_text_from_file
+from app.services.text_extraction import extract_text_from_stream
 from app.utils.helpers import convert_text_to_job_criteria_json, update_job_criteria_in_azure
 from app.blueprints.utils import allowed_file
+from app.db import store_job_criteria_preview, get_job_criteria_preview
 
 bp = Blueprint('job_criteria', __name__)
 
@@ -29,33 +28,25 @@ def upload():
         return redirect(url_for('home.index'))
     
     if file and allowed_file(file.filename):
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
         try:
-            # Extract text from file
-            job_text = extract_text_from_file(filepath)
+            # Extract text straight from the upload stream
+            job_text = extract_text_from_stream(
+                file.stream, file.filename,
+                max_pages=current_app.config['TEXT_EXTRACTION_MAX_PAGES'],
+                max_chars=current_app.config['TEXT_EXTRACTION_MAX_CHARS']
+            )
             
             # Convert to JSON
             job_criteria = convert_text_to_job_criteria_json(job_text)
             
-            # Store in session for the confirmation page
-            session['job_criteria_preview'] = {
-                'extracted_text': job_text,
-                'job_criteria': job_criteria
-            }
+            # Store server-side for the confirmation page; the session only keeps the ID
+            session['job_criteria_preview_id'] = store_job_criteria_preview(
+                job_text, job_criteria, current_app.config['JOB_CRITERIA_PREVIEW_MAX_AGE']
+            )
             
             return redirect(url_for('job_criteria.preview'))
         except Exception as e:
             flash(f'Error processing file: {str(e)}', 'error')
-        finally:
-            # Clean up temporary file
-            try:
-                os.remove(filepath)
-            except:
-                pass
     else:
         flash('Invalid file type', 'error')
     
@@ -64,11 +55,11 @@ def upload():
 @bp.route('/preview')
 def preview():
     """Display preview of extracted job criteria before updating."""
-    if 'job_criteria_preview' not in session:
+    preview_data = get_job_criteria_preview(session.get('job_criteria_preview_id'))
+    if preview_data is None:
         flash('No job criteria data available', 'error')
         return redirect(url_for('home.index'))
     
-    preview_data = session['job_criteria_preview']
     return render_template('job_criteria_preview.html', 
                           extracted_text=preview_data['extracted_text'],
                           job_criteria=preview_data['job_criteria'])
@@ -80,11 +71,12 @@ def update():
     if request.is_json:
         job_criteria = request.json.get('job_criteria')
     else:
-        # If form-encoded, try to get from session
-        if 'job_criteria_preview' not in session:
+        # If form-encoded, use the preview referenced by the session
+        preview_data = get_job_criteria_preview(session.get('job_criteria_preview_id'))
+        if preview_data is None:
             flash('No job criteria data available', 'error')
             return redirect(url_for('home.index'))
-        job_criteria = session['job_criteria_preview']['job_criteria']
+        job_criteria = preview_data['job_criteria']
     
     if not job_criteria:
         flash('No job criteria provided', 'error')
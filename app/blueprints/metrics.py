@@ -0,0 +1,25 @@
+"""
+Prometheus metrics endpoint for the CV Analysis Tool.
+
+Serves the metrics of every web and worker process sharing the database
+(see app/metrics.py). If METRICS_TOKEN is configured, scrapers must send
+``Authorization: Bearer <token>``.
+"""
+
+import hmac
+from flask import Blueprint, Response, abort, current_app, request
+
+from app.metrics import render_prometheus
+
+bp = Blueprint('metrics', __name__)
+
+@bp.route('/metrics')
+def metrics():
+    """Return all metrics in the Prometheus text format."""
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    token = current_app.config['METRICS_TOKEN']
+    auth = request.headers.get('Authorization', '')
+    if token and not (auth.startswith('Bearer ') and hmac.compare_digest(auth[len('Bearer '):], token)):
+        abort(401)
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,91 @@
+"""
+Candidate search routes for the CV Analysis Tool Flask application.
+
+Searches the CV text and analyses of every stored batch through the
+cv_search full-text index, so past candidates can be found without
+re-uploading their CVs.
+"""
+
+import re
+import sqlite3
+from datetime import datetime
+from flask import (
+    Blueprint, flash, redirect, render_template, request,
+    url_for, session
+)
+from markupsafe import Markup, escape
+
+from app.db import search_cvs, get_cv_result
+
+bp = Blueprint('search', __name__)
+
+RESULTS_PER_PAGE = 20
+# Control characters never appear in extracted text, so they can mark matches
+# in snippets before the snippet is HTML-escaped
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query that matches every word.
+
+    Words are quoted so FTS5 operators and punctuation in the input are taken
+    literally; the last word also matches as a prefix, for search-as-you-type.
+    """
+    words = [word.replace('"', '') for word in re.findall(r'\S+', text)]
+    words = [word for word in words if word]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def highlight(snippet):
+    """Escape a snippet and wrap its matched terms in <mark>."""
+    escaped = str(escape(snippet or ''))
+    return Markup(escaped.replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+@bp.route('/')
+def index():
+    """Display the candidate search page."""
+    return render_template('search.html', query=request.args.get('q', ''))
+
+@bp.route('/results')
+def results():
+    """Return one page of search results for htmx to swap in."""
+    query = request.args.get('q', '').strip()
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    match = build_match_query(query)
+    if match is None:
+        return render_template('components/search_results.html', query=query, hits=[], total=0)
+
+    try:
+        total, hits = search_cvs(match, RESULTS_PER_PAGE, (page - 1) * RESULTS_PER_PAGE, (MATCH_START, MATCH_END))
+    except sqlite3.OperationalError as e:
+        return render_template('components/search_results.html', query=query, error=f'Invalid search: {str(e)}')
+
+    for hit in hits:
+        hit['snippet'] = highlight(hit['snippet'])
+        hit['analyzed_at'] = datetime.fromtimestamp(hit['created_at']).strftime('%Y-%m-%d') if hit['created_at'] else ''
+
+    return render_template(
+        'components/search_results.html',
+        query=query,
+        hits=hits,
+        total=total,
+        first=(page - 1) * RESULTS_PER_PAGE + 1,
+        prev_url=url_for('search.results', q=query, page=page - 1) if page > 1 else None,
+        next_url=url_for('search.results', q=query, page=page + 1) if page * RESULTS_PER_PAGE < total else None
+    )
+
+@bp.route('/open/<batch_id>/<int:position>')
+def open_result(batch_id, position):
+    """Switch to the batch of a search hit and show its CV analysis."""
+    if get_cv_result(batch_id, position) is None:
+        flash('CV analysis not found', 'error')
+        return redirect(url_for('search.index'))
+
+    session['results_id'] = batch_id
+    return redirect(url_for('cv_detail.view', index=position))
@@ -3,30 +3,30 @@ Summary routes for the CV Analysis Tool Flask application.
 """
 
 from flask import (
-    Blueprint, flash, redirect, render_template, session, 
-    url_for
+    Blueprint, flash, redirect, render_template, request, 
+    url_for, session
 )
+from markupsafe import escape
 
-from app.services.openai_client import summarize_cv_analyses
-from app.blueprints.utils import get_results, store_analysis_results
+from app.services.dedupe import exclude_batch_duplicates
+from app.services.openai_client import summarize_cv_analyses, stream_cv_summary
+from app.blueprints.utils import get_results, get_batch, store_batch_fields, sse_event, sse_response
 
 bp = Blueprint('summary', __name__)
 
 @bp.route('/')
 def index():
     """Display comparative summary of all CVs."""
-    results_data = get_results()
+    batch = get_batch()
     
-    if not results_data or 'results' not in results_data:
+    if not batch:
         flash('No CV analysis results available', 'warning')
         return redirect(url_for('home.index'))
     
-    # Store summary in session for rendering (smaller than the full results)
-    if 'summary' in results_data and not session.get('summary_content'):
-        session['summary_content'] = results_data['summary']
-        session['summary_generated'] = True
-    
-    return render_template('summary.html')
+    # ?stream=1 renders a panel that streams a fresh summary from /summary/stream
+    return render_template('summary.html',
+                          summary=batch.get('summary'),
+                          stream=request.args.get('stream') == '1')
 
 @bp.route('/regenerate', methods=['POST'])
 def regenerate():
@@ -38,18 +38,47 @@ def regenerate():
         return redirect(url_for('summary.index'))
     
     try:
-        summary = summarize_cv_analyses(results_data['results'])
-        
-        # Update both session and stored results
-        session['summary_content'] = summary
-        session['summary_generated'] = True
+        summary = summarize_cv_analyses(exclude_batch_duplicates(results_data['results'], session['results_id']))
         
         # Update the saved results
-        results_data['summary'] = summary
-        store_analysis_results(session['results_id'], results_data)
+        store_batch_fields({'summary': summary})
         
         flash('Summary regenerated successfully', 'success')
         return redirect(url_for('summary.index'))
     except Exception as e:
         flash(f'Error generating summary: {str(e)}', 'error')
-        return redirect(url_for('summary.index'))
\ No newline at end of file
+        return redirect(url_for('summary.index'))
+
+@bp.route('/stream')
+def stream():
+    """Regenerate the comparative summary, streaming it as server-sent events.
+    
+    Emits 'status' events while large batches are condensed, 'delta' events
+    with escaped text as tokens arrive and a final 'complete' event with the
+    rendered summary once it is stored.
+    """
+    results_data = get_results()
+    results_id = session.get('results_id')
+    
+    def generate():
+        if not results_data or 'results' not in results_data:
+            yield sse_event('complete', render_template('components/summary_content.html', error='No results available'))
+            return
+        
+        chunks = []
+        try:
+            for event, text in stream_cv_summary(exclude_batch_duplicates(results_data['results'], results_id)):
+                if event == 'delta':
+                    chunks.append(text)
+                yield sse_event(event, escape(text))
+            
+            summary = "".join(chunks)
+            store_batch_fields({'summary': summary})
+            
+            yield sse_event('complete', render_template('components/summary_content.html', summary=summary))
+        except Exception as e:
+            yield sse_event('complete', render_template(
+                'components/summary_content.html', error=f'Error generating summary: {str(e)}'
+            ))
+    
+    return sse_response(generate())
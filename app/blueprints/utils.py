@@ -3,8 +3,14 @@
 Shared utility functions for blueprint routes.
 """
 
-from flask import current_app, session
+from flask import current_app, session, Response, stream_with_context
 from app.db import store_analysis_results as db_store_results, get_results as db_get_results, clean_old_jobs as db_clean_old_jobs, create_job, update_job, get_job
+from app.db import (
+    get_batch as db_get_batch, get_cv_names as db_get_cv_names, get_cv_entries as db_get_cv_entries, get_cv_result as db_get_cv_result,
+    get_cv_result_by_name as db_get_cv_result_by_name, store_batch_fields as db_store_batch_fields,
+    iter_cv_results as db_iter_cv_results, get_interview_questions as db_get_interview_questions,
+    store_interview_questions as db_store_interview_questions
+)
 
 def allowed_file(filename):
     """Check if the file has an allowed extension."""
@@ -24,8 +30,61 @@ def get_results():
         return None
     return load_analysis_results(session['results_id'])
 
+def get_batch():
+    """Helper to get batch-level fields (summary, ...) without the per-CV results."""
+    return db_get_batch(session.get('results_id'))
+
+def get_cv_names():
+    """Helper to get the CV names of the current results, in upload order."""
+    return db_get_cv_names(session.get('results_id'))
+
+def get_cv_entries():
+    """Helper to get (position, CV name) pairs of the current results, in upload order."""
+    return db_get_cv_entries(session.get('results_id'))
+
+def get_cv_result(index):
+    """Helper to get a single CV result by position."""
+    return db_get_cv_result(session.get('results_id'), index)
+
+def get_cv_result_by_name(cv_name):
+    """Helper to get a single CV result by CV name."""
+    return db_get_cv_result_by_name(session.get('results_id'), cv_name)
+
+def iter_cv_results():
+    """Helper to iterate the current CV results without loading them all."""
+    return db_iter_cv_results(session.get('results_id'))
+
+def store_batch_fields(fields):
+    """Update batch-level fields of the current results without rewriting the CV rows."""
+    return db_store_batch_fields(session.get('results_id'), fields)
+
+def get_interview_questions(cv_name, prompt_version):
+    """Helper to get stored interview questions for a CV of the current results."""
+    return db_get_interview_questions(session.get('results_id'), cv_name, prompt_version)
+
+def store_interview_questions(cv_name, prompt_version, questions):
+    """Helper to store interview questions for a CV of the current results."""
+    db_store_interview_questions(session.get('results_id'), cv_name, prompt_version, questions)
+
 def clean_old_jobs():
     """Clean old jobs from the DB."""
     db_clean_old_jobs()
 
+def sse_event(event, data):
+    """Format one server-sent event; multi-line data becomes several data: lines."""
+    lines = str(data).split('\n')
+    return f"event: {event}\n" + "".join(f"data: {line}\n" for line in lines) + "\n"
+
+def sse_response(generator):
+    """Wrap an event generator in a streaming text/event-stream response."""
+    return Response(
+        stream_with_context(generator),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Stop reverse proxies from buffering the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 # The in-memory analysis_jobs dictionary has been removed.
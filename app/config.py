@@ -28,6 +28,110 @@ class Config:
     AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv(
         "AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4o-mini")
     
+    # Outbound HTTP configuration (shared pooled session, see app/services/http_session.py)
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "180"))
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+    HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+    HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", "0.5"))
+    HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+
+    # Upstream rate limits shared by all processes (see app/services/rate_limiter.py); 0 = unlimited
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() in ("true", "1", "t")
+    FASTAGENT_MAX_REQUESTS_PER_MINUTE = float(os.getenv("FASTAGENT_MAX_REQUESTS_PER_MINUTE", "0"))
+    FASTAGENT_MAX_TOKENS_PER_MINUTE = float(os.getenv("FASTAGENT_MAX_TOKENS_PER_MINUTE", "0"))
+    # Output tokens assumed per FastAgent analysis, which reports no usage
+    FASTAGENT_ESTIMATED_OUTPUT_TOKENS = int(os.getenv("FASTAGENT_ESTIMATED_OUTPUT_TOKENS", "1500"))
+    AZURE_OPENAI_MAX_REQUESTS_PER_MINUTE = float(os.getenv("AZURE_OPENAI_MAX_REQUESTS_PER_MINUTE", "0"))
+    AZURE_OPENAI_MAX_TOKENS_PER_MINUTE = float(os.getenv("AZURE_OPENAI_MAX_TOKENS_PER_MINUTE", "0"))
+    # Buckets hold this many seconds of budget, and limits are cut at most once per window
+    RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "10"))
+    # AIMD: multiply limits by this on a 429, add back this fraction of the budget per success
+    RATE_LIMIT_DECREASE_FACTOR = float(os.getenv("RATE_LIMIT_DECREASE_FACTOR", "0.5"))
+    RATE_LIMIT_INCREASE_STEP = float(os.getenv("RATE_LIMIT_INCREASE_STEP", "0.02"))
+    RATE_LIMIT_MIN_FRACTION = float(os.getenv("RATE_LIMIT_MIN_FRACTION", "0.1"))
+    # Longest a call waits for capacity before failing
+    RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "300"))
+
+    # Analysis pipeline configuration
+    # Maximum number of CVs extracted and sent to the FastAgent API at once
+    ANALYSIS_MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", "4"))
+    # Reuse FastAgent responses for identical CV text, revision and job criteria
+    ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+    ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "5000"))
+    # Reuse the analysis of near-duplicate CVs (MinHash similarity of at least
+    # DEDUPE_THRESHOLD) within a batch and against CVs analyzed in the last
+    # DEDUPE_HISTORY_SECONDS (0 = within a batch only)
+    DEDUPE_ENABLED = os.getenv("DEDUPE_ENABLED", "True").lower() in ("true", "1", "t")
+    DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.9"))
+    DEDUPE_HISTORY_SECONDS = int(os.getenv("DEDUPE_HISTORY_SECONDS", str(7 * 24 * 3600)))
+
+    # Text extraction limits; PDFs are parsed on a process pool of this size (0 = inline)
+    TEXT_EXTRACTION_PROCESSES = int(os.getenv("TEXT_EXTRACTION_PROCESSES", "2"))
+    TEXT_EXTRACTION_MAX_PAGES = int(os.getenv("TEXT_EXTRACTION_MAX_PAGES", "50"))
+    TEXT_EXTRACTION_MAX_CHARS = int(os.getenv("TEXT_EXTRACTION_MAX_CHARS", "200000"))
+    TEXT_EXTRACTION_TIMEOUT = float(os.getenv("TEXT_EXTRACTION_TIMEOUT", "60"))
+
+    # Prometheus metrics at /metrics (see app/metrics.py); bearer token required when set
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() in ("true", "1", "t")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    # Seconds between writes of each process's metrics to the database
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "10"))
+    # Metrics of processes that stopped reporting are dropped after this many seconds
+    METRICS_RETENTION_SECONDS = int(os.getenv("METRICS_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+    # Batch API (/api/v1): bearer token required when set, and the largest accepted batch
+    API_TOKEN = os.getenv("API_TOKEN", "")
+    API_MAX_BATCH_SIZE = int(os.getenv("API_MAX_BATCH_SIZE", "500"))
+    # How long an Idempotency-Key keeps returning the batch it first created
+    IDEMPOTENCY_KEY_RETENTION_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_RETENTION_SECONDS", "86400"))
+
+    # Session storage: "sqlite" (sessions table in the app database) or "filesystem"
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite").lower()
+    # Largest serialized session that will be stored
+    SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", "16384"))
+    # Sweep expired sessions on average once every N requests (0 = only via `flask session_cleanup`)
+    SESSION_CLEANUP_N_REQUESTS = int(os.getenv("SESSION_CLEANUP_N_REQUESTS", "100"))
+    # Seconds an uploaded job criteria preview is kept
+    JOB_CRITERIA_PREVIEW_MAX_AGE = int(os.getenv("JOB_CRITERIA_PREVIEW_MAX_AGE", "7200"))
+
+    # SQLite connection tuning (see app/db.py)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+
+    # Number of decoded result batches kept in memory per process
+    RESULTS_CACHE_SIZE = int(os.getenv("RESULTS_CACHE_SIZE", "32"))
+    # Number of rendered Markdown documents (analyses, summaries, questions) kept per process
+    MARKDOWN_CACHE_SIZE = int(os.getenv("MARKDOWN_CACHE_SIZE", "512"))
+
+    # Job queue configuration (see app/worker.py)
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+    JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+    # How long failed jobs (and their payloads) are kept so they can be resumed
+    JOB_FAILED_RETENTION_SECONDS = int(os.getenv("JOB_FAILED_RETENTION_SECONDS", "86400"))
+    # Minimum seconds between per-CV progress writes for one job
+    JOB_PROGRESS_WRITE_INTERVAL = float(os.getenv("JOB_PROGRESS_WRITE_INTERVAL", "0.5"))
+    # Progress stream: fallback re-read interval for jobs run by another process, and stream lifetime
+    PROGRESS_STREAM_POLL_INTERVAL = float(os.getenv("PROGRESS_STREAM_POLL_INTERVAL", "2.0"))
+    # Short streams keep threaded servers from tying up a thread per open page; the browser reconnects
+    PROGRESS_STREAM_MAX_SECONDS = int(os.getenv("PROGRESS_STREAM_MAX_SECONDS", "60"))
+    # Run a worker thread inside the web process when started with `python app.py`
+    EMBEDDED_WORKER = os.getenv("EMBEDDED_WORKER", "True").lower() in ("true", "1", "t")
+
+    # Comparative summary configuration
+    # Prompt size above which analyses are condensed and merged in tiers before the final summary
+    SUMMARY_PROMPT_TOKEN_BUDGET = int(os.getenv("SUMMARY_PROMPT_TOKEN_BUDGET", "12000"))
+    SUMMARY_CONDENSE_MAX_TOKENS = int(os.getenv("SUMMARY_CONDENSE_MAX_TOKENS", "300"))
+    SUMMARY_MERGE_MAX_TOKENS = int(os.getenv("SUMMARY_MERGE_MAX_TOKENS", "800"))
+    SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", "4"))
+
     # Flask-specific configuration
     DEBUG = os.getenv("FLASK_DEBUG", "True").lower() in ("true", "1", "t")
     ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
\ No newline at end of file
@@ -1,25 +1,101 @@
 # File: app/db.py
+import os
 import sqlite3
 import json
 import time
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
 from flask import current_app, g
 
+from app.job_events import notify_job_update
+
 DATABASE = 'app.db'  # Database file stored in the instance folder
 
+# One connection per thread (and per process, so forked workers never inherit
+# a parent's handle). Connections outlive app contexts: opening a connection
+# and re-applying pragmas on every request was a large share of request time.
+_local = threading.local()
+
+def _connect(db_path):
+    config = current_app.config
+    db = sqlite3.connect(
+        db_path,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        timeout=config['SQLITE_BUSY_TIMEOUT_MS'] / 1000
+    )
+    db.row_factory = sqlite3.Row
+    # WAL lets job-progress readers run while analysis threads write
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute(f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}")
+    db.execute(f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    # Negative cache_size is in KiB rather than pages
+    db.execute(f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}")
+    db.execute(f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}")
+    db.execute("PRAGMA temp_store = MEMORY")
+    return db
+
 def get_db():
     if 'db' not in g:
         db_path = current_app.instance_path + '/' + DATABASE
-        g.db = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES)
-        g.db.row_factory = sqlite3.Row
+        connections = getattr(_local, 'connections', None)
+        if connections is None or getattr(_local, 'pid', None) != os.getpid():
+            connections = _local.connections = {}
+            _local.pid = os.getpid()
+        if db_path not in connections:
+            db = _connect(db_path)
+            _ensure_schema(db, db_path)
+            connections[db_path] = db
+        g.db = connections[db_path]
     return g.db
 
 def close_db(e=None):
     db = g.pop('db', None)
-    if db is not None:
-        db.close()
+    if db is not None and db.in_transaction:
+        # The connection is reused by this thread's next app context, so never
+        # let it carry an open transaction (and its write lock) across requests
+        db.rollback()
+
+# Bump whenever _create_schema changes, so existing databases are upgraded
+# by the first connection that sees the old version
+SCHEMA_VERSION = 12
+
+# Database paths whose schema this process has already checked
+_schema_checked = set()
+_schema_lock = threading.Lock()
+
+def _ensure_schema(db, db_path):
+    """Create or upgrade the schema the first time a process opens db_path.
+    
+    Replaces running init_db in create_app, which every web and worker process
+    paid for at boot. The check is a single PRAGMA once the schema is current.
+    """
+    if db_path in _schema_checked:
+        return
+    with _schema_lock:
+        if db_path in _schema_checked:
+            return
+        if db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Serialize upgrades across processes; re-check once the write lock is held
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                    _create_schema(db)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        _schema_checked.add(db_path)
 
 def init_db():
+    """Create or upgrade the schema unconditionally (``flask init-db``)."""
     db = get_db()
+    _create_schema(db)
+    db.commit()
+
+def _create_schema(db):
+    """Create all tables and indexes; safe to run on an existing database."""
     # Create table for analysis results
     db.execute("""
         CREATE TABLE IF NOT EXISTS analysis_results (
@@ -29,6 +105,39 @@ def init_db():
             updated_at REAL
         )
     """)
+    # Create normalized tables for analysis results: one row per batch and one per CV
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_batches (
+            id TEXT PRIMARY KEY,
+            summary TEXT,
+            extra_data TEXT,
+            cv_count INTEGER,
+            created_at REAL,
+            updated_at REAL
+        )
+    """)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_cv_results (
+            batch_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            cv_name TEXT,
+            analysis TEXT,
+            thread_id TEXT,
+            message_id TEXT,
+            extra_data TEXT,
+            PRIMARY KEY (batch_id, position)
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cv_results_name ON analysis_cv_results (batch_id, cv_name)")
+    # completed_seq orders CVs by when they finished (the API's result cursor);
+    # status is 'ok' or 'error', and only 'ok' rows are skipped when a job resumes
+    _ensure_columns(db, 'analysis_cv_results', {'completed_seq': 'INTEGER', 'status': 'TEXT'})
+    # agent_contents holds the agent name -> content mapping parsed from the
+    # raw analysis when it arrived; NULL for rows stored before it was kept
+    _ensure_columns(db, 'analysis_cv_results', {'agent_contents': 'TEXT'})
+    # Structured scores extracted from the agent contents (see app.services.scoring)
+    _ensure_columns(db, 'analysis_cv_results', {column: 'REAL' for column in SCORE_COLUMNS})
+    db.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cv_results_seq ON analysis_cv_results (batch_id, completed_seq)")
     # Create table for analysis jobs (queue)
     db.execute("""
         CREATE TABLE IF NOT EXISTS analysis_jobs (
@@ -41,48 +150,718 @@ def init_db():
             completed_at REAL
         )
     """)
-    db.commit()
+    # Queue columns added after the first release; older databases are migrated in place
+    _ensure_columns(db, 'analysis_jobs', {
+        'payload': 'TEXT',
+        'attempts': 'INTEGER DEFAULT 0',
+        'max_attempts': 'INTEGER DEFAULT 3',
+        'worker_id': 'TEXT',
+        'lease_expires_at': 'REAL',
+        'heartbeat_at': 'REAL',
+        'idempotency_key': 'TEXT',
+        'request_hash': 'TEXT',
+    })
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_jobs_idempotency ON analysis_jobs (idempotency_key) WHERE idempotency_key IS NOT NULL")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs (status, started_at)")
+    # Idempotency-Keys of API submissions; kept for IDEMPOTENCY_KEY_RETENTION_SECONDS,
+    # well after the finished job row is cleaned up
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            idempotency_key TEXT PRIMARY KEY,
+            job_id TEXT NOT NULL,
+            request_hash TEXT,
+            created_at REAL
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys (created_at)")
+    # Keys were stored on the job rows before this table existed
+    db.execute("""
+        INSERT OR IGNORE INTO idempotency_keys (idempotency_key, job_id, request_hash, created_at)
+        SELECT idempotency_key, job_id, request_hash, started_at FROM analysis_jobs WHERE idempotency_key IS NOT NULL
+    """)
+    # Create table for cached FastAgent responses, keyed by content hash
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            cache_key TEXT PRIMARY KEY,
+            response_data TEXT NOT NULL,
+            created_at REAL,
+            last_used_at REAL
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used ON analysis_cache (last_used_at)")
+    # Create table for small application-wide settings (e.g. job criteria version)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS app_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            updated_at REAL
+        )
+    """)
+    # Create table for generated interview questions, shared by every session on a batch
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS interview_questions (
+            results_id TEXT NOT NULL,
+            cv_name TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            questions TEXT NOT NULL,
+            created_at REAL,
+            PRIMARY KEY (results_id, cv_name, prompt_version)
+        )
+    """)
+    # Create table for server-side sessions (see app/session_store.py)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            store_id TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            expiry REAL NOT NULL
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expiry ON sessions (expiry)")
+    # Create table for job criteria previews; the session only holds the preview ID
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS job_criteria_previews (
+            id TEXT PRIMARY KEY,
+            extracted_text TEXT,
+            job_criteria TEXT,
+            created_at REAL
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_job_criteria_previews_created ON job_criteria_previews (created_at)")
+    # Create table for upstream rate limiter state, shared by all web and worker processes
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            name TEXT PRIMARY KEY,
+            rpm REAL,
+            tpm REAL,
+            request_level REAL,
+            token_level REAL,
+            blocked_until REAL,
+            decreased_at REAL,
+            updated_at REAL,
+            granted_count INTEGER,
+            throttled_count INTEGER
+        )
+    """)
+    # Create table for per-process metrics snapshots, merged by /metrics
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS metrics_snapshots (
+            source TEXT PRIMARY KEY,
+            data TEXT,
+            updated_at REAL
+        )
+    """)
+    # Full-text index over the CV text and analysis of every stored CV;
+    # cv_search_docs gives each (batch, position) a stable rowid in cv_search
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS cv_search_docs (
+            doc_id INTEGER PRIMARY KEY,
+            batch_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            UNIQUE (batch_id, position)
+        )
+    """)
+    db.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS cv_search USING fts5(
+            cv_name, cv_text, analysis_text,
+            tokenize = 'porter unicode61'
+        )
+    """)
+    # MinHash signatures of analyzed CVs and their LSH band hashes, for
+    # near-duplicate detection (see app.services.dedupe)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS cv_signatures (
+            batch_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            signature BLOB NOT NULL,
+            analysis_key TEXT,
+            created_at REAL,
+            PRIMARY KEY (batch_id, position)
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_cv_signatures_created ON cv_signatures (created_at)")
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS cv_signature_bands (
+            band_hash INTEGER NOT NULL,
+            batch_id TEXT NOT NULL,
+            position INTEGER NOT NULL
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_cv_signature_bands_hash ON cv_signature_bands (band_hash)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_cv_signature_bands_cv ON cv_signature_bands (batch_id, position)")
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def _ensure_columns(db, table, columns):
+    existing = {row['name'] for row in db.execute(f"PRAGMA table_info({table})")}
+    for name, definition in columns.items():
+        if name not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+# Analysis results helpers
+#
+# Results are stored as one analysis_batches row plus one analysis_cv_results
+# row per CV, so views that need a single CV or only the CV names never decode
+# the whole batch. The legacy analysis_results table (one JSON blob per batch)
+# is still read, and rows are migrated the first time they are loaded.
+
+# Per-CV dict keys that have their own columns; any other keys go to extra_data
+RESULT_COLUMNS = {
+    "CV Name": "cv_name",
+    "Analysis": "analysis",
+    "Thread ID": "thread_id",
+    "Message ID": "message_id",
+}
+# Parsed agent contents (see app.services.agent_response), stored as JSON
+AGENT_CONTENTS_KEY = "Agent Contents"
+# Score vector of a CV, {column: value or None}, stored one column per score
+SCORES_KEY = "Scores"
+SCORE_COLUMNS = ('skills_match', 'experience_years', 'criteria_coverage')
+# Batch keys that have their own columns or are derived from the CV rows
+BATCH_COLUMNS = ('results', 'thread_ids', 'summary', 'created_at')
+
+_results_cache = OrderedDict()
+_results_cache_lock = threading.Lock()
+
+def _result_to_row(batch_id, position, result):
+    extra = {k: v for k, v in result.items() if k not in RESULT_COLUMNS and k not in (AGENT_CONTENTS_KEY, SCORES_KEY)}
+    agent_contents = result.get(AGENT_CONTENTS_KEY)
+    scores = result.get(SCORES_KEY) or {}
+    return (
+        batch_id,
+        position,
+        result.get("CV Name"),
+        result.get("Analysis"),
+        result.get("Thread ID"),
+        result.get("Message ID"),
+        json.dumps(extra) if extra else None,
+        json.dumps(agent_contents) if agent_contents is not None else None,
+    ) + tuple(scores.get(column) for column in SCORE_COLUMNS)
+
+def _row_to_result(row):
+    result = {key: row[column] or "" for key, column in RESULT_COLUMNS.items()}
+    if row["extra_data"]:
+        result.update(json.loads(row["extra_data"]))
+    if row["agent_contents"] is not None:
+        result[AGENT_CONTENTS_KEY] = json.loads(row["agent_contents"])
+    result[SCORES_KEY] = {column: row[column] for column in SCORE_COLUMNS}
+    return result
+
+def _copy_results(results_data):
+    """Copy the top level of cached results so callers can modify them freely."""
+    return {
+        key: dict(value) if isinstance(value, dict) else list(value) if isinstance(value, list) else value
+        for key, value in results_data.items()
+    }
+
+def _invalidate_results_cache(results_id):
+    with _results_cache_lock:
+        _results_cache.pop(results_id, None)
 
 def store_analysis_results(results_id, results_data):
     db = get_db()
     now = time.time()
-    results_json = json.dumps(results_data)
+    results = results_data.get('results', [])
+    extra = {k: v for k, v in results_data.items() if k not in BATCH_COLUMNS}
+    db.execute(
+        """
+        INSERT INTO analysis_batches (id, summary, extra_data, cv_count, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            summary = excluded.summary,
+            extra_data = excluded.extra_data,
+            cv_count = excluded.cv_count,
+            updated_at = excluded.updated_at
+        """,
+        (results_id, results_data.get('summary'), json.dumps(extra) if extra else None,
+         len(results), results_data.get('created_at', now), now)
+    )
+    db.execute("DELETE FROM analysis_cv_results WHERE batch_id = ?", (results_id,))
+    db.executemany(
+        "INSERT INTO analysis_cv_results (batch_id, position, cv_name, analysis, thread_id, message_id, extra_data, agent_contents, skills_match, experience_years, criteria_coverage, completed_seq) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [_result_to_row(results_id, i, result) + (i + 1,) for i, result in enumerate(results)]
+    )
     db.execute(
-        "INSERT OR REPLACE INTO analysis_results (id, results_data, created_at, updated_at) VALUES (?, ?, ?, ?)",
-        (results_id, results_json, now, now)
+        "DELETE FROM cv_search WHERE rowid IN (SELECT doc_id FROM cv_search_docs WHERE batch_id = ?)", (results_id,)
     )
+    for i, result in enumerate(results):
+        _index_cv(db, results_id, i, result)
     db.commit()
+    _invalidate_results_cache(results_id)
     return results_id
 
+def start_batch(results_id, cv_count):
+    """Create (or reset the size of) a batch before its CVs are analyzed."""
+    db = get_db()
+    now = time.time()
+    db.execute(
+        """
+        INSERT INTO analysis_batches (id, summary, extra_data, cv_count, created_at, updated_at)
+        VALUES (?, NULL, NULL, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET cv_count = excluded.cv_count, updated_at = excluded.updated_at
+        """,
+        (results_id, cv_count, now, now)
+    )
+    db.commit()
+    _invalidate_results_cache(results_id)
+
+def store_cv_result(results_id, position, result, status='ok', cv_text=None):
+    """Write one CV result as soon as it is available.
+    
+    Each write gets the next completed_seq of the batch, so readers can page
+    through results in the order they finished. Pass status='error' for a
+    failed analysis so that resuming the job retries it.
+    
+    Successful results are added to the search index along with cv_text,
+    the extracted text of the CV; failed ones are removed from it.
+    """
+    db = get_db()
+    db.execute(
+        """
+        INSERT OR REPLACE INTO analysis_cv_results (
+            batch_id, position, cv_name, analysis, thread_id, message_id, extra_data, agent_contents,
+            skills_match, experience_years, criteria_coverage, status, completed_seq
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(completed_seq), 0) + 1 FROM analysis_cv_results WHERE batch_id = ?))
+        """,
+        _result_to_row(results_id, position, result) + (status, results_id)
+    )
+    _index_cv(db, results_id, position, result, cv_text, indexed=status == 'ok')
+    db.execute("UPDATE analysis_batches SET updated_at = ? WHERE id = ?", (time.time(), results_id))
+    db.commit()
+    _invalidate_results_cache(results_id)
+
+def store_batch_fields(results_id, fields):
+    """Update batch-level fields (summary, interview questions, ...) without rewriting the CV rows."""
+    db = get_db()
+    row = db.execute("SELECT summary, extra_data FROM analysis_batches WHERE id = ?", (results_id,)).fetchone()
+    if row is None:
+        return False
+    summary = fields.get('summary', row["summary"])
+    extra = json.loads(row["extra_data"]) if row["extra_data"] else {}
+    extra.update({k: v for k, v in fields.items() if k not in BATCH_COLUMNS})
+    db.execute(
+        "UPDATE analysis_batches SET summary = ?, extra_data = ?, updated_at = ? WHERE id = ?",
+        (summary, json.dumps(extra) if extra else None, time.time(), results_id)
+    )
+    db.commit()
+    _invalidate_results_cache(results_id)
+    return True
+
+def _migrate_legacy_results(results_id):
+    """Move a legacy analysis_results blob into the normalized tables.
+    
+    Returns True if a legacy row existed and was migrated.
+    """
+    db = get_db()
+    legacy = db.execute("SELECT results_data, created_at FROM analysis_results WHERE id = ?", (results_id,)).fetchone()
+    if legacy is None:
+        return False
+    results_data = json.loads(legacy["results_data"])
+    results_data.setdefault('created_at', legacy["created_at"])
+    store_analysis_results(results_id, results_data)
+    db.execute("DELETE FROM analysis_results WHERE id = ?", (results_id,))
+    db.commit()
+    return True
+
+def get_batch(results_id):
+    """Load batch-level fields only (no per-CV rows)."""
+    if not results_id:
+        return None
+    db = get_db()
+    query = "SELECT * FROM analysis_batches WHERE id = ?"
+    row = db.execute(query, (results_id,)).fetchone()
+    if row is None and _migrate_legacy_results(results_id):
+        row = db.execute(query, (results_id,)).fetchone()
+    if row is None:
+        return None
+    batch = json.loads(row["extra_data"]) if row["extra_data"] else {}
+    batch.update({
+        'summary': row["summary"],
+        'cv_count': row["cv_count"],
+        'created_at': row["created_at"],
+        'updated_at': row["updated_at"],
+    })
+    return batch
+
+def get_cv_names(results_id):
+    """Return the CV names of a batch in upload order."""
+    if not results_id:
+        return []
+    db = get_db()
+    query = "SELECT cv_name FROM analysis_cv_results WHERE batch_id = ? ORDER BY position"
+    rows = db.execute(query, (results_id,)).fetchall()
+    if not rows and _migrate_legacy_results(results_id):
+        rows = db.execute(query, (results_id,)).fetchall()
+    return [row["cv_name"] for row in rows]
+
+def get_cv_entries(results_id):
+    """Return (position, CV name) pairs of the stored CVs of a batch, in upload order.
+    
+    Positions may have gaps while a batch is still being analyzed.
+    """
+    if not results_id:
+        return []
+    db = get_db()
+    query = "SELECT position, cv_name FROM analysis_cv_results WHERE batch_id = ? ORDER BY position"
+    rows = db.execute(query, (results_id,)).fetchall()
+    if not rows and _migrate_legacy_results(results_id):
+        rows = db.execute(query, (results_id,)).fetchall()
+    return [(row["position"], row["cv_name"]) for row in rows]
+
+def get_finished_cv_results(results_id):
+    """Return {position: result} for the CVs of a batch that were analyzed successfully."""
+    rows = get_db().execute(
+        "SELECT * FROM analysis_cv_results WHERE batch_id = ? AND (status IS NULL OR status = 'ok')",
+        (results_id,)
+    ).fetchall()
+    return {row["position"]: _row_to_result(row) for row in rows}
+
+def get_cv_scores(results_id=None):
+    """Return the score rows of successfully analyzed CVs, for ranking.
+    
+    Rows are (batch ID, position, CV name, *SCORE_COLUMNS) tuples, in stored
+    order, for one batch or, without results_id, for every stored batch.
+    """
+    columns = "batch_id, position, cv_name, " + ", ".join(SCORE_COLUMNS)
+    condition = "(status IS NULL OR status = 'ok')"
+    if results_id:
+        rows = get_db().execute(
+            f"SELECT {columns} FROM analysis_cv_results WHERE batch_id = ? AND {condition} ORDER BY position",
+            (results_id,)
+        )
+    else:
+        rows = get_db().execute(
+            f"SELECT {columns} FROM analysis_cv_results WHERE {condition} ORDER BY batch_id, position"
+        )
+    return [tuple(row) for row in rows]
+
+def get_scores_version(results_id=None):
+    """Return a value that changes whenever the CV rows of a batch (or of any batch) are written."""
+    db = get_db()
+    if results_id:
+        row = db.execute("SELECT updated_at FROM analysis_batches WHERE id = ?", (results_id,)).fetchone()
+        return (row["updated_at"],) if row else (None,)
+    row = db.execute("SELECT COUNT(*), MAX(updated_at) FROM analysis_batches").fetchone()
+    return tuple(row)
+
+def get_cv_result(results_id, position):
+    """Return one CV result by its position in the batch."""
+    if not results_id:
+        return None
+    db = get_db()
+    query = "SELECT * FROM analysis_cv_results WHERE batch_id = ? AND position = ?"
+    row = db.execute(query, (results_id, position)).fetchone()
+    if row is None and _migrate_legacy_results(results_id):
+        row = db.execute(query, (results_id, position)).fetchone()
+    return _row_to_result(row) if row else None
+
+def get_cv_result_by_name(results_id, cv_name):
+    """Return the first CV result in the batch with the given name."""
+    if not results_id:
+        return None
+    db = get_db()
+    query = "SELECT * FROM analysis_cv_results WHERE batch_id = ? AND cv_name = ? ORDER BY position LIMIT 1"
+    row = db.execute(query, (results_id, cv_name)).fetchone()
+    if row is None and _migrate_legacy_results(results_id):
+        row = db.execute(query, (results_id, cv_name)).fetchone()
+    return _row_to_result(row) if row else None
+
+def iter_cv_results(results_id, batch_size=100):
+    """Yield the CV results of a batch in upload order, fetching batch_size rows at a time."""
+    if not results_id:
+        return
+    cursor = get_db().execute(
+        "SELECT * FROM analysis_cv_results WHERE batch_id = ? ORDER BY position",
+        (results_id,)
+    )
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        for row in rows:
+            yield _row_to_result(row)
+
+def get_cv_results_page(results_id, after_seq=0, limit=50):
+    """Return up to limit CV results that finished after completion number after_seq.
+    
+    Each result carries its 'position' in the batch, its 'seq' and its
+    'status' ('ok' or 'error'); pass the last seq back as after_seq to fetch
+    the next page.
+    """
+    rows = get_db().execute(
+        "SELECT * FROM analysis_cv_results WHERE batch_id = ? AND completed_seq > ? ORDER BY completed_seq LIMIT ?",
+        (results_id, after_seq, limit)
+    ).fetchall()
+    page = []
+    for row in rows:
+        result = _row_to_result(row)
+        result.update({'position': row["position"], 'seq': row["completed_seq"], 'status': row["status"] or 'ok'})
+        page.append(result)
+    return page
+
+def count_cv_results(results_id):
+    return get_db().execute(
+        "SELECT COUNT(*) FROM analysis_cv_results WHERE batch_id = ?", (results_id,)
+    ).fetchone()[0]
+
 def load_analysis_results(results_id):
+    """Load a whole batch in the {'results': [...], 'summary': ...} shape.
+    
+    Decoded batches are kept in a small per-process LRU. Entries are keyed
+    on the batch updated_at, so writes from other processes are picked up.
+    """
     db = get_db()
-    row = db.execute("SELECT results_data FROM analysis_results WHERE id = ?", (results_id,)).fetchone()
-    if row:
-        return json.loads(row["results_data"])
-    return None
+    query = "SELECT updated_at FROM analysis_batches WHERE id = ?"
+    row = db.execute(query, (results_id,)).fetchone()
+    if row is None and _migrate_legacy_results(results_id):
+        row = db.execute(query, (results_id,)).fetchone()
+    if row is None:
+        return None
+    
+    updated_at = row["updated_at"]
+    with _results_cache_lock:
+        cached = _results_cache.get(results_id)
+        if cached and cached[0] == updated_at:
+            _results_cache.move_to_end(results_id)
+            return _copy_results(cached[1])
+    
+    batch = get_batch(results_id)
+    rows = db.execute(
+        "SELECT * FROM analysis_cv_results WHERE batch_id = ? ORDER BY position", (results_id,)
+    ).fetchall()
+    results = [_row_to_result(r) for r in rows]
+    results_data = {k: v for k, v in batch.items() if k not in ('cv_count', 'updated_at')}
+    results_data['results'] = results
+    results_data['thread_ids'] = [r.get("Thread ID", "") for r in results]
+    
+    with _results_cache_lock:
+        _results_cache[results_id] = (updated_at, results_data)
+        _results_cache.move_to_end(results_id)
+        while len(_results_cache) > current_app.config['RESULTS_CACHE_SIZE']:
+            _results_cache.popitem(last=False)
+    return _copy_results(results_data)
 
 def get_results(results_id):
     if not results_id:
         return None
     return load_analysis_results(results_id)
 
-# Job queue helper functions
-def create_job(job_id, job_data):
+# Search helpers
+#
+# cv_search holds one entry per successfully analyzed CV, written in the same
+# transaction as its CV row. Entries are never read back into results; the
+# CV text is only kept here, for matching and snippets.
+
+def _search_text(result):
+    """Return the analysis text of a CV result to index."""
+    contents = result.get(AGENT_CONTENTS_KEY)
+    if contents:
+        return "\n".join(contents.values())
+    # Results stored before agent contents were kept; index the raw analysis
+    return result.get("Analysis") or ""
+
+def _index_cv(db, results_id, position, result, cv_text=None, indexed=True):
+    """Replace the search entry of one CV; the caller commits."""
+    db.execute("INSERT OR IGNORE INTO cv_search_docs (batch_id, position) VALUES (?, ?)", (results_id, position))
+    doc_id = db.execute(
+        "SELECT doc_id FROM cv_search_docs WHERE batch_id = ? AND position = ?", (results_id, position)
+    ).fetchone()[0]
+    db.execute("DELETE FROM cv_search WHERE rowid = ?", (doc_id,))
+    if indexed:
+        db.execute(
+            "INSERT INTO cv_search (rowid, cv_name, cv_text, analysis_text) VALUES (?, ?, ?, ?)",
+            (doc_id, result.get("CV Name") or "", cv_text or "", _search_text(result))
+        )
+
+def search_cvs(match, limit, offset=0, snippet_marks=('[', ']')):
+    """Search the CVs of every stored batch, best matches first.
+    
+    match is an FTS5 query. Returns (total matches, rows) where each row has
+    batch_id, position, cv_name, created_at (of the batch) and a snippet with
+    matched terms wrapped in snippet_marks.
+    
+    Raises sqlite3.OperationalError for a malformed query.
+    """
+    db = get_db()
+    total = db.execute("SELECT COUNT(*) FROM cv_search WHERE cv_search MATCH ?", (match,)).fetchone()[0]
+    rows = db.execute(
+        """
+        SELECT d.batch_id, d.position, cv_search.cv_name, b.created_at,
+               snippet(cv_search, -1, ?, ?, '...', 24) AS snippet
+        FROM cv_search
+        JOIN cv_search_docs d ON d.doc_id = cv_search.rowid
+        LEFT JOIN analysis_batches b ON b.id = d.batch_id
+        WHERE cv_search MATCH ?
+        ORDER BY bm25(cv_search, 5.0, 1.0, 2.0)
+        LIMIT ? OFFSET ?
+        """,
+        (snippet_marks[0], snippet_marks[1], match, limit, offset)
+    ).fetchall()
+    return total, [dict(row) for row in rows]
+
+def backfill_search_index():
+    """Index stored CVs that have no search entry yet (results stored by older releases).
+    
+    Their CV text is no longer available, so only names and analyses are
+    indexed. Returns the number of CVs indexed.
+    """
+    db = get_db()
+    rows = db.execute(
+        """
+        SELECT r.* FROM analysis_cv_results r
+        LEFT JOIN cv_search_docs d ON d.batch_id = r.batch_id AND d.position = r.position
+        WHERE d.doc_id IS NULL AND (r.status IS NULL OR r.status = 'ok')
+        """
+    ).fetchall()
+    for row in rows:
+        _index_cv(db, row["batch_id"], row["position"], _row_to_result(row))
+    db.commit()
+    return len(rows)
+
+# Interview questions helpers
+def get_interview_questions(results_id, cv_name, prompt_version):
+    """Return stored interview questions for a CV, or None if none were generated."""
+    if not results_id:
+        return None
+    row = get_db().execute(
+        "SELECT questions FROM interview_questions WHERE results_id = ? AND cv_name = ? AND prompt_version = ?",
+        (results_id, cv_name, prompt_version)
+    ).fetchone()
+    return row["questions"] if row else None
+
+def store_interview_questions(results_id, cv_name, prompt_version, questions):
+    """Store (or replace) the interview questions generated for a CV."""
     db = get_db()
     db.execute(
-        "INSERT INTO analysis_jobs (job_id, status, progress, message, results_id, started_at) VALUES (?, ?, ?, ?, ?, ?)",
-        (
-            job_id,
-            job_data.get('status'),
-            job_data.get('progress'),
-            job_data.get('message'),
-            job_data.get('results_id'),
-            job_data.get('started_at'),
-        )
+        "INSERT OR REPLACE INTO interview_questions (results_id, cv_name, prompt_version, questions, created_at) VALUES (?, ?, ?, ?, ?)",
+        (results_id, cv_name, prompt_version, questions, time.time())
+    )
+    db.commit()
+
+# Session helpers used by app.session_store
+def get_session_data(store_id):
+    """Return the serialized data of an unexpired session, or None."""
+    row = get_db().execute(
+        "SELECT data FROM sessions WHERE store_id = ? AND expiry > ?", (store_id, time.time())
+    ).fetchone()
+    return row["data"] if row else None
+
+def upsert_session(store_id, data, expiry):
+    db = get_db()
+    db.execute(
+        "INSERT INTO sessions (store_id, data, expiry) VALUES (?, ?, ?) ON CONFLICT(store_id) DO UPDATE SET data = excluded.data, expiry = excluded.expiry",
+        (store_id, data, expiry)
     )
     db.commit()
 
-def update_job(job_id, job_data):
+def delete_session(store_id):
+    db = get_db()
+    db.execute("DELETE FROM sessions WHERE store_id = ?", (store_id,))
+    db.commit()
+
+def delete_expired_sessions():
+    """Delete all expired sessions; returns how many were removed."""
+    db = get_db()
+    deleted = db.execute("DELETE FROM sessions WHERE expiry <= ?", (time.time(),)).rowcount
+    db.commit()
+    return deleted
+
+# Job criteria preview helpers
+def store_job_criteria_preview(extracted_text, job_criteria, max_age):
+    """Store an uploaded job criteria preview and return its ID.
+    
+    Previews older than max_age seconds are evicted on each write.
+    """
+    db = get_db()
+    now = time.time()
+    preview_id = uuid.uuid4().hex
+    db.execute("DELETE FROM job_criteria_previews WHERE created_at <= ?", (now - max_age,))
+    db.execute(
+        "INSERT INTO job_criteria_previews (id, extracted_text, job_criteria, created_at) VALUES (?, ?, ?, ?)",
+        (preview_id, extracted_text, json.dumps(job_criteria), now)
+    )
+    db.commit()
+    return preview_id
+
+def get_job_criteria_preview(preview_id):
+    if not preview_id:
+        return None
+    row = get_db().execute(
+        "SELECT extracted_text, job_criteria FROM job_criteria_previews WHERE id = ?", (preview_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {'extracted_text': row["extracted_text"], 'job_criteria': json.loads(row["job_criteria"])}
+
+# Job queue helper functions
+def create_job(job_id, job_data):
+    """Insert a job, and register its idempotency key in the same transaction.
+    
+    Raises sqlite3.IntegrityError if the key is already held by another job
+    (an expired key is released first).
+    """
+    db = get_db()
+    payload = job_data.get('payload')
+    idempotency_key = job_data.get('idempotency_key')
+    try:
+        if idempotency_key:
+            now = time.time()
+            db.execute(
+                "DELETE FROM idempotency_keys WHERE idempotency_key = ? AND created_at <= ?",
+                (idempotency_key, now - current_app.config['IDEMPOTENCY_KEY_RETENTION_SECONDS'])
+            )
+            db.execute(
+                "INSERT INTO idempotency_keys (idempotency_key, job_id, request_hash, created_at) VALUES (?, ?, ?, ?)",
+                (idempotency_key, job_id, job_data.get('request_hash'), now)
+            )
+        db.execute(
+            "INSERT INTO analysis_jobs (job_id, status, progress, message, results_id, started_at, payload, attempts, max_attempts) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)",
+            (
+                job_id,
+                job_data.get('status'),
+                job_data.get('progress'),
+                job_data.get('message'),
+                job_data.get('results_id'),
+                job_data.get('started_at'),
+                json.dumps(payload) if payload is not None else None,
+                job_data.get('max_attempts', 3),
+            )
+        )
+        db.commit()
+    except sqlite3.Error:
+        db.rollback()
+        raise
+
+def get_job_by_idempotency_key(idempotency_key):
+    """Return {'job_id', 'request_hash'} for an unexpired idempotency key, or None."""
+    db = get_db()
+    row = db.execute(
+        "SELECT job_id, request_hash FROM idempotency_keys WHERE idempotency_key = ? AND created_at > ?",
+        (idempotency_key, time.time() - current_app.config['IDEMPOTENCY_KEY_RETENTION_SECONDS'])
+    ).fetchone()
+    return dict(row) if row else None
+
+# Last progress write per job, used to coalesce rapid progress ticks
+_progress_writes = {}
+_progress_writes_lock = threading.Lock()
+
+def update_job(job_id, job_data, coalesce=False):
+    """Update a job row and wake progress listeners.
+
+    With coalesce=True the write is skipped if the job was written less than
+    JOB_PROGRESS_WRITE_INTERVAL seconds ago. Use it for progress-only ticks
+    whose value is superseded by the next one; status changes should never
+    be coalesced.
+    """
+    now = time.monotonic()
+    with _progress_writes_lock:
+        last_write = _progress_writes.get(job_id)
+        if coalesce and last_write is not None and now - last_write < current_app.config['JOB_PROGRESS_WRITE_INTERVAL']:
+            return
+        if job_data.get('status') in ('completed', 'failed'):
+            _progress_writes.pop(job_id, None)
+        else:
+            _progress_writes[job_id] = now
+    
     db = get_db()
     fields = []
     values = []
@@ -93,6 +872,7 @@ def update_job(job_id, job_data):
     values.append(job_id)
     db.execute(f"UPDATE analysis_jobs SET {', '.join(fields)} WHERE job_id = ?", values)
     db.commit()
+    notify_job_update(job_id)
 
 def get_job(job_id):
     db = get_db()
@@ -102,6 +882,304 @@ def get_job(job_id):
 def clean_old_jobs():
     db = get_db()
     current_time = time.time()
-    # Delete jobs completed over 5 minutes ago or started more than 30 minutes ago
-    db.execute("DELETE FROM analysis_jobs WHERE (completed_at IS NOT NULL AND (? - completed_at) > 300) OR (? - started_at) > 1800", (current_time, current_time))
+    # Delete completed jobs finished over 5 minutes ago or started more than 30 minutes ago.
+    # Failed jobs are kept for JOB_FAILED_RETENTION_SECONDS so they can still be resumed.
+    # Queued and leased jobs are never removed here; lease expiry handles stuck workers.
+    db.execute(
+        "DELETE FROM analysis_jobs WHERE status = 'completed' AND ((completed_at IS NOT NULL AND (? - completed_at) > 300) OR (? - started_at) > 1800)",
+        (current_time, current_time)
+    )
+    db.execute(
+        "DELETE FROM analysis_jobs WHERE status = 'failed' AND (? - COALESCE(completed_at, started_at)) > ?",
+        (current_time, current_app.config['JOB_FAILED_RETENTION_SECONDS'])
+    )
+    db.execute(
+        "DELETE FROM idempotency_keys WHERE created_at <= ?",
+        (current_time - current_app.config['IDEMPOTENCY_KEY_RETENTION_SECONDS'],)
+    )
+    db.commit()
+
+def count_jobs_by_status():
+    """Return {status: number of jobs} for the analysis_jobs table."""
+    rows = get_db().execute("SELECT status, COUNT(*) AS n FROM analysis_jobs GROUP BY status").fetchall()
+    return {row["status"]: row["n"] for row in rows}
+
+# Queue claim/lease helpers used by app.worker
+def claim_job(worker_id, lease_seconds):
+    """Atomically lease the oldest runnable job to a worker.
+
+    A job is runnable when it is queued, or when it is processing but its
+    lease has expired (the worker that held it died). Jobs that have used up
+    their attempts are marked failed instead of being handed out again.
+    Returns the claimed job with its decoded payload, or None.
+    """
+    db = get_db()
+    db.commit()
+    while True:
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                """
+                SELECT * FROM analysis_jobs
+                WHERE status = 'queued'
+                   OR (status = 'processing' AND (lease_expires_at IS NULL OR lease_expires_at < ?))
+                ORDER BY started_at
+                LIMIT 1
+                """,
+                (now,)
+            ).fetchone()
+            if row is None:
+                db.commit()
+                return None
+            
+            job = dict(row)
+            attempts = job['attempts'] or 0
+            max_attempts = job['max_attempts'] or 1
+            if job['payload'] is None or attempts >= max_attempts:
+                reason = 'Job payload missing' if job['payload'] is None else f'Gave up after {attempts} attempts'
+                db.execute(
+                    "UPDATE analysis_jobs SET status = 'failed', message = ?, worker_id = NULL, lease_expires_at = NULL, completed_at = ? WHERE job_id = ?",
+                    (reason, now, job['job_id'])
+                )
+                db.commit()
+                notify_job_update(job['job_id'])
+                continue
+            
+            db.execute(
+                "UPDATE analysis_jobs SET status = 'processing', worker_id = ?, attempts = ?, lease_expires_at = ?, heartbeat_at = ? WHERE job_id = ?",
+                (worker_id, attempts + 1, now + lease_seconds, now, job['job_id'])
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        notify_job_update(job['job_id'])
+        
+        job.update({
+            'status': 'processing',
+            'worker_id': worker_id,
+            'attempts': attempts + 1,
+            'lease_expires_at': now + lease_seconds,
+            'heartbeat_at': now,
+            'payload': json.loads(job['payload']),
+        })
+        return job
+
+def heartbeat_job(job_id, worker_id, lease_seconds):
+    """Extend a job lease. Returns False if the worker no longer holds it."""
+    db = get_db()
+    now = time.time()
+    cursor = db.execute(
+        "UPDATE analysis_jobs SET heartbeat_at = ?, lease_expires_at = ? WHERE job_id = ? AND worker_id = ? AND status = 'processing'",
+        (now, now + lease_seconds, job_id, worker_id)
+    )
+    db.commit()
+    return cursor.rowcount > 0
+
+def release_job(job_id, worker_id, error):
+    """Give a job back after a worker error: requeue it, or fail it once out of attempts."""
+    db = get_db()
+    db.execute(
+        """
+        UPDATE analysis_jobs
+        SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+            completed_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END,
+            message = ?,
+            worker_id = NULL,
+            lease_expires_at = NULL
+        WHERE job_id = ? AND worker_id = ?
+        """,
+        (time.time(), str(error), job_id, worker_id)
+    )
+    db.commit()
+    notify_job_update(job_id)
+
+def resume_job(job_id):
+    """Requeue a failed job so a worker picks it up again.
+    
+    CVs that were already analyzed successfully are kept and skipped; only
+    the missing and failed ones are sent to the API again. Returns True if
+    the job was requeued.
+    """
+    db = get_db()
+    cursor = db.execute(
+        """
+        UPDATE analysis_jobs
+        SET status = 'queued',
+            attempts = 0,
+            message = 'Waiting for an analysis worker to resume...',
+            completed_at = NULL,
+            worker_id = NULL,
+            lease_expires_at = NULL
+        WHERE job_id = ? AND status = 'failed' AND payload IS NOT NULL
+        """,
+        (job_id,)
+    )
     db.commit()
+    if cursor.rowcount:
+        notify_job_update(job_id)
+    return cursor.rowcount > 0
+
+# Application settings helpers
+def get_setting(key, default=None):
+    db = get_db()
+    row = db.execute("SELECT value FROM app_settings WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else default
+
+def set_setting(key, value):
+    db = get_db()
+    db.execute(
+        "INSERT OR REPLACE INTO app_settings (key, value, updated_at) VALUES (?, ?, ?)",
+        (key, value, time.time())
+    )
+    db.commit()
+
+# Analysis cache helpers
+def make_analysis_cache_key(cv_text, revision_id, criteria_version):
+    """Hash the CV text together with everything that changes the analysis."""
+    digest = hashlib.sha256()
+    for part in (revision_id or '', criteria_version or '', cv_text or ''):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def get_cached_analysis(cache_key, ttl):
+    db = get_db()
+    now = time.time()
+    row = db.execute(
+        "SELECT response_data FROM analysis_cache WHERE cache_key = ? AND created_at > ?",
+        (cache_key, now - ttl)
+    ).fetchone()
+    if not row:
+        return None
+    db.execute("UPDATE analysis_cache SET last_used_at = ? WHERE cache_key = ?", (now, cache_key))
+    db.commit()
+    return json.loads(row["response_data"])
+
+def store_cached_analysis(cache_key, response_data, ttl, max_entries):
+    db = get_db()
+    now = time.time()
+    db.execute(
+        "INSERT OR REPLACE INTO analysis_cache (cache_key, response_data, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+        (cache_key, json.dumps(response_data), now, now)
+    )
+    # Evict expired entries, then the least recently used ones over the size bound
+    db.execute("DELETE FROM analysis_cache WHERE created_at <= ?", (now - ttl,))
+    db.execute(
+        "DELETE FROM analysis_cache WHERE cache_key IN (SELECT cache_key FROM analysis_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+        (max_entries,)
+    )
+    db.commit()
+
+# Near-duplicate helpers used by the analysis pipeline
+#
+# Signatures are only stored for CVs analyzed by the FastAgent API, under the
+# revision and job criteria they were analyzed against (analysis_key), and
+# are kept for as long as their analyses may be reused.
+
+def store_cv_signature(results_id, position, signature, band_hashes, analysis_key, retention_seconds):
+    """Record the MinHash signature of an analyzed CV and drop expired ones."""
+    db = get_db()
+    now = time.time()
+    db.execute("DELETE FROM cv_signature_bands WHERE batch_id = ? AND position = ?", (results_id, position))
+    db.execute(
+        "INSERT OR REPLACE INTO cv_signatures (batch_id, position, signature, analysis_key, created_at) VALUES (?, ?, ?, ?, ?)",
+        (results_id, position, signature, analysis_key, now)
+    )
+    db.executemany(
+        "INSERT INTO cv_signature_bands (band_hash, batch_id, position) VALUES (?, ?, ?)",
+        [(band_hash, results_id, position) for band_hash in band_hashes]
+    )
+    db.execute(
+        """
+        DELETE FROM cv_signature_bands WHERE (batch_id, position) IN (
+            SELECT batch_id, position FROM cv_signatures WHERE created_at <= ?
+        )
+        """,
+        (now - retention_seconds,)
+    )
+    db.execute("DELETE FROM cv_signatures WHERE created_at <= ?", (now - retention_seconds,))
+    db.commit()
+
+def find_signature_candidates(band_hashes, analysis_key, since, exclude_batch_id=None, limit=20):
+    """Return (batch ID, position, signature) of stored CVs sharing a band with the given hashes.
+    
+    Only CVs analyzed under analysis_key since the given time, whose stored
+    result succeeded, are returned; the caller verifies the similarity.
+    """
+    placeholders = ", ".join("?" * len(band_hashes))
+    rows = get_db().execute(
+        f"""
+        SELECT s.batch_id, s.position, s.signature
+        FROM cv_signatures s
+        JOIN analysis_cv_results r ON r.batch_id = s.batch_id AND r.position = s.position
+        WHERE (s.batch_id, s.position) IN (
+                SELECT batch_id, position FROM cv_signature_bands WHERE band_hash IN ({placeholders})
+            )
+          AND s.analysis_key = ? AND s.created_at > ? AND s.batch_id != ?
+          AND (r.status IS NULL OR r.status = 'ok')
+        ORDER BY s.created_at DESC
+        LIMIT ?
+        """,
+        list(band_hashes) + [analysis_key, since, exclude_batch_id or '', limit]
+    ).fetchall()
+    return [(row["batch_id"], row["position"], row["signature"]) for row in rows]
+
+# Rate limiter helpers used by app.services.rate_limiter
+RATE_LIMIT_FIELDS = (
+    'name', 'rpm', 'tpm', 'request_level', 'token_level', 'blocked_until',
+    'decreased_at', 'updated_at', 'granted_count', 'throttled_count'
+)
+
+def update_rate_limit(name, update):
+    """Read-modify-write the limiter state of one upstream under the write lock.
+    
+    update(state, now) gets the stored state as a dict (None for an upstream
+    seen for the first time) and returns (new_state, result). The new state
+    is saved and result is returned. Because the whole update runs inside
+    BEGIN IMMEDIATE, processes sharing the database never interleave.
+    """
+    db = get_db()
+    db.commit()
+    now = time.time()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        row = db.execute("SELECT * FROM rate_limits WHERE name = ?", (name,)).fetchone()
+        state, result = update(dict(row) if row else None, now)
+        state['name'] = name
+        db.execute(
+            f"INSERT OR REPLACE INTO rate_limits ({', '.join(RATE_LIMIT_FIELDS)}) "
+            f"VALUES ({', '.join(':' + field for field in RATE_LIMIT_FIELDS)})",
+            {field: state.get(field) for field in RATE_LIMIT_FIELDS}
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return result
+
+def get_rate_limit_blocked_until(name):
+    """Return when one upstream's Retry-After pause ends (0 if it was never paused)."""
+    row = get_db().execute("SELECT blocked_until FROM rate_limits WHERE name = ?", (name,)).fetchone()
+    return (row["blocked_until"] or 0.0) if row else 0.0
+
+def get_rate_limits():
+    """Return the stored limiter state of every upstream, keyed by name."""
+    rows = get_db().execute("SELECT * FROM rate_limits").fetchall()
+    return {row["name"]: dict(row) for row in rows}
+
+# Metrics helpers used by app.metrics
+def store_metrics_snapshot(source, data, retention):
+    """Replace one process's metrics snapshot and drop those of long-gone processes."""
+    db = get_db()
+    now = time.time()
+    db.execute(
+        "INSERT OR REPLACE INTO metrics_snapshots (source, data, updated_at) VALUES (?, ?, ?)",
+        (source, data, now)
+    )
+    db.execute("DELETE FROM metrics_snapshots WHERE updated_at < ?", (now - retention,))
+    db.commit()
+
+def get_metrics_snapshots():
+    return [row["data"] for row in get_db().execute("SELECT data FROM metrics_snapshots")]
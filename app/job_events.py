@@ -0,0 +1,54 @@
+"""
+In-process notifications for analysis job updates.
+
+update_job and the queue helpers in app.db call notify_job_update after every
+write, and the progress stream endpoint blocks in wait_for_job_update instead
+of polling the database. Notifications only reach listeners in the same
+process; listeners whose job runs in a separate worker process fall back to
+re-reading the job when the wait times out.
+
+Only the MAX_TRACKED_JOBS most recently updated jobs keep a counter, so
+worker processes, which have no listeners to call forget_job, do not keep one
+per job forever. A listener whose counter is evicted wakes and re-reads its
+job.
+"""
+
+import threading
+from collections import OrderedDict
+
+MAX_TRACKED_JOBS = 1000
+
+_condition = threading.Condition()
+_versions = OrderedDict()
+
+
+def notify_job_update(job_id):
+    """Wake everyone waiting on job_id."""
+    with _condition:
+        _versions[job_id] = _versions.get(job_id, 0) + 1
+        _versions.move_to_end(job_id)
+        while len(_versions) > MAX_TRACKED_JOBS:
+            _versions.popitem(last=False)
+        _condition.notify_all()
+
+
+def get_job_version(job_id):
+    """Return the current update counter for job_id."""
+    with _condition:
+        return _versions.get(job_id, 0)
+
+
+def wait_for_job_update(job_id, last_version, timeout):
+    """Block until job_id changes past last_version or timeout expires.
+
+    Returns the latest version, which equals last_version on timeout.
+    """
+    with _condition:
+        _condition.wait_for(lambda: _versions.get(job_id, 0) != last_version, timeout=timeout)
+        return _versions.get(job_id, 0)
+
+
+def forget_job(job_id):
+    """Drop the counter of a finished job."""
+    with _condition:
+        _versions.pop(job_id, None)
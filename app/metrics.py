@@ -0,0 +1,227 @@
+"""
+Prometheus metrics for the CV Analysis Tool.
+
+Counters and histograms are kept in memory by each process and written to
+the metrics_snapshots table at most every METRICS_FLUSH_INTERVAL seconds,
+so analysis workers running in separate processes are included. /metrics
+merges the snapshots of all processes, adds gauges read at scrape time (job
+queue depth, upstream rate limits) and renders the Prometheus text format.
+
+Record with inc(), observe() or the timed() context manager; every metric
+must be declared in METRICS first.
+"""
+
+import json
+import math
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+# Request latencies, in seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Pipeline stages and upstream calls, which take seconds to minutes
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# name: (type, help, label names, histogram buckets)
+METRICS = {
+    'cv_http_request_duration_seconds': (
+        'histogram', 'Time to answer a request, by route', ('method', 'endpoint', 'status'), REQUEST_BUCKETS),
+    'cv_analysis_stage_duration_seconds': (
+        'histogram', 'Time spent per analysis pipeline stage', ('stage',), STAGE_BUCKETS),
+    'cv_analysis_cvs_total': (
+        'counter', 'CVs analyzed, by outcome', ('outcome',), None),
+    'cv_upstream_request_duration_seconds': (
+        'histogram', 'Duration of calls to upstream APIs, including retries', ('upstream',), STAGE_BUCKETS),
+    'cv_upstream_responses_total': (
+        'counter', 'Upstream HTTP responses by status code, including retried ones', ('upstream', 'status'), None),
+    'cv_openai_tokens_total': (
+        'counter', 'Tokens reported by Azure OpenAI responses', ('kind',), None),
+}
+
+_lock = threading.Lock()
+# (name, label values) -> value for counters, [bucket counts..., sum, count] for histograms
+_values: Dict[Tuple[str, Tuple[str, ...]], object] = {}
+_pid = None
+_last_flush = 0.0
+
+
+def _label_values(name: str, labels: Dict[str, object]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(label, '')) for label in METRICS[name][2])
+
+
+def _reset_after_fork() -> None:
+    """Forked processes start with empty metrics; the parent reports its own."""
+    global _pid, _last_flush
+    if _pid != os.getpid():
+        _values.clear()
+        _pid = os.getpid()
+        _last_flush = 0.0
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    """Add amount to a counter."""
+    key = (name, _label_values(name, labels))
+    with _lock:
+        _reset_after_fork()
+        _values[key] = _values.get(key, 0) + amount
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Record one observation in a histogram."""
+    buckets = METRICS[name][3]
+    key = (name, _label_values(name, labels))
+    with _lock:
+        _reset_after_fork()
+        entry = _values.get(key)
+        if entry is None:
+            entry = _values[key] = [0] * len(buckets) + [0.0, 0]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                entry[i] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+
+@contextmanager
+def timed(name: str, **labels) -> Iterator[None]:
+    """Observe the duration of the with block in a histogram, even if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def _source() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def flush(force: bool = False) -> None:
+    """Write this process's metrics to the database if the flush interval has passed.
+
+    Must run inside an app context. Cheap to call often: between flushes it
+    only compares timestamps.
+    """
+    global _last_flush
+    from flask import current_app
+    from app.db import store_metrics_snapshot
+
+    config = current_app.config
+    now = time.time()
+    if not config['METRICS_ENABLED'] or (not force and now - _last_flush < config['METRICS_FLUSH_INTERVAL']):
+        return
+    with _lock:
+        _reset_after_fork()
+        data = [[name, list(label_values), value] for (name, label_values), value in _values.items()]
+        _last_flush = now
+    store_metrics_snapshot(_source(), json.dumps(data), config['METRICS_RETENTION_SECONDS'])
+
+
+def _merge_snapshots(snapshots: List[str]) -> Dict[Tuple[str, Tuple[str, ...]], object]:
+    merged = {}
+    for data in snapshots:
+        for name, label_values, value in json.loads(data):
+            if name not in METRICS:
+                # Written by a release that had metrics this one no longer declares
+                continue
+            key = (name, tuple(label_values))
+            if METRICS[name][0] == 'histogram':
+                if key not in merged:
+                    merged[key] = [0] * len(value)
+                merged[key] = [a + b for a, b in zip(merged[key], value)]
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{label}="{_escape(str(value))}"' for label, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _gauges() -> List[Tuple[str, str, List[Tuple[tuple, float]]]]:
+    """Read the gauges that describe current state rather than past events."""
+    from app.db import count_jobs_by_status
+    from app.services.rate_limiter import get_rate_limit_snapshot
+
+    jobs = count_jobs_by_status()
+    gauges = [(
+        'cv_analysis_jobs', 'Analysis jobs in the queue table, by status',
+        [((('status', status),), jobs.get(status, 0)) for status in ('queued', 'processing', 'completed', 'failed')]
+    )]
+    limits = get_rate_limit_snapshot()
+    for field, metric, help_text in (
+        ('max_requests_per_minute', 'cv_rate_limit_max_requests_per_minute', 'Configured requests/min budget (0 = unlimited)'),
+        ('requests_per_minute', 'cv_rate_limit_requests_per_minute', 'Current adaptive requests/min limit'),
+        ('max_tokens_per_minute', 'cv_rate_limit_max_tokens_per_minute', 'Configured tokens/min budget (0 = unlimited)'),
+        ('tokens_per_minute', 'cv_rate_limit_tokens_per_minute', 'Current adaptive tokens/min limit'),
+        ('blocked_for_seconds', 'cv_rate_limit_blocked_seconds', 'Seconds until a Retry-After pause ends'),
+        ('throttled_total', 'cv_rate_limit_throttled', 'Throttled (429) calls since the limiter state was created'),
+    ):
+        gauges.append((metric, help_text, [((('upstream', upstream),), values[field]) for upstream, values in limits.items()]))
+    return gauges
+
+
+def render_prometheus() -> str:
+    """Render the metrics of all processes in the Prometheus text format (0.0.4)."""
+    from app.db import get_metrics_snapshots
+
+    flush(force=True)
+    merged = _merge_snapshots(get_metrics_snapshots())
+    lines = []
+    for name, (metric_type, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for (metric_name, label_values), value in sorted(merged.items()):
+            if metric_name != name:
+                continue
+            pairs = list(zip(label_names, label_values))
+            if metric_type == 'histogram':
+                for bound, count in zip(buckets + (math.inf,), value[:len(buckets)] + [value[-1]]):
+                    lines.append(f"{name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {count}")
+                lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(value[-2])}")
+                lines.append(f"{name}_count{_format_labels(pairs)} {value[-1]}")
+            else:
+                lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+    for name, help_text, samples in _gauges():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for pairs, value in samples:
+            lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app) -> None:
+    """Time every request and flush this process's metrics as requests come in."""
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # Streamed responses (exports, SSE) are timed until their headers are ready
+            observe('cv_http_request_duration_seconds', time.perf_counter() - started,
+                    method=request.method, endpoint=request.endpoint or 'unmatched', status=response.status_code)
+        try:
+            flush()
+        except Exception as e:
+            app.logger.error(f"Failed to flush metrics: {str(e)}")
+        return response
@@ -5,5 +5,5 @@ Contains modules for API communication, OpenAI integration, and text extraction.
 
 # Import all service modules for easy access
 from app.services.api_client import APIClient
-from app.services.text_extraction import extract_text_from_file, extract_text_from_pdf, extract_text_from_docx
-from app.services.openai_client import summarize_cv_analyses, generate_interview_questions
\ No newline at end of file
+from app.services.text_extraction import ExtractionError, extract_text_from_file, extract_text_from_stream, extract_text_from_bytes, extract_text_from_pdf, extract_text_from_docx
+from app.services.openai_client import summarize_cv_analyses, generate_interview_questions, stream_cv_summary, stream_interview_questions
\ No newline at end of file
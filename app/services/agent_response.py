@@ -0,0 +1,79 @@
+"""
+Decoding of FastAgent analysis responses.
+
+A FastAgent analysis (``agent_response``) is a JSON string with one entry
+per agent, each nested several levels deep::
+
+    [{"__dict__": {"chat_name": "summary",
+                   "chat_response": {"chat_message": {"__dict__": {"content": "..."}}}}}, ...]
+
+It is decoded once, when the analysis arrives, into a compact mapping of
+agent name to content that is stored with the CV result. Prompt builders and
+exports read that mapping instead of decoding the raw text again.
+"""
+
+from typing import Dict, List, Optional
+
+import msgspec
+
+# Agents whose content makes up the analysis text sent to Azure OpenAI
+ANALYSIS_AGENTS = ("summary", "applicant_lookup_agent")
+
+
+class _MessageFields(msgspec.Struct):
+    content: Optional[str] = None
+
+
+class _ChatMessage(msgspec.Struct):
+    fields: Optional[_MessageFields] = msgspec.field(default=None, name="__dict__")
+
+
+class _ChatResponse(msgspec.Struct):
+    chat_message: Optional[_ChatMessage] = None
+
+
+class _AgentFields(msgspec.Struct):
+    chat_name: Optional[str] = None
+    chat_response: Optional[_ChatResponse] = None
+
+
+class _AgentEntry(msgspec.Struct):
+    fields: Optional[_AgentFields] = msgspec.field(default=None, name="__dict__")
+
+
+# Keys other than the ones above are skipped by the decoder without being built
+_decoder = msgspec.json.Decoder(List[_AgentEntry])
+
+
+def parse_agent_response(raw: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Decode a FastAgent response into a mapping of agent name to content.
+
+    Agents that answered more than once have their contents joined by
+    newlines; agents without content are left out.
+
+    Args:
+        raw: The agent_response text
+
+    Returns:
+        Agent contents in response order, or None if raw is not agent JSON
+        (for example an error message)
+    """
+    if not raw or not isinstance(raw, str):
+        return None
+    try:
+        entries = _decoder.decode(raw)
+    except msgspec.DecodeError:
+        return None
+
+    contents = {}
+    for entry in entries:
+        agent = entry.fields
+        if agent is None or not agent.chat_name or agent.chat_response is None:
+            continue
+        message = agent.chat_response.chat_message
+        content = message.fields.content if message is not None and message.fields is not None else None
+        if content:
+            name = agent.chat_name
+            contents[name] = (contents[name] + "\n" + content) if name in contents else content
+    return contents
@@ -3,12 +3,14 @@ API client for interacting with the FastAgent API.
 Handles authentication, CV submission, and feedback submission.
 """
 
-import requests
 import json
 import uuid
 from typing import Dict, Any, Optional
 from flask import current_app
 
+from app.services.http_session import get_http_session, request_timeout
+from app.services.rate_limiter import rate_limited
+
 class APIClient:
     """Client for interacting with the FastAgent API."""
 
@@ -36,7 +38,9 @@ class APIClient:
         try:
             # Use basic authentication from environment variables
             auth = (current_app.config['API_USERNAME'], current_app.config['API_PASSWORD'])
-            response = requests.post(url, json=payload, auth=auth)
+            with rate_limited('fastagent', prompt=cv_content,
+                              max_output_tokens=current_app.config['FASTAGENT_ESTIMATED_OUTPUT_TOKENS']):
+                response = get_http_session().post(url, json=payload, auth=auth, timeout=request_timeout())
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -58,7 +62,8 @@ class APIClient:
         try:
             # Use basic authentication
             auth = (current_app.config['API_USERNAME'], current_app.config['API_PASSWORD'])
-            response = requests.put(url, json=payload, auth=auth)
+            with rate_limited('fastagent'):
+                response = get_http_session().put(url, json=payload, auth=auth, timeout=request_timeout())
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -0,0 +1,150 @@
+"""
+Near-duplicate CV detection with MinHash signatures.
+
+Each CV's extracted text is reduced to a set of word shingles and summarized
+by a MinHash signature: NUM_PERMUTATIONS minimum hash values, of which the
+fraction two signatures share estimates the Jaccard similarity of their
+shingle sets. The PDF and DOCX exports of one CV, or a CV with minor edits,
+come out well above DEDUPE_THRESHOLD; different candidates far below it.
+
+Signatures are split into BANDS bands (locality-sensitive hashing), so
+candidate pairs are found by equal band hashes instead of comparing every
+pair, within a batch and against the signatures of recently analyzed CVs.
+"""
+
+import functools
+import hashlib
+import re
+import zlib
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity almost always share a band
+BANDS = 16
+SHINGLE_WORDS = 5
+# Shorter texts share too few shingles for the estimate to mean anything
+MIN_SHINGLES = 20
+
+_WORD = re.compile(r'\w+')
+
+
+@functools.lru_cache(maxsize=None)
+def _permutations() -> Tuple["np.ndarray", "np.ndarray"]:
+    """Return the multipliers and offsets of the NUM_PERMUTATIONS hash functions."""
+    # Imported on first use, so NumPy stays off the startup path
+    import numpy as np
+
+    # Fixed seed: signatures are stored and compared across processes and releases
+    rng = np.random.default_rng(0x5EED)
+    # Multiply-shift hashing; odd multipliers make each permutation a bijection mod 2**64
+    a = rng.integers(1, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+    return a, b
+
+
+def compute_signature(text: str) -> Optional["np.ndarray"]:
+    """
+    Compute the MinHash signature of a CV's text.
+
+    Args:
+        text: Extracted CV text
+
+    Returns:
+        NUM_PERMUTATIONS uint32 values, or None if the text has fewer than
+        MIN_SHINGLES distinct shingles and is never treated as a duplicate
+    """
+    words = _WORD.findall((text or '').lower())
+    shingles = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+
+    import numpy as np
+
+    a, b = _permutations()
+    hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    # Wrapping uint64 arithmetic is the point here
+    permuted = (hashes[:, None] * a + b) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: "np.ndarray", b: "np.ndarray") -> float:
+    """Estimate the Jaccard similarity of two CVs from their signatures."""
+    return float((a == b).sum()) / NUM_PERMUTATIONS
+
+
+def band_hashes(signature: "np.ndarray") -> List[int]:
+    """Hash each band of a signature to a signed 64-bit integer (an SQLite INTEGER)."""
+    rows = NUM_PERMUTATIONS // BANDS
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+            'little', signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+
+def signature_to_bytes(signature: "np.ndarray") -> bytes:
+    return signature.astype('<u4').tobytes()
+
+
+def signature_from_bytes(data: bytes) -> "np.ndarray":
+    import numpy as np
+
+    return np.frombuffer(data, dtype='<u4').astype(np.uint32)
+
+
+def find_batch_duplicates(signatures: Iterable[Tuple[int, "np.ndarray"]],
+                          threshold: float) -> Dict[int, Tuple[int, float]]:
+    """
+    Find near-duplicates among the CVs of one batch.
+
+    Each CV is matched against the earlier CVs that are not duplicates
+    themselves, so every group collapses onto its first CV.
+
+    Args:
+        signatures: (position, signature) pairs in upload order
+        threshold: Lowest estimated similarity that counts as a duplicate
+
+    Returns:
+        {position of duplicate: (position of the CV it duplicates, similarity)}
+    """
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    originals: Dict[int, "np.ndarray"] = {}
+    duplicates = {}
+    for position, signature in signatures:
+        hashes = band_hashes(signature)
+        candidates = {j for band, value in enumerate(hashes) for j in buckets.get((band, value), ())}
+        best = max(((similarity(signature, originals[j]), -j) for j in candidates), default=None)
+        if best is not None and best[0] >= threshold:
+            duplicates[position] = (-best[1], best[0])
+            continue
+        originals[position] = signature
+        for band, value in enumerate(hashes):
+            buckets.setdefault((band, value), []).append(position)
+    return duplicates
+
+
+def exclude_batch_duplicates(results: List[Dict], batch_id: Optional[str]) -> List[Dict]:
+    """
+    Drop the CVs that only repeat another CV of the same batch.
+
+    Used for the comparative summary, where such a CV would repeat its
+    original. Duplicates of CVs from earlier batches are kept, because their
+    original is not part of this batch.
+
+    Args:
+        results: CV results of one batch
+        batch_id: ID of that batch
+
+    Returns:
+        The results without in-batch duplicates, in their original order
+    """
+    return [
+        result for result in results
+        if (result.get("Duplicate Of") or {}).get("batch_id") != batch_id
+    ]
@@ -0,0 +1,195 @@
+"""
+Streaming export of analysis results as CSV, JSONL or XLSX.
+
+Each exporter takes the selected column names and an iterator of per-CV
+result dicts and yields encoded chunks, one row at a time, so an export
+never holds more than a row (plus the compressor window for XLSX) in
+memory and never touches the filesystem.
+"""
+
+import csv
+import io
+import json
+import re
+import zipfile
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+from xml.sax.saxutils import escape
+
+from app.services.openai_client import extract_analysis_content, extract_agent_contents
+
+# Prefix selecting one agent's content, e.g. "agent:applicant_lookup_agent"
+AGENT_COLUMN_PREFIX = "agent:"
+
+# Columns computed from a stored CV result
+EXPORT_COLUMNS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "CV Name": lambda result: result.get("CV Name", ""),
+    "Analysis": lambda result: result.get("Analysis", ""),
+    "Thread ID": lambda result: result.get("Thread ID", ""),
+    "Message ID": lambda result: result.get("Message ID", ""),
+    "Analysis Content": extract_analysis_content,
+}
+DEFAULT_EXPORT_COLUMNS = ["CV Name", "Analysis", "Thread ID", "Message ID"]
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+# Excel rejects cells longer than this
+XLSX_MAX_CELL_CHARS = 32767
+# Characters that are not allowed anywhere in an XML document
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f￾￿]")
+
+
+def parse_export_columns(values: Iterable[str]) -> List[str]:
+    """
+    Resolve the requested export columns.
+
+    Args:
+        values: Column names, each possibly a comma-separated list
+
+    Returns:
+        The selected columns in request order, or the defaults if none were given
+
+    Raises:
+        ValueError: If a column is unknown
+    """
+    columns = [name.strip() for value in values for name in value.split(",") if name.strip()]
+    for name in columns:
+        if name not in EXPORT_COLUMNS and not (name.startswith(AGENT_COLUMN_PREFIX) and len(name) > len(AGENT_COLUMN_PREFIX)):
+            raise ValueError(f"Unknown export column: {name}")
+    return columns or list(DEFAULT_EXPORT_COLUMNS)
+
+
+def row_values(result: Dict[str, Any], columns: List[str]) -> List[str]:
+    """Compute the values of the selected columns for one CV result."""
+    agent_contents = None
+    values = []
+    for name in columns:
+        if name.startswith(AGENT_COLUMN_PREFIX):
+            # Look the contents up at most once per row (older results decode the agent JSON)
+            if agent_contents is None:
+                agent_contents = extract_agent_contents(result)
+            values.append(agent_contents.get(name[len(AGENT_COLUMN_PREFIX):], ""))
+        else:
+            values.append(EXPORT_COLUMNS[name](result))
+    return values
+
+
+def iter_csv(columns: List[str], results: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Yield a CSV export row by row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for result in results:
+        writer.writerow(row_values(result, columns))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty batch
+    if buffer.getvalue():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_jsonl(columns: List[str], results: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Yield a JSON Lines export, one object per CV."""
+    for result in results:
+        yield (json.dumps(dict(zip(columns, row_values(result, columns))), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class _ChunkBuffer:
+    """Write-only, non-seekable sink that hands written bytes back in chunks.
+
+    zipfile detects that the sink cannot seek and writes data descriptors
+    after each member instead of patching local headers.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="CV Analysis" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_row(values: List[str]) -> bytes:
+    # Inline strings avoid a shared-strings table, which would have to be built in memory
+    cells = "".join(
+        '<c t="inlineStr"><is><t xml:space="preserve">'
+        + escape(_INVALID_XML_CHARS.sub("", str(value or ""))[:XLSX_MAX_CELL_CHARS])
+        + '</t></is></c>'
+        for value in values
+    )
+    return f"<row>{cells}</row>".encode("utf-8")
+
+
+def iter_xlsx(columns: List[str], results: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Yield a single-sheet XLSX workbook, compressing rows as they are written."""
+    sink = _ChunkBuffer()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        workbook.writestr("_rels/.rels", _XLSX_ROOT_RELS)
+        workbook.writestr("xl/workbook.xml", _XLSX_WORKBOOK)
+        workbook.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        yield sink.drain()
+
+        with workbook.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(columns))
+            for result in results:
+                sheet.write(_xlsx_row(row_values(result, columns)))
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+
+
+EXPORTERS = {
+    "csv": iter_csv,
+    "jsonl": iter_jsonl,
+    "xlsx": iter_xlsx,
+}
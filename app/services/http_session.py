@@ -0,0 +1,107 @@
+"""
+Shared HTTP session for calls to the FastAgent API and Azure OpenAI.
+
+Every outbound request goes through one pooled, keep-alive requests.Session
+per process, so TCP and TLS handshakes are paid once per connection rather
+than once per CV. The session retries 429 responses, and 5xx responses to
+idempotent requests, with exponential backoff plus jitter and honours
+Retry-After. A POST that failed with a 5xx is not resent: the upstream may
+already have started (and billed) the agent run. Every 429, retried or not, is
+reported to app.services.rate_limiter so the shared limits back off, and
+every response status is counted in app.metrics.
+"""
+
+import os
+import threading
+from typing import Tuple
+
+from flask import current_app
+
+from app.metrics import inc
+from app.services.rate_limiter import charge_retry, current_upstream, note_throttled
+
+# Upstream responses worth retrying: throttling and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _build_session(config) -> "requests.Session":
+    """Create a session with a sized connection pool and retry policy."""
+    # requests and urllib3 are imported on the first outbound call, not at startup
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class ThrottleReportingRetry(Retry):
+        """Retry policy that reports each 429, including the last one it gives up on,
+        and charges every retry to the rate limiter before it is sent."""
+
+        def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+            if response is not None and response.status == 429:
+                note_throttled(self.get_retry_after(response))
+            # Raises once out of retries; that final response is counted by count_response
+            retry = super().increment(method, url, response, error, _pool, _stacktrace)
+            if response is not None:
+                inc('cv_upstream_responses_total', upstream=current_upstream(), status=response.status)
+            charge_retry()
+            return retry
+
+        def is_retry(self, method, status_code, has_retry_after=False):
+            if status_code == 429:
+                # A throttled request was refused before any work started, so even a POST is safe to resend
+                return super().is_retry('GET', status_code, has_retry_after)
+            return super().is_retry(method, status_code, has_retry_after)
+
+    def count_response(response, *args, **kwargs):
+        inc('cv_upstream_responses_total', upstream=current_upstream(), status=response.status_code)
+
+    retry = ThrottleReportingRetry(
+        total=config['HTTP_MAX_RETRIES'],
+        connect=config['HTTP_MAX_RETRIES'],
+        # A read timeout may mean the upstream is still working on the request,
+        # so never resubmit it; only retry on connection failures and statuses.
+        read=0,
+        status=config['HTTP_MAX_RETRIES'],
+        status_forcelist=RETRY_STATUS_CODES,
+        # Idempotent methods only (urllib3's default); see is_retry for 429s
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        backoff_factor=config['HTTP_BACKOFF_FACTOR'],
+        backoff_jitter=config['HTTP_BACKOFF_JITTER'],
+        backoff_max=config['HTTP_BACKOFF_MAX'],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config['HTTP_POOL_CONNECTIONS'],
+        pool_maxsize=config['HTTP_POOL_SIZE'],
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.hooks['response'].append(count_response)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_http_session() -> "requests.Session":
+    """Return the process-wide session, creating it on first use.
+
+    The session is rebuilt after a fork so gunicorn workers and analysis
+    worker processes never share sockets with their parent.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session(current_app.config)
+                _session_pid = pid
+    return _session
+
+
+def request_timeout() -> Tuple[float, float]:
+    """Return the (connect, read) timeout tuple for upstream calls."""
+    return (current_app.config['HTTP_CONNECT_TIMEOUT'], current_app.config['HTTP_READ_TIMEOUT'])
@@ -3,10 +3,21 @@ Azure OpenAI client for summarizing multiple CV analyses and generating intervie
 """
 
 import json
-import requests
-from typing import List, Dict, Any, Optional
+import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Callable
 from flask import current_app
 
+from app.services.agent_response import ANALYSIS_AGENTS, parse_agent_response
+from app.services.http_session import get_http_session, request_timeout
+from app.services.rate_limiter import rate_limited
+from app.metrics import inc
+from app.services.tokens import count_tokens, truncate_to_tokens
+
+COMPARISON_INSTRUCTIONS = "Please compare the candidates based on their qualifications, experience, skills, and overall suitability for the position. Highlight the strongest candidates and explain why. Create a table comparing key aspects across all candidates and provide a final ranking with rationale."
+
 
 class AzureOpenAIClient:
     """Client for interacting with Azure OpenAI services."""
@@ -33,13 +44,6 @@ class AzureOpenAIClient:
         Returns:
             Generated content or None if there was an error
         """
-        url = f"{self.endpoint}/openai/deployments/{self.deployment_name}/chat/completions?api-version=2023-12-01-preview"
-        
-        headers = {
-            "Content-Type": "application/json",
-            "api-key": self.api_key
-        }
-        
         payload = {
             "messages": messages,
             "temperature": temperature,
@@ -47,9 +51,17 @@ class AzureOpenAIClient:
         }
         
         try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            response_data = response.json()
+            with rate_limited('azure_openai', prompt=_prompt_text(messages), max_output_tokens=max_tokens) as permit:
+                response = get_http_session().post(
+                    self._completions_url(), headers=self._headers(), json=payload, timeout=request_timeout()
+                )
+                response.raise_for_status()
+                response_data = response.json()
+                # Settle the estimate against the tokens actually billed
+                usage = response_data.get("usage") or {}
+                permit.used_tokens = usage.get("total_tokens")
+                inc('cv_openai_tokens_total', usage.get("prompt_tokens") or 0, kind='prompt')
+                inc('cv_openai_tokens_total', usage.get("completion_tokens") or 0, kind='completion')
             
             if "choices" in response_data and len(response_data["choices"]) > 0:
                 return response_data["choices"][0]["message"]["content"]
@@ -60,6 +72,71 @@ class AzureOpenAIClient:
         except Exception as e:
             current_app.logger.error(f"Azure OpenAI API Error: {str(e)}")
             return None
+    
+    def stream_chat_completion(self, 
+                              messages: List[Dict[str, str]], 
+                              temperature: float = 0.7, 
+                              max_tokens: int = 2000) -> Iterator[str]:
+        """
+        Stream a chat completion from Azure OpenAI as it is generated.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            temperature: Controls randomness (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+            
+        Yields:
+            Content deltas in the order they arrive
+            
+        Raises:
+            Exception: If the request fails or the stream ends before
+                [DONE]; the error is logged first
+        """
+        payload = {
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        
+        try:
+            with rate_limited('azure_openai', prompt=_prompt_text(messages), max_output_tokens=max_tokens), \
+                    get_http_session().post(
+                        self._completions_url(), headers=self._headers(), json=payload,
+                        timeout=request_timeout(), stream=True
+                    ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    for choice in json.loads(data).get("choices", []):
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            yield content
+                else:
+                    # The connection closed before [DONE]; the content is cut off
+                    raise ConnectionError("Stream ended before the completion finished")
+        except Exception as e:
+            current_app.logger.error(f"Azure OpenAI API Error: {str(e)}")
+            raise
+    
+    def _completions_url(self) -> str:
+        return f"{self.endpoint}/openai/deployments/{self.deployment_name}/chat/completions?api-version=2023-12-01-preview"
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "api-key": self.api_key
+        }
+
+
+def _prompt_text(messages: List[Dict[str, str]]) -> str:
+    """Join the message contents, for estimating the tokens of a request."""
+    return "\n".join(message.get("content") or "" for message in messages)
 
 
 def extract_analysis_content(analysis: Dict[str, Any]) -> str:
@@ -70,33 +147,36 @@ def extract_analysis_content(analysis: Dict[str, Any]) -> str:
         analysis: Dictionary containing CV analysis data
         
     Returns:
-        Extracted analysis text
+        The summary and applicant lookup contents, or the raw analysis if
+        it has neither
     """
-    try:
-        analysis_text = ""
-        analysis_data = json.loads(analysis.get("Analysis", "{}"))
-        
-        for header in analysis_data:
-            chat_dict = header.get('__dict__', {})
-            chat_name = chat_dict.get('chat_name', '')
-            
-            if chat_name in ["summary", "applicant_lookup_agent"]:
-                chat_response = chat_dict.get('chat_response', {})
-                chat_message = chat_response.get('chat_message', {})
-                content = chat_message.get('__dict__', {}).get('content', '')
-                
-                if content:
-                    analysis_text += content + "\n"
-        
-        # If we couldn't extract formatted content, use the raw analysis
-        if not analysis_text:
-            analysis_text = analysis.get("Analysis", "No analysis available")
-            
-    except Exception:
-        # Fallback to raw analysis if JSON parsing fails
-        analysis_text = analysis.get("Analysis", "No analysis available")
+    contents = extract_agent_contents(analysis)
+    analysis_text = "".join(
+        content + "\n" for chat_name, content in contents.items() if chat_name in ANALYSIS_AGENTS
+    )
+    
+    # If we couldn't extract formatted content, use the raw analysis
+    return analysis_text or analysis.get("Analysis", "No analysis available")
+
+
+def extract_agent_contents(analysis: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Extract the message content of every agent in a CV analysis.
+    
+    Uses the contents parsed when the analysis arrived; only results stored
+    before those were kept have their raw agent JSON decoded here.
+    
+    Args:
+        analysis: Dictionary containing CV analysis data
         
-    return analysis_text
+    Returns:
+        Mapping of agent (chat) name to its content; empty if the analysis
+        is not agent JSON
+    """
+    contents = analysis.get("Agent Contents")
+    if contents is None:
+        contents = parse_agent_response(analysis.get("Analysis")) or {}
+    return contents
 
 
 def build_comparison_prompt(analyses: List[Dict[str, Any]]) -> str:
@@ -109,34 +189,222 @@ def build_comparison_prompt(analyses: List[Dict[str, Any]]) -> str:
     Returns:
         Formatted prompt for OpenAI
     """
-    prompt = "Please provide a comprehensive comparison and summary of the following CV analyses:\n\n"
+    sections = [
+        (analysis.get("CV Name", "Unnamed CV"), extract_analysis_content(analysis))
+        for analysis in analyses
+    ]
+    return build_comparison_prompt_from_sections(sections)
+
+
+def build_comparison_prompt_from_sections(sections: List[Tuple[str, str]]) -> str:
+    """
+    Build a comparison prompt from (CV name, analysis text) pairs.
     
-    for analysis in analyses:
-        cv_name = analysis.get("CV Name", "Unnamed CV")
-        analysis_text = extract_analysis_content(analysis)
+    Args:
+        sections: Candidate names with their (possibly condensed) analysis text
         
+    Returns:
+        Formatted prompt for OpenAI
+    """
+    prompt = "Please provide a comprehensive comparison and summary of the following CV analyses:\n\n"
+    
+    for cv_name, analysis_text in sections:
         prompt += f"CV: {cv_name}\n"
         prompt += f"Analysis: {analysis_text}\n\n"
     
-    prompt += "Please compare the candidates based on their qualifications, experience, skills, and overall suitability for the position. Highlight the strongest candidates and explain why. Create a table comparing key aspects across all candidates and provide a final ranking with rationale."
+    prompt += COMPARISON_INSTRUCTIONS
     
     return prompt
 
 
-def build_interview_questions_prompt(analysis: Dict[str, Any]) -> str:
+def _run_completions_in_parallel(client: AzureOpenAIClient, 
+                                 message_lists: List[List[Dict[str, str]]], 
+                                 max_tokens: int,
+                                 on_complete: Optional[Callable[[int], None]] = None) -> List[Optional[str]]:
     """
-    Build a prompt for generating interview questions based on CV analysis.
+    Run several chat completions concurrently, keeping input order.
     
     Args:
-        analysis: Dictionary containing CV analysis data
+        client: Client used for every call
+        message_lists: One message list per completion
+        max_tokens: Maximum tokens to generate per completion
+        on_complete: Called with the number of finished completions after each
+            one finishes, from the pool's threads
         
     Returns:
-        Formatted prompt for OpenAI
+        Generated content per input, None where a call failed
+    """
+    app = current_app._get_current_object()
+    finished = 0
+    finished_lock = threading.Lock()
+    
+    def complete(messages):
+        nonlocal finished
+        with app.app_context():
+            content = client.get_chat_completion(messages=messages, temperature=0.3, max_tokens=max_tokens)
+        if on_complete is not None:
+            with finished_lock:
+                finished += 1
+                on_complete(finished)
+        return content
+    
+    max_workers = max(1, min(app.config['SUMMARY_MAX_WORKERS'], len(message_lists)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary') as executor:
+        return list(executor.map(complete, message_lists))
+
+
+def condense_analyses(client: AzureOpenAIClient, 
+                      analyses: List[Dict[str, Any]],
+                      on_progress: Optional[Callable[[str], None]] = None) -> List[Tuple[str, str]]:
+    """
+    Map step: condense every CV analysis into a short candidate profile.
+    
+    Args:
+        client: Client used for the condense calls
+        analyses: List of CV analysis dictionaries
+        on_progress: Called with a progress message after each condense call
+        
+    Returns:
+        (CV name, condensed analysis) pairs in the original order
+    """
+    config = current_app.config
+    # Leave room in each call for the instructions around the analysis
+    input_budget = config['SUMMARY_PROMPT_TOKEN_BUDGET'] - 500
+    output_budget = config['SUMMARY_CONDENSE_MAX_TOKENS']
+    
+    names = []
+    message_lists = []
+    for analysis in analyses:
+        cv_name = analysis.get("CV Name", "Unnamed CV")
+        analysis_text = truncate_to_tokens(extract_analysis_content(analysis), input_budget)
+        names.append(cv_name)
+        message_lists.append([
+            {
+                "role": "system",
+                "content": "You condense CV analyses for recruiters. Keep concrete facts: key skills, years of experience, notable achievements, gaps and how well the candidate meets the job criteria."
+            },
+            {
+                "role": "user",
+                "content": f"Condense this CV analysis into a compact candidate profile of at most {output_budget} tokens.\n\nCV: {cv_name}\nAnalysis: {analysis_text}"
+            }
+        ])
+    
+    def report(finished):
+        on_progress(f"Condensed {finished} of {len(message_lists)} CV analyses...")
+    
+    condensed = _run_completions_in_parallel(
+        client, message_lists, output_budget, on_complete=report if on_progress else None
+    )
+    
+    # Fall back to a truncated copy of the original analysis when a call fails
+    return [
+        (cv_name, text or truncate_to_tokens(extract_analysis_content(analysis), output_budget))
+        for cv_name, text, analysis in zip(names, condensed, analyses)
+    ]
+
+
+def merge_candidate_groups(client: AzureOpenAIClient, 
+                           sections: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Reduce step: pack candidates into groups that fit the prompt budget and
+    merge each group into one ranked shortlist.
+    
+    Args:
+        client: Client used for the merge calls
+        sections: (name, text) pairs from the previous tier
+        
+    Returns:
+        One (group label, ranked shortlist) pair per group
+    """
+    config = current_app.config
+    group_budget = config['SUMMARY_PROMPT_TOKEN_BUDGET'] - 500
+    output_budget = config['SUMMARY_MERGE_MAX_TOKENS']
+    
+    groups = []
+    current, current_tokens = [], 0
+    for cv_name, text in sections:
+        section_tokens = count_tokens(cv_name) + count_tokens(text) + 10
+        if current and current_tokens + section_tokens > group_budget:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append((cv_name, text))
+        current_tokens += section_tokens
+    if current:
+        groups.append(current)
+    
+    message_lists = []
+    for group in groups:
+        candidates = "\n\n".join(f"Candidate: {cv_name}\n{text}" for cv_name, text in group)
+        message_lists.append([
+            {
+                "role": "system",
+                "content": "You shortlist candidates for recruiters. Be factual and concise."
+            },
+            {
+                "role": "user",
+                "content": f"Rank the following candidates by suitability for the position. For each candidate give their name, a score out of 10 and a one-line rationale covering skills, experience and gaps. Keep the whole answer under {output_budget} tokens.\n\n{candidates}"
+            }
+        ])
+    
+    merged = _run_completions_in_parallel(client, message_lists, output_budget)
+    
+    results = []
+    for i, (group, text) in enumerate(zip(groups, merged), start=1):
+        if not text:
+            # Keep the candidates visible even if the merge call failed
+            text = "\n".join(f"{cv_name}: {truncate_to_tokens(body, 60)}" for cv_name, body in group)
+        label = f"Candidate group {i} ({', '.join(cv_name for cv_name, _ in group)})"
+        results.append((truncate_to_tokens(label, 200), text))
+    return results
+
+
+def reduce_analyses_for_summary(client: AzureOpenAIClient, 
+                                analyses: List[Dict[str, Any]],
+                                on_progress: Optional[Callable[[str], None]] = None) -> List[Tuple[str, str]]:
+    """
+    Shrink the analyses until the comparison prompt fits the token budget.
+    
+    Small batches pass through untouched. Larger batches are condensed per CV
+    in parallel and then merged in tiers of ranked shortlists, so every call
+    stays within SUMMARY_PROMPT_TOKEN_BUDGET no matter how many CVs there are.
+    
+    Args:
+        client: Client used for condense and merge calls
+        analyses: List of CV analysis dictionaries
+        on_progress: Called with a progress message as condense and merge
+            calls finish, possibly from other threads
+        
+    Returns:
+        (name, text) sections for build_comparison_prompt_from_sections
     """
-    cv_name = analysis.get("CV Name", "Unnamed CV")
-    analysis_text = extract_analysis_content(analysis)
+    budget = current_app.config['SUMMARY_PROMPT_TOKEN_BUDGET']
+    sections = [
+        (analysis.get("CV Name", "Unnamed CV"), extract_analysis_content(analysis))
+        for analysis in analyses
+    ]
+    if count_tokens(build_comparison_prompt_from_sections(sections)) <= budget:
+        return sections
     
-    prompt = f"""Generate 5 tailored interview questions for the candidate based on the following CV analysis:
+    if on_progress:
+        on_progress(f"Condensing {len(analyses)} CV analyses...")
+    sections = condense_analyses(client, analyses, on_progress)
+    
+    # Each merge tier shrinks the input by roughly budget / SUMMARY_MERGE_MAX_TOKENS
+    while count_tokens(build_comparison_prompt_from_sections(sections)) > budget and len(sections) > 1:
+        if on_progress:
+            on_progress(f"Merging {len(sections)} candidate profiles into shortlists...")
+        merged = merge_candidate_groups(client, sections)
+        if len(merged) >= len(sections):
+            # Budget too small to pair sections up; stop rather than loop forever
+            break
+        sections = merged
+    
+    return sections
+
+
+INTERVIEW_QUESTIONS_SYSTEM_PROMPT = "You are an AI assistant that helps recruiters prepare targeted interview questions. Your questions should help verify candidate claims, probe for deeper knowledge, and uncover potential fit issues. Be specific and professional."
+
+INTERVIEW_QUESTIONS_TEMPLATE = """Generate 5 tailored interview questions for the candidate based on the following CV analysis:
 
 CV: {cv_name}
 Analysis: {analysis_text}
@@ -149,40 +417,123 @@ Please include:
 
 Format the questions as a numbered list with brief explanations for why each question is important to ask.
 """
+
+# Returned by generate_interview_questions when the call fails; never stored
+INTERVIEW_QUESTIONS_FAILED = "Failed to generate interview questions due to an error."
+
+# Stored interview questions are keyed by this, so editing either prompt
+# above makes earlier questions stale instead of serving them forever
+INTERVIEW_QUESTIONS_PROMPT_VERSION = hashlib.sha256(
+    (INTERVIEW_QUESTIONS_SYSTEM_PROMPT + INTERVIEW_QUESTIONS_TEMPLATE).encode('utf-8')
+).hexdigest()[:12]
+
+
+def build_interview_questions_prompt(analysis: Dict[str, Any]) -> str:
+    """
+    Build a prompt for generating interview questions based on CV analysis.
     
-    return prompt
+    Args:
+        analysis: Dictionary containing CV analysis data
+        
+    Returns:
+        Formatted prompt for OpenAI
+    """
+    return INTERVIEW_QUESTIONS_TEMPLATE.format(
+        cv_name=analysis.get("CV Name", "Unnamed CV"),
+        analysis_text=extract_analysis_content(analysis)
+    )
 
 
-def generate_interview_questions(analysis: Dict[str, Any]) -> str:
+def build_interview_questions_messages(analysis: Dict[str, Any]) -> List[Dict[str, str]]:
     """
-    Generate tailored interview questions based on a CV analysis.
+    Build the chat messages for generating interview questions.
     
     Args:
         analysis: Dictionary containing CV analysis data
         
     Returns:
-        List of interview questions with explanations
+        System and user messages for the chat completion
     """
-    client = AzureOpenAIClient()
-    prompt = build_interview_questions_prompt(analysis)
+    system_message = {
+        "role": "system", 
+        "content": INTERVIEW_QUESTIONS_SYSTEM_PROMPT
+    }
+    
+    user_message = {
+        "role": "user",
+        "content": build_interview_questions_prompt(analysis)
+    }
+    
+    return [system_message, user_message]
+
+
+def build_summary_messages(client: AzureOpenAIClient, 
+                           analyses: List[Dict[str, Any]],
+                           on_progress: Optional[Callable[[str], None]] = None) -> List[Dict[str, str]]:
+    """
+    Build the chat messages for the comparative summary.
+    
+    Large batches are first reduced with reduce_analyses_for_summary, which
+    makes condense and merge calls through the client.
     
+    Args:
+        client: Client used for any condense and merge calls
+        analyses: List of CV analysis dictionaries
+        on_progress: Passed on to reduce_analyses_for_summary
+        
+    Returns:
+        System and user messages for the chat completion
+    """
     system_message = {
         "role": "system", 
-        "content": "You are an AI assistant that helps recruiters prepare targeted interview questions. Your questions should help verify candidate claims, probe for deeper knowledge, and uncover potential fit issues. Be specific and professional."
+        "content": "You are an AI assistant that helps compare and summarize multiple CV analyses for recruitment purposes. Provide detailed comparisons and clear recommendations."
     }
     
     user_message = {
         "role": "user",
-        "content": prompt
+        "content": build_comparison_prompt_from_sections(reduce_analyses_for_summary(client, analyses, on_progress))
     }
     
+    return [system_message, user_message]
+
+
+def generate_interview_questions(analysis: Dict[str, Any]) -> str:
+    """
+    Generate tailored interview questions based on a CV analysis.
+    
+    Args:
+        analysis: Dictionary containing CV analysis data
+        
+    Returns:
+        List of interview questions with explanations
+    """
+    client = AzureOpenAIClient()
+    
     result = client.get_chat_completion(
-        messages=[system_message, user_message],
+        messages=build_interview_questions_messages(analysis),
         temperature=0.7,
         max_tokens=1500
     )
     
-    return result if result else "Failed to generate interview questions due to an error."
+    return result if result else INTERVIEW_QUESTIONS_FAILED
+
+
+def stream_interview_questions(analysis: Dict[str, Any]) -> Iterator[str]:
+    """
+    Stream tailored interview questions as they are generated.
+    
+    Args:
+        analysis: Dictionary containing CV analysis data
+        
+    Yields:
+        Content deltas of the interview questions
+    """
+    client = AzureOpenAIClient()
+    return client.stream_chat_completion(
+        messages=build_interview_questions_messages(analysis),
+        temperature=0.7,
+        max_tokens=1500
+    )
 
 
 def summarize_cv_analyses(analyses: List[Dict[str, Any]]) -> str:
@@ -196,22 +547,55 @@ def summarize_cv_analyses(analyses: List[Dict[str, Any]]) -> str:
         Comprehensive summary and comparison of the CV analyses
     """
     client = AzureOpenAIClient()
-    prompt = build_comparison_prompt(analyses)
-    
-    system_message = {
-        "role": "system", 
-        "content": "You are an AI assistant that helps compare and summarize multiple CV analyses for recruitment purposes. Provide detailed comparisons and clear recommendations."
-    }
-    
-    user_message = {
-        "role": "user",
-        "content": prompt
-    }
     
     result = client.get_chat_completion(
-        messages=[system_message, user_message],
+        messages=build_summary_messages(client, analyses),
         temperature=0.7,
         max_tokens=2000
     )
     
-    return result if result else "Failed to generate summary due to an error."
\ No newline at end of file
+    return result if result else "Failed to generate summary due to an error."
+
+
+def stream_cv_summary(analyses: List[Dict[str, Any]]) -> Iterator[Tuple[str, str]]:
+    """
+    Stream the comparative summary of multiple CV analyses as it is generated.
+    
+    Large batches are condensed and merged before the summary itself can
+    start (see reduce_analyses_for_summary). That step runs on a helper
+    thread and its progress is yielded as it happens, so the stream is never
+    silent while the first summary token is still far off.
+    
+    Args:
+        analyses: List of CV analysis dictionaries
+        
+    Yields:
+        ('status', message) pairs while the analyses are prepared, then
+        ('delta', content delta) pairs of the summary
+    """
+    client = AzureOpenAIClient()
+    app = current_app._get_current_object()
+    updates = queue.Queue()
+    outcome = {}
+    
+    def prepare():
+        with app.app_context():
+            try:
+                outcome['messages'] = build_summary_messages(client, analyses, updates.put)
+            except Exception as e:
+                outcome['error'] = e
+            finally:
+                updates.put(None)
+    
+    yield 'status', f"Preparing {len(analyses)} CV analyses..."
+    thread = threading.Thread(target=prepare, name='summary-prepare', daemon=True)
+    thread.start()
+    for message in iter(updates.get, None):
+        yield 'status', message
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    
+    yield 'status', "Writing the summary..."
+    for delta in client.stream_chat_completion(messages=outcome['messages'], temperature=0.7, max_tokens=2000):
+        yield 'delta', delta
@@ -0,0 +1,279 @@
+"""
+Adaptive rate limiter for calls to the FastAgent API and Azure OpenAI.
+
+Each upstream has a requests-per-minute and a tokens-per-minute budget,
+enforced as token buckets whose state lives in the rate_limits table. Every
+web and worker process draws from the same buckets, so concurrent batches
+share the upstream quota instead of each bursting into it.
+
+The effective limits adapt (AIMD): every throttled (429) response cuts them
+by RATE_LIMIT_DECREASE_FACTOR, at most once per burst window, and every
+successful call adds back RATE_LIMIT_INCREASE_STEP of the configured budget.
+A Retry-After header pauses the upstream for all processes. Token costs
+are estimated with tiktoken before a call and corrected from the reported
+usage afterwards, where the upstream reports it.
+
+A budget of 0 means unlimited; Retry-After is still honoured. With both
+budgets of an upstream unlimited, calls only read its Retry-After pause
+(cached per process for a second) and write to the table only after a 429,
+so the shared write lock is not taken on every call. Retries sent by the
+shared HTTP session are charged to the buckets like the first attempt.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from flask import current_app
+
+from app.db import update_rate_limit, get_rate_limits, get_rate_limit_blocked_until
+from app.metrics import observe
+from app.services.tokens import count_tokens
+
+# Config keys of the (requests/min, tokens/min) budget of each upstream
+UPSTREAMS = {
+    'fastagent': ('FASTAGENT_MAX_REQUESTS_PER_MINUTE', 'FASTAGENT_MAX_TOKENS_PER_MINUTE'),
+    'azure_openai': ('AZURE_OPENAI_MAX_REQUESTS_PER_MINUTE', 'AZURE_OPENAI_MAX_TOKENS_PER_MINUTE'),
+}
+
+# The call in progress on this thread, so 429s seen by the HTTP retry policy reach its limiter
+_local = threading.local()
+
+# Per-process view of each unlimited upstream's Retry-After pause: upstream -> (checked at, blocked until)
+_blocked_cache: Dict[str, tuple] = {}
+_BLOCKED_CHECK_INTERVAL = 1.0
+
+
+class RateLimitTimeout(Exception):
+    """Raised when an upstream stays over its budget for longer than RATE_LIMIT_MAX_WAIT."""
+
+
+class Permit:
+    """One granted upstream call.
+
+    Callers set used_tokens once the upstream reports its real usage, so the
+    difference from the estimate is returned to the token bucket.
+    """
+
+    def __init__(self, upstream: str, tokens: int):
+        self.upstream = upstream
+        self.tokens = tokens
+        self.used_tokens: Optional[int] = None
+        self.throttled = False
+        self.retry_after: Optional[float] = None
+        # Whether the call draws from the buckets (a budget is set and limiting is on)
+        self.metered = False
+
+
+def _budgets(upstream: str):
+    requests_key, tokens_key = UPSTREAMS[upstream]
+    return float(current_app.config[requests_key]), float(current_app.config[tokens_key])
+
+
+def _refill(state: Dict[str, Any], now: float, max_rpm: float, max_tpm: float) -> Dict[str, Any]:
+    """Bring a stored state up to date: apply budget changes and refill both buckets."""
+    burst_seconds = current_app.config['RATE_LIMIT_BURST_SECONDS']
+    if state is None:
+        state = {'rpm': max_rpm, 'tpm': max_tpm, 'blocked_until': 0.0, 'decreased_at': 0.0,
+                 'updated_at': now, 'granted_count': 0, 'throttled_count': 0}
+    # Buckets that were unlimited when the state was written hold no usable level
+    unlimited = {'request_level': not state['rpm'], 'token_level': not state['tpm']}
+    # Budgets may have been reconfigured since the state was written
+    state['rpm'] = min(state['rpm'] or max_rpm, max_rpm)
+    state['tpm'] = min(state['tpm'] or max_tpm, max_tpm)
+
+    elapsed = max(0.0, now - (state['updated_at'] or now))
+    for level_key, rate in (('request_level', state['rpm']), ('token_level', state['tpm'])):
+        # Each bucket holds at most one burst window's worth of its rate
+        capacity = max(1.0, rate * burst_seconds / 60)
+        level = state.get(level_key)
+        # An unlimited bucket carries no debt into a budget configured later
+        if level is None or not rate or unlimited[level_key]:
+            state[level_key] = capacity
+        else:
+            state[level_key] = min(capacity, level + elapsed * rate / 60)
+    state['updated_at'] = now
+    return state
+
+
+def _try_acquire(upstream: str, tokens: int) -> float:
+    """Take one request and the given tokens if both buckets allow it.
+
+    Returns 0 when granted, otherwise the seconds to wait before trying again.
+    """
+    max_rpm, max_tpm = _budgets(upstream)
+    burst_seconds = current_app.config['RATE_LIMIT_BURST_SECONDS']
+
+    def update(state, now):
+        state = _refill(state, now, max_rpm, max_tpm)
+        wait = max(0.0, (state['blocked_until'] or 0) - now)
+        if state['rpm'] and state['request_level'] < 1:
+            wait = max(wait, (1 - state['request_level']) * 60 / state['rpm'])
+        if state['tpm']:
+            # A call larger than a whole burst goes through once the bucket is full, leaving it in debt
+            needed = min(tokens, state['tpm'] * burst_seconds / 60)
+            if state['token_level'] < needed:
+                wait = max(wait, (needed - state['token_level']) * 60 / state['tpm'])
+        if wait == 0:
+            # Only budgeted buckets are drawn from; unlimited ones never refill
+            if state['rpm']:
+                state['request_level'] -= 1
+            if state['tpm']:
+                state['token_level'] -= tokens
+            state['granted_count'] = (state['granted_count'] or 0) + 1
+        return state, wait
+
+    return update_rate_limit(upstream, update)
+
+
+def _blocked_for(upstream: str) -> float:
+    """Seconds left of an unlimited upstream's Retry-After pause, read at most once a second."""
+    now = time.monotonic()
+    cached = _blocked_cache.get(upstream)
+    if cached is None or now - cached[0] >= _BLOCKED_CHECK_INTERVAL:
+        cached = _blocked_cache[upstream] = (now, get_rate_limit_blocked_until(upstream))
+    return max(0.0, cached[1] - time.time())
+
+
+def _acquire(upstream: str, tokens: int, metered: bool) -> None:
+    """Block until the upstream has room for one call, or raise RateLimitTimeout."""
+    max_wait = current_app.config['RATE_LIMIT_MAX_WAIT']
+    deadline = time.monotonic() + max_wait
+    while True:
+        wait = _try_acquire(upstream, tokens) if metered else _blocked_for(upstream)
+        if wait == 0:
+            return
+        if time.monotonic() + wait > deadline:
+            raise RateLimitTimeout(f"{upstream} rate limit: no capacity within {max_wait}s")
+        # Jitter keeps waiting callers from retrying in lockstep
+        time.sleep(wait + random.uniform(0, 0.05))
+
+
+def _record_outcome(permit: Permit) -> None:
+    """Adapt the upstream's limits to how the call went and settle its token estimate."""
+    max_rpm, max_tpm = _budgets(permit.upstream)
+    config = current_app.config
+
+    def update(state, now):
+        state = _refill(state, now, max_rpm, max_tpm)
+        if permit.used_tokens is not None and permit.tokens:
+            state['token_level'] += permit.tokens - permit.used_tokens
+        if permit.throttled:
+            state['throttled_count'] = (state['throttled_count'] or 0) + 1
+            if permit.retry_after:
+                state['blocked_until'] = max(state['blocked_until'] or 0, now + permit.retry_after)
+            # Concurrent calls tend to be throttled together; cut once per burst window
+            if now - (state['decreased_at'] or 0) >= config['RATE_LIMIT_BURST_SECONDS']:
+                floor = config['RATE_LIMIT_MIN_FRACTION']
+                state['rpm'] = max(max_rpm * floor, state['rpm'] * config['RATE_LIMIT_DECREASE_FACTOR'])
+                state['tpm'] = max(max_tpm * floor, state['tpm'] * config['RATE_LIMIT_DECREASE_FACTOR'])
+                state['decreased_at'] = now
+        else:
+            step = config['RATE_LIMIT_INCREASE_STEP']
+            state['rpm'] = min(max_rpm, state['rpm'] + max_rpm * step)
+            state['tpm'] = min(max_tpm, state['tpm'] + max_tpm * step)
+        return state, None
+
+    update_rate_limit(permit.upstream, update)
+    if permit.retry_after:
+        # This process need not wait a second to see its own pause
+        _blocked_cache[permit.upstream] = (time.monotonic(), time.time() + permit.retry_after)
+
+
+@contextmanager
+def rate_limited(upstream: str, prompt: str = "", max_output_tokens: int = 0) -> Iterator[Permit]:
+    """Wait for room in an upstream's budgets, then hold it for one call.
+
+    Tokens are estimated as the prompt's tiktoken count plus the output
+    allowance, and only counted when a tokens-per-minute budget is set.
+
+    Args:
+        upstream: A key of UPSTREAMS
+        prompt: Text sent to the upstream
+        max_output_tokens: Most tokens the call may generate
+
+    Yields:
+        The Permit for the call
+
+    Raises:
+        RateLimitTimeout: If no room opens up within RATE_LIMIT_MAX_WAIT seconds
+    """
+    enabled = current_app.config['RATE_LIMIT_ENABLED']
+    max_rpm, max_tpm = _budgets(upstream)
+    tokens = count_tokens(prompt) + max_output_tokens if enabled and max_tpm else 0
+    permit = Permit(upstream, tokens)
+    permit.metered = enabled and bool(max_rpm or max_tpm)
+
+    if enabled:
+        _acquire(upstream, tokens, permit.metered)
+
+    _local.permit = permit
+    started = time.perf_counter()
+    try:
+        yield permit
+    finally:
+        _local.permit = None
+        observe('cv_upstream_request_duration_seconds', time.perf_counter() - started, upstream=upstream)
+        # Unlimited upstreams have nothing to adapt unless they were throttled
+        if enabled and (permit.metered or permit.throttled):
+            try:
+                _record_outcome(permit)
+            except Exception as e:
+                current_app.logger.error(f"Failed to update {upstream} rate limit: {str(e)}")
+
+
+def current_upstream() -> str:
+    """Name the upstream of the call running on this thread, for metrics labels."""
+    permit = getattr(_local, 'permit', None)
+    return permit.upstream if permit is not None else 'other'
+
+
+def charge_retry() -> None:
+    """Draw budget for a retry the shared HTTP session is about to send.
+
+    Called by the session's retry policy, on the thread of the call being
+    retried, so retries cannot push the real request rate past the budget.
+
+    Raises:
+        RateLimitTimeout: If no room opens up within RATE_LIMIT_MAX_WAIT seconds
+    """
+    permit = getattr(_local, 'permit', None)
+    if permit is not None and permit.metered:
+        _acquire(permit.upstream, permit.tokens, True)
+
+
+def note_throttled(retry_after: Optional[float]) -> None:
+    """Mark the call running on this thread as throttled (HTTP 429).
+
+    Called by the shared HTTP session for every 429, including those it
+    retries by itself.
+    """
+    permit = getattr(_local, 'permit', None)
+    if permit is not None:
+        permit.throttled = True
+        if retry_after:
+            permit.retry_after = max(permit.retry_after or 0, retry_after)
+
+
+def get_rate_limit_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Return the configured and current effective limits of every upstream."""
+    stored = get_rate_limits()
+    now = time.time()
+    snapshot = {}
+    for upstream in UPSTREAMS:
+        max_rpm, max_tpm = _budgets(upstream)
+        state = _refill(dict(stored[upstream]) if upstream in stored else None, now, max_rpm, max_tpm)
+        snapshot[upstream] = {
+            'max_requests_per_minute': max_rpm,
+            'max_tokens_per_minute': max_tpm,
+            'requests_per_minute': state['rpm'],
+            'tokens_per_minute': state['tpm'],
+            'available_requests': state['request_level'] if max_rpm else None,
+            'available_tokens': state['token_level'] if max_tpm else None,
+            'blocked_for_seconds': max(0.0, (state['blocked_until'] or 0) - now),
+            'granted_total': state['granted_count'] or 0,
+            'throttled_total': state['throttled_count'] or 0,
+        }
+    return snapshot
@@ -0,0 +1,209 @@
+"""
+Structured candidate scores, extracted from FastAgent analyses.
+
+Every analyzed CV gets a small score vector, parsed once from its agent
+contents when the analysis arrives and stored in columns of
+analysis_cv_results:
+
+- skills_match: how well the candidate's skills match the role, 0-100
+- experience_years: years of relevant experience
+- criteria_coverage: share of the job criteria the candidate meets, 0-100
+
+Ranking and filtering run on NumPy arrays of those columns, for one batch or
+for every stored CV, without calling an LLM. Scores an analysis does not
+state are stored as NULL; they fail every threshold on that score and rank
+last when sorting by it.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from app.db import SCORE_COLUMNS as SCORE_FIELDS, get_cv_scores, get_scores_version
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SORT_KEYS = ('overall',) + SCORE_FIELDS
+
+# Experience counts fully towards the overall score from this many years on
+EXPERIENCE_FULL_MARKS_YEARS = 10
+# Larger year counts are dates or typos, not experience
+MAX_EXPERIENCE_YEARS = 60
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?;])\s+|\n+')
+_RATIO = re.compile(r'(\d+(?:\.\d+)?)\s*(?:/|out of|of)\s*(\d+(?:\.\d+)?)', re.IGNORECASE)
+_PERCENT = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+_YEARS = re.compile(r'\b(\d{1,2}(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)\b', re.IGNORECASE)
+
+
+def _sentences(agent_contents: Dict[str, str], keywords: Sequence[str]) -> List[str]:
+    """Return the sentences of all agents that mention one of the keywords."""
+    matches = []
+    for content in agent_contents.values():
+        for sentence in _SENTENCE_SPLIT.split(content):
+            lowered = sentence.lower()
+            if any(keyword in lowered for keyword in keywords):
+                matches.append(sentence)
+    return matches
+
+
+def _find_percentage(sentences: List[str]) -> Optional[float]:
+    """Read the first 'N/M', 'N out of M', 'N of M' or 'N%' value as a percentage."""
+    for sentence in sentences:
+        for value, total in _RATIO.findall(sentence):
+            value, total = float(value), float(total)
+            if 0 < total and value <= total:
+                return round(value / total * 100, 1)
+        for value in _PERCENT.findall(sentence):
+            if float(value) <= 100:
+                return float(value)
+    return None
+
+
+def _find_years(sentences: List[str]) -> Optional[float]:
+    years = [float(value) for sentence in sentences for value in _YEARS.findall(sentence)]
+    years = [value for value in years if value <= MAX_EXPERIENCE_YEARS]
+    return max(years) if years else None
+
+
+def extract_scores(agent_contents: Dict[str, str]) -> Dict[str, Optional[float]]:
+    """
+    Extract the score vector of one CV from its agent contents.
+
+    Args:
+        agent_contents: Agent name to content, as parsed by
+            app.services.agent_response.parse_agent_response
+
+    Returns:
+        A value (or None) for every name in SCORE_FIELDS
+    """
+    if not agent_contents:
+        return dict.fromkeys(SCORE_FIELDS)
+    skills_match = _find_percentage(_sentences(agent_contents, ('skill',)))
+    if skills_match is None:
+        # Fall back to a general score or fit rating
+        skills_match = _find_percentage(_sentences(agent_contents, ('score', 'match', 'fit', 'rating')))
+    return {
+        'skills_match': skills_match,
+        'experience_years': _find_years(_sentences(agent_contents, ('experience', 'career', 'worked'))),
+        'criteria_coverage': _find_percentage(_sentences(agent_contents, ('criteri', 'requirement'))),
+    }
+
+
+class CandidateScores:
+    """The score columns of a set of CVs, as NumPy arrays."""
+
+    def __init__(self, rows: Sequence[Tuple]):
+        # Imported on first use; only ranking needs NumPy, not every process at startup
+        import numpy as np
+
+        columns = list(zip(*rows)) or [()] * (3 + len(SCORE_FIELDS))
+        self.batch_ids = columns[0]
+        self.positions = columns[1]
+        self.cv_names = columns[2]
+        # None becomes NaN, which fails every comparison
+        self.scores = np.column_stack([np.array(column, dtype=np.float64) for column in columns[3:]]) \
+            if rows else np.empty((0, len(SCORE_FIELDS)))
+
+        scaled = self.scores.copy()
+        experience = SCORE_FIELDS.index('experience_years')
+        scaled[:, experience] = np.minimum(scaled[:, experience], EXPERIENCE_FULL_MARKS_YEARS) / EXPERIENCE_FULL_MARKS_YEARS * 100
+        present = ~np.isnan(scaled)
+        counts = present.sum(axis=1)
+        self.overall = np.full(len(rows), np.nan)
+        np.divide(np.where(present, scaled, 0).sum(axis=1), counts, out=self.overall, where=counts > 0)
+
+    def __len__(self) -> int:
+        return len(self.cv_names)
+
+    def column(self, key: str) -> "np.ndarray":
+        if key == 'overall':
+            return self.overall
+        if key not in SCORE_FIELDS:
+            raise ValueError(f"Unknown score: {key}")
+        return self.scores[:, SCORE_FIELDS.index(key)]
+
+
+# (results ID or None for all batches) -> (version, CandidateScores)
+_tables: "OrderedDict[Optional[str], Tuple[Tuple, CandidateScores]]" = OrderedDict()
+_tables_lock = threading.Lock()
+_TABLES_CACHE_SIZE = 8
+
+
+def load_candidate_scores(results_id: Optional[str] = None) -> CandidateScores:
+    """
+    Load the scores of one batch, or of every batch, as arrays.
+
+    Arrays are kept per process and rebuilt only after a batch of the scope
+    has been written to, so repeated re-sorting does not re-read the table.
+
+    Args:
+        results_id: Batch to load; None for all stored batches
+    """
+    version = get_scores_version(results_id)
+    with _tables_lock:
+        cached = _tables.get(results_id)
+        if cached and cached[0] == version:
+            _tables.move_to_end(results_id)
+            return cached[1]
+
+    table = CandidateScores(get_cv_scores(results_id))
+    with _tables_lock:
+        _tables[results_id] = (version, table)
+        _tables.move_to_end(results_id)
+        while len(_tables) > _TABLES_CACHE_SIZE:
+            _tables.popitem(last=False)
+    return table
+
+
+def rank_candidates(table: CandidateScores, sort: str = 'overall',
+                    minimums: Optional[Dict[str, float]] = None,
+                    offset: int = 0, limit: int = 50) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Filter and rank scored CVs.
+
+    The overall score is the mean of the scores a CV has, with experience
+    scaled to 0-100 at EXPERIENCE_FULL_MARKS_YEARS.
+
+    Args:
+        table: Scores from load_candidate_scores
+        sort: One of SORT_KEYS; ranked highest first
+        minimums: Lowest accepted value per score (SORT_KEYS); CVs without
+            that score are excluded
+        offset: Number of ranked CVs to skip
+        limit: Most CVs to return
+
+    Returns:
+        (number of CVs that pass the filters, the requested page of them)
+
+    Raises:
+        ValueError: For an unknown sort key or score
+    """
+    import numpy as np
+
+    key = table.column(sort)
+    mask = np.ones(len(table), dtype=bool)
+    for field, minimum in (minimums or {}).items():
+        mask &= table.column(field) >= minimum
+
+    selected = np.flatnonzero(mask)
+    selected_key = key[selected]
+    # Highest first, CVs without the score last, ties in stored order
+    order = selected[np.argsort(-np.where(np.isnan(selected_key), -np.inf, selected_key), kind='stable')]
+    page = order[offset:offset + limit]
+
+    def score(value):
+        return None if np.isnan(value) else round(float(value), 1)
+
+    return len(order), [
+        {
+            'batch_id': table.batch_ids[i],
+            'position': table.positions[i],
+            'cv_name': table.cv_names[i],
+            'overall': score(table.overall[i]),
+            **{field: score(table.scores[i, j]) for j, field in enumerate(SCORE_FIELDS)},
+        }
+        for i in page
+    ]
@@ -1,42 +1,183 @@
 """
 Functions for extracting text from various document types.
+
+Extraction works on binary streams (BytesIO, werkzeug FileStorage or an open
+file), so uploads can be extracted straight from the request without being
+written to disk first. Documents that cannot be read raise ExtractionError
+instead of returning text, so an error message is never analyzed as a CV.
 """
 
 import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from io import BytesIO
-import docx2txt
-import pypdf
+from typing import BinaryIO, Callable, Iterator, Optional
 
 
-def extract_text_from_file(file_path: str) -> str:
-    """Extract text content from various file types."""
-    try:
-        file_extension = os.path.splitext(file_path)[1].lower()
+class ExtractionError(Exception):
+    """A document could not be read, had no text, or took too long to extract."""
+
+
+def extract_text_from_stream(stream: BinaryIO, filename: str, max_pages: Optional[int] = None,
+                             max_chars: Optional[int] = None) -> str:
+    """Extract text content from a binary stream, using filename to pick the format.
 
+    max_pages caps how many PDF pages are read and max_chars caps the length
+    of the returned text, so oversized documents cannot stall a batch.
+
+    Raises:
+        ExtractionError: If the format is unsupported, the document cannot be
+            parsed, or it contains no text
+    """
+    file_extension = os.path.splitext(filename)[1].lower()
+    try:
         if file_extension == ".pdf":
-            return extract_text_from_pdf(file_path)
+            text = extract_text_from_pdf(stream, max_pages=max_pages, max_chars=max_chars)
         elif file_extension == ".docx":
-            return extract_text_from_docx(file_path)
+            text = extract_text_from_docx(stream)[:max_chars]
         elif file_extension in [".txt", ".md", ".json"]:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            data = stream.read(max_chars * 4 if max_chars else -1)
+            text = data.decode('utf-8', errors='ignore')[:max_chars]
         else:
-            return f"Unsupported file type: {file_extension}"
+            raise ExtractionError(f"Unsupported file type: {file_extension}")
+    except ExtractionError:
+        raise
     except Exception as e:
-        return f"Error extracting text: {str(e)}"
+        raise ExtractionError(f"Could not extract text: {str(e) or type(e).__name__}") from e
+    if not text or not text.strip():
+        raise ExtractionError("No text could be extracted")
+    return text
 
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extract text from PDF file."""
-    with open(file_path, 'rb') as f:
-        pdf_reader = pypdf.PdfReader(f)
-        text = ""
-        for page_num in range(len(pdf_reader.pages)):
-            text += pdf_reader.pages[page_num].extract_text()
+def extract_text_from_bytes(data: bytes, filename: str, max_pages: Optional[int] = None,
+                            max_chars: Optional[int] = None) -> str:
+    """Extract text content from an in-memory upload."""
+    return extract_text_from_stream(BytesIO(data), filename, max_pages=max_pages, max_chars=max_chars)
 
-    return text
+
+def extract_text_from_file(file_path: str, max_pages: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """Extract text content from various file types."""
+    try:
+        f = open(file_path, 'rb')
+    except OSError as e:
+        raise ExtractionError(f"Could not extract text: {str(e)}") from e
+    with f:
+        return extract_text_from_stream(f, file_path, max_pages=max_pages, max_chars=max_chars)
+
+
+def iter_pdf_pages(source, max_pages: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of each PDF page in order, stopping after max_pages.
+
+    source is a file path or a seekable binary stream.
+    """
+    # Imported on first use; pypdf is the slowest import on the startup path
+    import pypdf
+
+    pdf_reader = pypdf.PdfReader(source)
+    page_count = len(pdf_reader.pages)
+    if max_pages:
+        page_count = min(page_count, max_pages)
+    for page_num in range(page_count):
+        yield pdf_reader.pages[page_num].extract_text() or ""
+
+
+def extract_text_from_pdf(source, max_pages: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """Extract text from a PDF file path or stream."""
+    pages = []
+    total_chars = 0
+    for page_text in iter_pdf_pages(source, max_pages=max_pages):
+        pages.append(page_text)
+        total_chars += len(page_text)
+        # Stop reading pages once the character budget is spent
+        if max_chars and total_chars >= max_chars:
+            break
+
+    text = "".join(pages)
+    return text[:max_chars] if max_chars else text
 
 
-def extract_text_from_docx(file_path: str) -> str:
-    """Extract text from DOCX file."""
-    return docx2txt.process(file_path)
\ No newline at end of file
+def extract_text_from_docx(source) -> str:
+    """Extract text from a DOCX file path or stream."""
+    import docx2txt
+
+    return docx2txt.process(source)
+
+
+# Process pool for CPU-bound extraction, so large PDFs are parsed outside the GIL
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool(processes: int) -> "ProcessPoolExecutor":
+    """Return the per-process extraction pool, creating it on first use.
+
+    Workers are spawned rather than forked, because the web and analysis
+    worker processes are multi-threaded.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                _pool = ProcessPoolExecutor(
+                    max_workers=processes,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                _pool_pid = pid
+    return _pool
+
+
+def recycle_extraction_pool() -> None:
+    """Stop the extraction pool's processes; the next extraction starts a new pool.
+
+    Used when an extraction times out: cancelling its future cannot stop a
+    parse that is already running, so the process has to be terminated.
+    Other extractions still running on the old pool fail with ExtractionError.
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is None:
+        return
+    # ProcessPoolExecutor has no public way to stop busy workers before 3.14
+    for process in list((getattr(pool, '_processes', None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_extraction(processes: int, extract: Callable[..., str], *args) -> Future:
+    """Start an extraction on the process pool, or run it inline when processes is 0.
+
+    extract must be a module-level function such as extract_text_from_bytes
+    so it can be sent to the pool. Collect the text with wait_for_extraction.
+    """
+    if processes > 0:
+        return get_extraction_pool(processes).submit(extract, *args)
+    future = Future()
+    try:
+        future.set_result(extract(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def wait_for_extraction(future: Future, timeout: Optional[float] = None) -> str:
+    """Return the extracted text.
+
+    Raises:
+        ExtractionError: If extraction failed or did not finish within timeout;
+            on a timeout the extraction pool is recycled
+    """
+    try:
+        return future.result(timeout=timeout)
+    except ExtractionError:
+        raise
+    except FutureTimeoutError as e:
+        if not future.cancel():
+            recycle_extraction_pool()
+        raise ExtractionError(f"Text extraction timed out after {timeout:g}s") from e
+    except Exception as e:
+        raise ExtractionError(f"Could not extract text: {str(e) or type(e).__name__}") from e
@@ -0,0 +1,76 @@
+"""
+SQLite-backed server-side sessions for the CV Analysis Tool.
+
+A drop-in replacement for Flask-Session's filesystem backend: sessions are
+stored as msgspec-encoded rows in the app database instead of one pickle
+file each, so loading and saving a session is a single indexed query on an
+already-open connection. Expired rows are swept on average every
+SESSION_CLEANUP_N_REQUESTS requests, and sessions larger than
+SESSION_MAX_BYTES are refused rather than stored. Large values (results,
+previews, interview questions) live in their own tables and the session only
+holds their IDs.
+"""
+
+import time
+from datetime import timedelta
+from typing import Optional
+
+from flask import Flask
+from flask_session.base import ServerSideSession, ServerSideSessionInterface
+
+from app.db import get_session_data, upsert_session, delete_session, delete_expired_sessions
+
+
+class SQLiteSession(ServerSideSession):
+    pass
+
+
+class SQLiteSessionInterface(ServerSideSessionInterface):
+    """Store sessions in the sessions table of the app database."""
+
+    session_class = SQLiteSession
+    # SQLite has no TTL, so the base class sweeps expired sessions for us
+    ttl = False
+
+    def __init__(self, app: Flask, max_bytes: int, **kwargs):
+        self.max_bytes = max_bytes
+        super().__init__(app, **kwargs)
+
+    def _retrieve_session_data(self, store_id: str) -> Optional[dict]:
+        data = get_session_data(store_id)
+        return self.serializer.decode(data) if data is not None else None
+
+    def _delete_session(self, store_id: str) -> None:
+        delete_session(store_id)
+
+    def _upsert_session(self, session_lifetime: timedelta, session: ServerSideSession, store_id: str) -> None:
+        data = self.serializer.encode(session)
+        if self.max_bytes and len(data) > self.max_bytes:
+            # Keep the previous version rather than let the session grow unbounded;
+            # large values belong in their own table, referenced by ID
+            self.app.logger.error(
+                f"Session {store_id} not saved: {len(data)} bytes exceeds SESSION_MAX_BYTES ({self.max_bytes})"
+            )
+            return
+        upsert_session(store_id, data, time.time() + session_lifetime.total_seconds())
+
+    def _delete_expired_sessions(self) -> None:
+        deleted = delete_expired_sessions()
+        if deleted:
+            self.app.logger.info(f"Removed {deleted} expired sessions")
+
+
+def init_session(app: Flask) -> None:
+    """Install the session backend selected by SESSION_BACKEND."""
+    if app.config['SESSION_BACKEND'] == 'sqlite':
+        app.session_interface = SQLiteSessionInterface(
+            app,
+            max_bytes=app.config['SESSION_MAX_BYTES'],
+            key_prefix=app.config.get('SESSION_KEY_PREFIX', 'session:'),
+            permanent=app.config['SESSION_PERMANENT'],
+            cleanup_n_requests=app.config['SESSION_CLEANUP_N_REQUESTS'],
+        )
+    else:
+        from flask_session import Session
+
+        Session(app)
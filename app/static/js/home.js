@@ -5,6 +5,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const progressBar = document.getElementById('upload-progress-bar');
     const progressStatus = document.getElementById('progress-status');
     const analyzeBtn = document.getElementById('analyze-btn');
+    const partialResultsLink = document.getElementById('partial-results-link');
+    const resumeBtn = document.getElementById('resume-btn');
     
     if (uploadForm) {
         console.log("Upload form found:", uploadForm);
@@ -33,6 +35,9 @@ document.addEventListener('DOMContentLoaded', function() {
             for (let i = 0; i < files.length; i++) {
                 formData.append('cv_files', files[i]);
             }
+            if (document.getElementById('bypass_cache').checked) {
+                formData.append('bypass_cache', 'true');
+            }
             
             const xhr = new XMLHttpRequest();
             
@@ -50,7 +55,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 } else if (xhr.status === 202) {
                     const data = JSON.parse(xhr.responseText);
                     const jobId = data.job_id;
-                    pollAnalysisProgress(jobId);
+                    streamAnalysisProgress(jobId);
                 } else {
                     progressStatus.textContent = 'Error: ' + xhr.statusText;
                     progressBar.classList.remove('bg-primary');
@@ -85,25 +90,100 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    function resultsUrl(jobId) {
+        return '/analysis/?job_id=' + encodeURIComponent(jobId);
+    }
+    
+    function handleProgress(data, onDone) {
+        if (data.status === 'queued' || data.status === 'processing') {
+            const percent = 30 + Math.round(data.progress * 70);
+            updateProgressBar(percent, data.message || 'Analyzing CVs...');
+            // Results are stored one CV at a time, so they can be viewed before the batch finishes
+            if (data.status === 'processing') {
+                partialResultsLink.href = resultsUrl(data.jobId);
+                partialResultsLink.classList.remove('d-none');
+            }
+        } else if (data.status === 'completed') {
+            onDone();
+            updateProgressBar(100, 'Analysis complete!');
+            // One final check stores the results ID in the session before redirecting
+            fetch('/analysis/check-progress?job_id=' + data.jobId)
+                .finally(() => { window.location.href = resultsUrl(data.jobId); });
+        } else if (data.status === 'failed' || data.status === 'not_found') {
+            onDone();
+            progressStatus.textContent = 'Analysis failed: ' + data.message;
+            progressBar.classList.remove('bg-primary');
+            progressBar.classList.add('bg-danger');
+            analyzeBtn.disabled = false;
+            if (data.status === 'failed') {
+                resumeBtn.dataset.jobId = data.jobId;
+                resumeBtn.classList.remove('d-none');
+            }
+        }
+    }
+    
+    if (resumeBtn) {
+        resumeBtn.addEventListener('click', function() {
+            const jobId = resumeBtn.dataset.jobId;
+            resumeBtn.disabled = true;
+            fetch('/analysis/resume?job_id=' + encodeURIComponent(jobId), {
+                method: 'POST',
+                headers: {'Accept': 'application/json'}
+            })
+                .then(response => response.json().then(data => ({ok: response.ok, data: data})))
+                .then(({ok, data}) => {
+                    if (!ok) {
+                        progressStatus.textContent = data.message;
+                        return;
+                    }
+                    // CVs analyzed before the failure are kept; only the rest are sent again
+                    resumeBtn.classList.add('d-none');
+                    analyzeBtn.disabled = true;
+                    progressBar.classList.remove('bg-danger');
+                    progressBar.classList.add('bg-primary');
+                    updateProgressBar(30, 'Resuming analysis...');
+                    streamAnalysisProgress(jobId);
+                })
+                .catch(error => {
+                    console.error('Error resuming analysis:', error);
+                })
+                .finally(() => { resumeBtn.disabled = false; });
+        });
+    }
+    
+    function streamAnalysisProgress(jobId) {
+        // Progress is pushed over server-sent events; fall back to polling without EventSource
+        if (!window.EventSource) {
+            pollAnalysisProgress(jobId);
+            return;
+        }
+        
+        const source = new EventSource('/analysis/progress-stream?job_id=' + encodeURIComponent(jobId));
+        let received = false;
+        
+        source.addEventListener('progress', function(e) {
+            received = true;
+            const data = JSON.parse(e.data);
+            data.jobId = jobId;
+            handleProgress(data, () => source.close());
+        });
+        
+        source.addEventListener('error', function() {
+            // EventSource reconnects by itself once a stream has worked; if it never did, poll instead
+            if (!received) {
+                source.close();
+                pollAnalysisProgress(jobId);
+            }
+        });
+    }
+    
     function pollAnalysisProgress(jobId) {
         const pollInterval = setInterval(function() {
             fetch('/analysis/check-progress?job_id=' + jobId)
                 .then(response => response.json())
                 .then(data => {
-                    if (data.status === 'processing') {
-                        const percent = 30 + Math.round(data.progress * 70);
-                        updateProgressBar(percent, data.message || 'Analyzing CVs...');
-                    } else if (data.status === 'completed') {
-                        clearInterval(pollInterval);
-                        updateProgressBar(100, 'Analysis complete!');
-                        window.location.href = "/analysis/";
-                    } else if (data.status === 'failed') {
-                        clearInterval(pollInterval);
-                        progressStatus.textContent = 'Analysis failed: ' + data.message;
-                        progressBar.classList.remove('bg-primary');
-                        progressBar.classList.add('bg-danger');
-                        analyzeBtn.disabled = false;
-                    }
+                    data.jobId = jobId;
+                    handleProgress(data, () => clearInterval(pollInterval));
                 })
                 .catch(error => {
                     console.error('Error polling progress:', error);
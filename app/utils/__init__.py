@@ -3,4 +3,5 @@ Utilities package for the CV Analysis Tool.
 Contains general helper functions.
 """
 
-from app.utils.helpers import convert_text_to_job_criteria_json, update_job_criteria_in_azure
\ No newline at end of file
+from app.utils.helpers import convert_text_to_job_criteria_json, update_job_criteria_in_azure, get_job_criteria_version
+from app.utils.rendering import render_markdown
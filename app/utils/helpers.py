@@ -3,9 +3,14 @@ General utility functions for the CV Analysis Tool.
 """
 
 import json
+import hashlib
 from typing import Dict, Any
 from flask import current_app
 
+from app.db import get_setting, set_setting
+
+JOB_CRITERIA_VERSION_KEY = 'job_criteria_version'
+
 
 def convert_text_to_job_criteria_json(text: str) -> Dict[str, Any]:
     """Convert extracted text from document to a simple job criteria JSON format.
@@ -42,6 +47,7 @@ def update_job_criteria_in_azure(job_criteria: Dict[str, Any]) -> bool:
         # Upload the content
         job_criteria_json = json.dumps(job_criteria, indent=2)
         blob_client.upload_blob(job_criteria_json, overwrite=True)
+        record_job_criteria_version(job_criteria)
 
         current_app.logger.info("Job criteria updated successfully!")
         return True
@@ -49,4 +55,20 @@ def update_job_criteria_in_azure(job_criteria: Dict[str, Any]) -> bool:
         current_app.logger.error(f"Error updating job criteria: {str(e)}")
         import traceback
         current_app.logger.error(f"Traceback: {traceback.format_exc()}")
-        return False
\ No newline at end of file
+        return False
+
+def record_job_criteria_version(job_criteria: Dict[str, Any]) -> str:
+    """Store a content hash of the active job criteria.
+
+    Cached CV analyses are keyed on this version, so updating the criteria
+    invalidates them.
+    """
+    canonical = json.dumps(job_criteria, sort_keys=True)
+    version = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+    set_setting(JOB_CRITERIA_VERSION_KEY, version)
+    return version
+
+
+def get_job_criteria_version() -> str:
+    """Return the version of the job criteria last uploaded from this app."""
+    return get_setting(JOB_CRITERIA_VERSION_KEY, '')
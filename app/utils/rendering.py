@@ -0,0 +1,54 @@
+"""
+Markdown rendering for templates.
+
+Analyses, summaries and interview questions never change once stored, but
+the ``markdown`` template filter used to rebuild the parser and its
+extensions and re-render them on every page view. Rendered HTML is now
+kept in a bounded per-process LRU keyed by a hash of the source text, and
+each thread reuses one Markdown instance.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import current_app
+
+MARKDOWN_EXTENSIONS = ['tables', 'fenced_code']
+
+_local = threading.local()
+_html_cache = OrderedDict()
+_html_cache_lock = threading.Lock()
+
+
+def _get_markdown():
+    """Return this thread's Markdown instance; instances are not thread-safe."""
+    md = getattr(_local, 'markdown', None)
+    if md is None:
+        # Imported on first use to keep it off the startup path
+        import markdown
+        md = _local.markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    return md
+
+
+def render_markdown(text: str) -> str:
+    """Convert markdown text to HTML, serving repeated texts from the cache."""
+    if not text:
+        return ""
+    key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    with _html_cache_lock:
+        html = _html_cache.get(key)
+        if html is not None:
+            _html_cache.move_to_end(key)
+            return html
+
+    md = _get_markdown()
+    html = md.convert(text)
+    # Clear per-document state (footnotes, references) before the next convert
+    md.reset()
+
+    with _html_cache_lock:
+        _html_cache[key] = html
+        _html_cache.move_to_end(key)
+        while len(_html_cache) > current_app.config['MARKDOWN_CACHE_SIZE']:
+            _html_cache.popitem(last=False)
+    return html
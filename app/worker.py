@@ -0,0 +1,166 @@
+"""
+Standalone analysis worker for the CV Analysis Tool.
+
+Web requests only enqueue jobs in the analysis_jobs table; workers claim them
+with a lease, keep the lease alive with heartbeats while the batch runs, and
+hand the job back for a retry if processing blows up. A job whose worker dies
+is picked up again once its lease expires.
+
+Run one or more workers next to the web app:
+
+    python -m app.worker --processes 4
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def make_worker_id():
+    """Build a worker ID that is unique across hosts, processes and threads."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _heartbeat(app, job_id, worker_id, stop_event):
+    """Keep a job lease alive until the job finishes."""
+    from app.db import heartbeat_job
+
+    interval = app.config['JOB_HEARTBEAT_SECONDS']
+    lease_seconds = app.config['JOB_LEASE_SECONDS']
+    with app.app_context():
+        while not stop_event.wait(interval):
+            try:
+                if not heartbeat_job(job_id, worker_id, lease_seconds):
+                    logger.warning(f"Lost lease on job {job_id}")
+                    return
+            except Exception as e:
+                logger.error(f"Heartbeat failed for job {job_id}: {str(e)}")
+
+
+def process_job(app, job, worker_id):
+    """Run a claimed job while a background thread heartbeats its lease."""
+    from app.blueprints.analysis import process_files_with_progress
+    from app.db import release_job
+
+    job_id = job['job_id']
+    payload = job['payload']
+    # Jobs queued by older releases list (filename, path) pairs under 'files'
+    cvs = payload.get('cvs') or [{'name': name, 'path': path} for name, path in payload.get('files', [])]
+    options = payload.get('options', {})
+
+    stop_event = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat,
+        args=(app, job_id, worker_id, stop_event),
+        name=f"heartbeat-{job_id[:8]}",
+        daemon=True
+    )
+    heartbeat.start()
+    try:
+        process_files_with_progress(app, job_id, cvs, options)
+    except Exception as e:
+        logger.error(f"Job {job_id} failed on attempt {job['attempts']}: {str(e)}")
+        with app.app_context():
+            release_job(job_id, worker_id, e)
+    finally:
+        stop_event.set()
+        heartbeat.join()
+
+
+def run_worker(app, worker_id=None, stop_event=None):
+    """Claim and process jobs until stop_event is set."""
+    from app.db import claim_job
+    from app.metrics import flush
+
+    worker_id = worker_id or make_worker_id()
+    stop_event = stop_event or threading.Event()
+    poll_interval = app.config['WORKER_POLL_INTERVAL']
+    lease_seconds = app.config['JOB_LEASE_SECONDS']
+
+    logger.info(f"Analysis worker {worker_id} started")
+    while not stop_event.is_set():
+        try:
+            with app.app_context():
+                # Publish metrics recorded since the last flush for /metrics
+                flush()
+                job = claim_job(worker_id, lease_seconds)
+        except Exception as e:
+            logger.error(f"Worker {worker_id} could not claim a job: {str(e)}")
+            job = None
+
+        if job is None:
+            stop_event.wait(poll_interval)
+            continue
+
+        logger.info(f"Worker {worker_id} claimed job {job['job_id']} (attempt {job['attempts']})")
+        process_job(app, job, worker_id)
+    logger.info(f"Analysis worker {worker_id} stopped")
+
+
+def start_embedded_worker(app):
+    """Run a worker on a daemon thread inside the web process.
+
+    Convenient for local development with ``python app.py``. Jobs are still
+    leased through the database, so a restart loses nothing.
+    """
+    thread = threading.Thread(
+        target=run_worker,
+        args=(app,),
+        name="embedded-analysis-worker",
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _worker_process():
+    from app import create_app
+
+    app = create_app()
+    try:
+        run_worker(app)
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process queued CV analysis jobs.")
+    parser.add_argument(
+        '--processes', type=int, default=1,
+        help="number of worker processes to run (default: 1)"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(processName)s %(levelname)s %(name)s: %(message)s"
+    )
+
+    if args.processes <= 1:
+        _worker_process()
+        return
+
+    processes = [
+        multiprocessing.Process(target=_worker_process, name=f"analysis-worker-{i+1}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
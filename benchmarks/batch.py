@@ -0,0 +1,331 @@
+"""
+End-to-end batch throughput benchmark for the CV Analysis Tool.
+
+Starts the local upstream stand-in (benchmarks/mock_upstream.py), generates
+synthetic PDF/DOCX corpora (benchmarks/corpus.py) and, for each corpus
+size, runs in a fresh interpreter:
+
+- ``pipeline``: extract_cv_documents followed by process_files_with_progress,
+  as an analysis worker runs a job;
+- ``routes``: the web flow through the Flask test client: upload, progress
+  polling while an in-process worker analyzes the batch, the results page,
+  CV detail pages, CSV/XLSX export, the batch API results and the streamed
+  summary.
+
+Each run uses a throwaway instance folder, so the app database is never
+touched, and reports throughput, p50/p95 latencies (per CV for the
+pipeline, per route for the web flow) and peak RSS. Run from the
+repository root:
+
+    python benchmarks/batch.py --sizes 10,100,1000 --latency-ms 200 --output results.json
+
+Results are printed as JSON.
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = ('pipeline', 'routes')
+# CV detail pages requested per routes run
+DETAIL_SAMPLE = 20
+
+
+def _child_env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT, BENCHMARKS, env.get('PYTHONPATH', '')])
+    # The routes scenario runs its own worker thread
+    env['EMBEDDED_WORKER'] = 'False'
+    return env
+
+
+def percentiles(values):
+    """Summarize latencies in seconds as milliseconds (nearest-rank p50/p95)."""
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+
+    def rank(q):
+        return values[min(len(values) - 1, max(0, int(round(q * len(values))) - 1))] * 1000
+
+    return {
+        'count': len(values),
+        'p50_ms': rank(0.50),
+        'p95_ms': rank(0.95),
+        'max_ms': values[-1] * 1000,
+        'mean_ms': statistics.fmean(values) * 1000,
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its (extraction pool) children."""
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return {'peak_rss_mb': own / 2**20, 'peak_children_rss_mb': children / 2**20}
+
+
+def make_app(spec, instance_path):
+    """Create the app against the mock upstream and a throwaway instance folder."""
+    from app import create_app
+
+    app = create_app()
+    app.instance_path = instance_path
+    upstream = spec['upstream_url']
+    app.config.update(
+        API_BASE_URL=upstream,
+        API_USERNAME='benchmark',
+        API_PASSWORD='benchmark',
+        AZURE_OPENAI_ENDPOINT=upstream,
+        AZURE_OPENAI_KEY='benchmark',
+        # Every CV must reach the upstream, or throughput measures the cache
+        ANALYSIS_CACHE_ENABLED=False,
+        ANALYSIS_MAX_WORKERS=spec['analysis_workers'],
+        TEXT_EXTRACTION_PROCESSES=spec['extraction_processes'],
+        WORKER_POLL_INTERVAL=0.05,
+        MAX_CONTENT_LENGTH=None,
+    )
+    return app
+
+
+def run_pipeline(spec, app, documents):
+    """Extract and analyze a corpus the way a worker processes a job."""
+    import app.blueprints.analysis as analysis
+    from app.db import create_job
+
+    # Time each CV through the unchanged analysis function
+    cv_latencies = []
+    analyze_single_cv = analysis.analyze_single_cv
+
+    def timed_analyze(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return analyze_single_cv(*args, **kwargs)
+        finally:
+            cv_latencies.append(time.perf_counter() - started)
+
+    analysis.analyze_single_cv = timed_analyze
+
+    job_id = str(uuid.uuid4())
+    with app.app_context():
+        started = time.perf_counter()
+        cvs = analysis.extract_cv_documents(documents)
+        extraction_seconds = time.perf_counter() - started
+        create_job(job_id, {
+            'status': 'processing', 'progress': 0, 'message': 'Benchmark', 'results_id': None,
+            'started_at': time.time(), 'payload': None, 'max_attempts': 1,
+        })
+
+    started = time.perf_counter()
+    analysis.process_files_with_progress(app, job_id, cvs, {'bypass_cache': True})
+    analysis_seconds = time.perf_counter() - started
+
+    with app.app_context():
+        from app.db import get_job
+        status = get_job(job_id)['status']
+
+    total_seconds = extraction_seconds + analysis_seconds
+    return {
+        'status': status,
+        'extraction_seconds': extraction_seconds,
+        'analysis_seconds': analysis_seconds,
+        'total_seconds': total_seconds,
+        'throughput_cvs_per_second': len(documents) / total_seconds if total_seconds else None,
+        'cv_latency': percentiles(cv_latencies),
+    }
+
+
+def run_routes(spec, app, documents):
+    """Drive the web flow through the test client while a worker thread analyzes the batch."""
+    from app.worker import run_worker
+
+    client = app.test_client()
+    latencies = {}
+
+    def request(name, method, url, consume=False, **kwargs):
+        started = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        if consume:
+            # Streamed responses (exports, SSE) are only done once fully read
+            for _ in response.response:
+                pass
+        latencies.setdefault(name, []).append(time.perf_counter() - started)
+        return response
+
+    stop_event = threading.Event()
+    worker = threading.Thread(target=run_worker, args=(app, 'benchmark', stop_event), daemon=True)
+    worker.start()
+    try:
+        batch_started = time.perf_counter()
+        response = request('upload', 'post', '/analysis/upload-cv', data={
+            'cv_files': [(io.BytesIO(data), filename) for filename, data in documents],
+            'bypass_cache': 'true',
+        }, content_type='multipart/form-data')
+        job_id = response.get_json()['job_id']
+
+        while True:
+            status = request('check_progress', 'get', f'/analysis/check-progress?job_id={job_id}').get_json()['status']
+            if status in ('completed', 'failed'):
+                break
+            time.sleep(spec['poll_interval'])
+        batch_seconds = time.perf_counter() - batch_started
+
+        request('analysis_index', 'get', f'/analysis/?job_id={job_id}')
+        step = max(1, len(documents) // DETAIL_SAMPLE)
+        for position in range(0, len(documents), step):
+            request('cv_detail', 'get', f'/cv/{position}')
+        request('ranking', 'get', '/analysis/ranking?sort=overall&min_skills_match=50', headers={'Accept': 'application/json'})
+        request('export_csv', 'get', '/analysis/export?format=csv', consume=True)
+        request('export_xlsx', 'get', '/analysis/export?format=xlsx', consume=True)
+        cursor = 0
+        while True:
+            page = request('api_results_page', 'get', f'/api/v1/batches/{job_id}/results?cursor={cursor}&limit=100').get_json()
+            cursor = page['next_cursor']
+            if not page['has_more']:
+                break
+        request('summary', 'get', '/summary/')
+        request('summary_stream', 'get', '/summary/stream', consume=True)
+    finally:
+        stop_event.set()
+        worker.join()
+
+    return {
+        'status': status,
+        'batch_seconds': batch_seconds,
+        'throughput_cvs_per_second': len(documents) / batch_seconds if batch_seconds else None,
+        'routes': {name: percentiles(values) for name, values in latencies.items()},
+    }
+
+
+def run_child(spec):
+    """Run one scenario on one corpus size; called in a fresh interpreter."""
+    from corpus import generate_corpus
+
+    documents = generate_corpus(spec['size'], seed=spec['seed'], docx_fraction=spec['docx_fraction'])
+    instance_path = tempfile.mkdtemp(prefix='cv-benchmark-')
+    try:
+        app = make_app(spec, instance_path)
+        runner = run_pipeline if spec['scenario'] == 'pipeline' else run_routes
+        result = runner(spec, app, documents)
+    finally:
+        shutil.rmtree(instance_path, ignore_errors=True)
+    if spec['extraction_processes'] > 0:
+        from app.services.text_extraction import get_extraction_pool
+
+        # Children only count towards RUSAGE_CHILDREN once they have exited
+        get_extraction_pool(spec['extraction_processes']).shutdown(wait=True)
+
+    result.update({
+        'scenario': spec['scenario'],
+        'cvs': spec['size'],
+        'corpus_mb': sum(len(data) for _, data in documents) / 2**20,
+    })
+    result.update(peak_rss_mb())
+    return result
+
+
+def start_mock_upstream(args):
+    """Start benchmarks/mock_upstream.py on a free port; return (process, base URL)."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARKS, 'mock_upstream.py'), '--port', '0',
+         '--latency-ms', str(args.latency_ms), '--latency-jitter-ms', str(args.latency_jitter_ms),
+         '--error-rate', str(args.error_rate), '--throttle-rate', str(args.throttle_rate),
+         '--stream-chunk-ms', str(args.stream_chunk_ms)],
+        stdout=subprocess.PIPE, text=True
+    )
+    port = json.loads(process.stdout.readline())['port']
+    return process, f"http://127.0.0.1:{port}"
+
+
+def upstream_stats(url):
+    with urllib.request.urlopen(f"{url}/stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark batch analysis against a local upstream stand-in.")
+    parser.add_argument('--sizes', default='10,100,1000', help="comma-separated corpus sizes (default: 10,100,1000)")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="pipeline and/or routes (default: both)")
+    parser.add_argument('--latency-ms', type=float, default=200, help="mean upstream latency (default: 200)")
+    parser.add_argument('--latency-jitter-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of upstream calls failing with 500")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="fraction of upstream calls throttled with 429")
+    parser.add_argument('--stream-chunk-ms', type=float, default=2, help="delay between streamed completion chunks")
+    parser.add_argument('--analysis-workers', type=int, default=4, help="ANALYSIS_MAX_WORKERS (default: 4)")
+    parser.add_argument('--extraction-processes', type=int, default=2, help="TEXT_EXTRACTION_PROCESSES (default: 2)")
+    parser.add_argument('--docx-fraction', type=float, default=0.5, help="share of DOCX files in the corpus")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(json.loads(args.child))))
+        return 0
+
+    mock, upstream_url = start_mock_upstream(args)
+    try:
+        runs = []
+        for size in [int(size) for size in args.sizes.split(',') if size]:
+            for scenario in [s for s in args.scenarios.split(',') if s]:
+                if scenario not in SCENARIOS:
+                    parser.error(f"unknown scenario: {scenario}")
+                spec = {
+                    'scenario': scenario,
+                    'size': size,
+                    'seed': args.seed,
+                    'docx_fraction': args.docx_fraction,
+                    'upstream_url': upstream_url,
+                    'analysis_workers': args.analysis_workers,
+                    'extraction_processes': args.extraction_processes,
+                    'poll_interval': 0.1,
+                }
+                completed = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--child', json.dumps(spec)],
+                    cwd=ROOT, env=_child_env(), capture_output=True, text=True, check=True
+                )
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+                print(f"{scenario} x {size}: {result['throughput_cvs_per_second']:.1f} CVs/s", file=sys.stderr)
+                runs.append(result)
+        stats = upstream_stats(upstream_url)
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    report = {
+        'python': sys.version.split()[0],
+        'upstream': {
+            'latency_ms': args.latency_ms,
+            'latency_jitter_ms': args.latency_jitter_ms,
+            'error_rate': args.error_rate,
+            'throttle_rate': args.throttle_rate,
+            'requests': stats,
+        },
+        'analysis_workers': args.analysis_workers,
+        'extraction_processes': args.extraction_processes,
+        'runs': runs,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Synthetic CV corpora for benchmarks.
+
+Generates realistic-length CVs as PDF and DOCX files without any third-party
+writer: PDFs use the base Helvetica font and one text stream per page, and
+DOCX files are the minimal WordprocessingML package docx2txt reads. Output
+is deterministic for a given seed, so runs are comparable.
+
+    python benchmarks/corpus.py --count 100 --out /tmp/cvs
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import zipfile
+from xml.sax.saxutils import escape
+
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn']
+LAST_NAMES = ['Nguyen', 'Smith', 'Patel', 'Garcia', 'Chen', 'Williams', 'Kumar', 'Brown', 'Singh', 'Lee']
+ROLES = ['Software Engineer', 'Data Analyst', 'Project Manager', 'HR Business Partner', 'Cloud Architect',
+         'Product Owner', 'QA Engineer', 'Business Analyst']
+SKILLS = ['Python', 'SQL', 'Azure', 'Kubernetes', 'Stakeholder management', 'Agile delivery', 'Power BI',
+          'Recruitment', 'Terraform', 'Java', 'Change management', 'Data modelling', 'REST APIs', 'Coaching']
+COMPANIES = ['Contoso', 'Fabrikam', 'Northwind', 'Tailspin', 'Woodgrove', 'Litware', 'Adventure Works']
+SENTENCES = [
+    "Led a team of {n} engineers delivering a {skill} platform used across the business.",
+    "Reduced processing time by {n}% by redesigning the {skill} pipeline.",
+    "Owned stakeholder communication for a programme with a budget of ${n}m.",
+    "Mentored {n} junior colleagues and introduced {skill} practices to the team.",
+    "Migrated {n} legacy services to {skill}, improving reliability and cost.",
+    "Designed reporting in {skill} adopted by {n} departments.",
+]
+
+
+def cv_lines(rng, index, paragraphs=12):
+    """Return the lines of one synthetic CV."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        f"{name} - Curriculum Vitae (#{index})",
+        f"{rng.choice(ROLES)} | {name.lower().replace(' ', '.')}@example.com",
+        "",
+        "Skills: " + ", ".join(rng.sample(SKILLS, 6)),
+        "",
+        "Experience",
+    ]
+    for _ in range(paragraphs):
+        lines.append(f"{rng.choice(ROLES)} at {rng.choice(COMPANIES)} ({rng.randint(2005, 2024)})")
+        for _ in range(3):
+            lines.append(rng.choice(SENTENCES).format(n=rng.randint(2, 40), skill=rng.choice(SKILLS)))
+    lines += ["", "Education", f"Bachelor of {rng.choice(['Science', 'Commerce', 'Engineering'])}, {rng.randint(1995, 2020)}"]
+    return lines
+
+
+def _pdf_text(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(lines, lines_per_page=40):
+    """Encode lines as a minimal multi-page PDF."""
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    font_id = 3 + 2 * len(pages)
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        ('<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            ' '.join(f'{3 + 2 * i} 0 R' for i in range(len(pages))), len(pages))).encode(),
+    ]
+    for i, page in enumerate(pages):
+        objects.append((
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R '
+            f'/Resources << /Font << /F1 {font_id} 0 R >> >> >>'
+        ).encode())
+        text = ' T* '.join(f'({_pdf_text(line)}) Tj' for line in page)
+        stream = f'BT /F1 10 Tf 14 TL 50 750 Td {text} ET'.encode('latin-1', 'replace')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+    objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % number + obj + b'\nendobj\n')
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    out.write(b''.join(b'%010d 00000 n \n' % offset for offset in offsets))
+    out.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+
+def make_docx(lines):
+    """Encode lines as a minimal DOCX package, one paragraph per line."""
+    paragraphs = ''.join(f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>' for line in lines)
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{paragraphs}</w:body></w:document>'
+    )
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', DOCX_CONTENT_TYPES)
+        package.writestr('_rels/.rels', DOCX_RELS)
+        package.writestr('word/document.xml', document)
+    return out.getvalue()
+
+
+def generate_corpus(count, seed=0, docx_fraction=0.5):
+    """Return count (filename, bytes) pairs, mixing PDF and DOCX files."""
+    rng = random.Random(seed)
+    documents = []
+    for index in range(count):
+        lines = cv_lines(rng, index, paragraphs=rng.randint(6, 18))
+        if rng.random() < docx_fraction:
+            documents.append((f'cv_{index:05d}.docx', make_docx(lines)))
+        else:
+            documents.append((f'cv_{index:05d}.pdf', make_pdf(lines)))
+    return documents
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic CV corpus to a directory.")
+    parser.add_argument('--count', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--docx-fraction', type=float, default=0.5)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    for filename, data in generate_corpus(args.count, args.seed, args.docx_fraction):
+        with open(os.path.join(args.out, filename), 'wb') as f:
+            f.write(data)
+    print(f"Wrote {args.count} CVs to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
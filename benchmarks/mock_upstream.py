@@ -0,0 +1,220 @@
+"""
+Local stand-in for the FastAgent API and Azure OpenAI, for benchmarks.
+
+Serves the three endpoints the app calls:
+
+- ``POST /chat``: a FastAgent analysis, shaped like the real multi-agent
+  response (``agent_response`` is a JSON string of agent messages);
+- ``PUT /messages/<id>/feedback``;
+- ``POST /openai/deployments/<name>/chat/completions``: a chat completion
+  with usage, or a server-sent event stream when ``"stream": true``.
+
+Latency, error and throttling rates are configurable, so the app's retry,
+rate-limit and concurrency paths can be exercised without live endpoints.
+Point the app at it with API_BASE_URL=http://127.0.0.1:<port> and
+AZURE_OPENAI_ENDPOINT=http://127.0.0.1:<port>.
+
+    python benchmarks/mock_upstream.py --port 8900 --latency-ms 800 --error-rate 0.01
+
+On startup one JSON line with the bound port is printed to stdout, so a
+parent process can start it with --port 0 and read the port back.
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FEEDBACK_PATH = re.compile(r'^/messages/[^/]+/feedback$')
+COMPLETIONS_PATH = re.compile(r'^/openai/deployments/[^/]+/chat/completions$')
+
+SUMMARY_TEXT = (
+    "## Candidate comparison\n\n"
+    "| Candidate | Experience | Fit |\n|---|---|---|\n"
+    "| Candidate A | 8 years | Strong |\n| Candidate B | 3 years | Moderate |\n\n"
+    "Candidate A is the strongest match for the role, with directly relevant "
+    "leadership experience and a complete skill set. "
+) * 4
+
+
+def agent_message(chat_name, content):
+    """One agent entry of a FastAgent response, in the shape the app parses."""
+    return {'__dict__': {
+        'chat_name': chat_name,
+        'chat_response': {'chat_message': {'__dict__': {'content': content}}},
+    }}
+
+
+def fastagent_response(cv_text):
+    """Build a deterministic analysis for a CV, scored from its text."""
+    score = 40 + sum(cv_text.encode('utf-8')) % 60
+    words = len(cv_text.split())
+    years = 1 + score % 15
+    agents = [
+        agent_message('applicant_lookup_agent', f"Candidate profile extracted from {words} words of CV text."),
+        agent_message('skills_agent', f"Skills: Python, SQL, stakeholder management, cloud architecture. Skills match: {score}%."),
+        agent_message('experience_agent', f"{years} years of relevant experience. Meets {score * 8 // 100} of 8 job criteria."),
+        agent_message('summary', f"The candidate is a {'strong' if score >= 70 else 'possible'} fit (score {score}/100)."),
+    ]
+    return {
+        'agent_response': json.dumps(agents),
+        'thread_id': str(uuid.uuid4()),
+        'message_id': str(uuid.uuid4()),
+    }
+
+
+class MockUpstreamHandler(BaseHTTPRequestHandler):
+    # Settings are attached to the server; see make_server
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(body) if body else {}
+        except ValueError:
+            return {}
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate(self):
+        """Sleep for the configured latency; return an error status to send instead, if any."""
+        settings = self.server.settings
+        with self.server.stats_lock:
+            self.server.stats['requests'] += 1
+        roll = random.random()
+        if roll < settings.throttle_rate:
+            with self.server.stats_lock:
+                self.server.stats['throttled'] += 1
+            return 429
+        latency = max(0.0, random.gauss(settings.latency_ms, settings.latency_jitter_ms)) / 1000
+        time.sleep(latency)
+        if roll < settings.throttle_rate + settings.error_rate:
+            with self.server.stats_lock:
+                self.server.stats['errors'] += 1
+            return 500
+        return None
+
+    def _send_error_status(self, status):
+        headers = {'Retry-After': str(self.server.settings.retry_after)} if status == 429 else None
+        self._send_json(status, {'error': 'throttled' if status == 429 else 'simulated failure'}, headers)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.server.stats_lock:
+                self._send_json(200, dict(self.server.stats))
+            return
+        self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0]
+        body = self._read_json()
+        if path == '/chat':
+            status = self._simulate()
+            if status:
+                return self._send_error_status(status)
+            prompt = body.get('user_prompt') or '{}'
+            try:
+                cv_text = json.loads(prompt).get('Page_1', '')
+            except ValueError:
+                cv_text = prompt
+            return self._send_json(200, fastagent_response(cv_text))
+        if COMPLETIONS_PATH.match(path):
+            status = self._simulate()
+            if status:
+                return self._send_error_status(status)
+            if body.get('stream'):
+                return self._stream_completion(body)
+            prompt_tokens = sum(len((m.get('content') or '').split()) for m in body.get('messages', []))
+            return self._send_json(200, {
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': SUMMARY_TEXT}}],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': len(SUMMARY_TEXT.split()),
+                    'total_tokens': prompt_tokens + len(SUMMARY_TEXT.split()),
+                },
+            })
+        self._send_json(404, {'error': 'not found'})
+
+    def do_PUT(self):
+        path = self.path.split('?', 1)[0]
+        self._read_json()
+        if FEEDBACK_PATH.match(path):
+            status = self._simulate()
+            if status:
+                return self._send_error_status(status)
+            return self._send_json(200, {'status': 'ok'})
+        self._send_json(404, {'error': 'not found'})
+
+    def _stream_completion(self, body):
+        """Send the completion as server-sent events, one word per chunk."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        delay = self.server.settings.stream_chunk_ms / 1000
+        for word in SUMMARY_TEXT.split(' '):
+            chunk = {'choices': [{'index': 0, 'delta': {'content': word + ' '}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            if delay:
+                time.sleep(delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def make_server(host, port, settings):
+    """Create (but do not start) a mock upstream server."""
+    server = ThreadingHTTPServer((host, port), MockUpstreamHandler)
+    server.daemon_threads = True
+    server.settings = settings
+    server.stats = {'requests': 0, 'errors': 0, 'throttled': 0}
+    server.stats_lock = threading.Lock()
+    return server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serve a local FastAgent / Azure OpenAI stand-in.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900, help="port to bind (0 = any free port)")
+    parser.add_argument('--latency-ms', type=float, default=200, help="mean response latency (default: 200)")
+    parser.add_argument('--latency-jitter-ms', type=float, default=50, help="standard deviation of the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of calls answered with 500")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--stream-chunk-ms', type=float, default=5, help="delay between streamed chunks")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    server = make_server(args.host, args.port, args)
+    print(json.dumps({'host': args.host, 'port': server.server_address[1]}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
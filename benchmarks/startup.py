@@ -0,0 +1,135 @@
+"""
+Startup-time benchmark for the CV Analysis Tool.
+
+Measures, in fresh interpreters:
+
+- the ``-X importtime`` breakdown of ``create_app()``, reduced to the modules
+  with the largest cumulative import time;
+- time to first request: interpreter start to the first ``GET /`` answered
+  by the test client, split into import, create_app and request.
+
+Run from the repository root:
+
+    python benchmarks/startup.py --runs 5 --max-first-request-ms 1500
+
+Results are printed as JSON. With --max-first-request-ms the script exits
+non-zero when the median time to first request exceeds the limit, so it can
+gate CI against startup regressions.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter; prints its own timings as JSON
+FIRST_REQUEST_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+response = app.test_client().get('/')
+t3 = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000,
+}))
+"""
+
+IMPORTTIME_SCRIPT = "from app import create_app; create_app()"
+
+
+def _child_env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    # Never start background work from a benchmark process
+    env['EMBEDDED_WORKER'] = 'False'
+    return env
+
+
+def measure_first_request():
+    """Time one cold start, from process launch to the first response."""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-c', FIRST_REQUEST_SCRIPT],
+        cwd=ROOT, env=_child_env(), capture_output=True, text=True, check=True
+    )
+    total_ms = (time.perf_counter() - started) * 1000
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings['total_ms'] = total_ms
+    return timings
+
+
+def measure_importtime(top):
+    """Return the modules with the largest cumulative import time, in ms."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORTTIME_SCRIPT],
+        cwd=ROOT, env=_child_env(), capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in completed.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip())) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    total_ms = sum(m['cumulative_ms'] for m in modules if m['depth'] == 0)
+    modules.sort(key=lambda m: m['cumulative_ms'], reverse=True)
+    return {'total_ms': total_ms, 'top': modules[:top]}
+
+
+def _summarize(values):
+    values = sorted(values)
+    return {
+        'median': statistics.median(values),
+        'min': values[0],
+        'max': values[-1],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import time and time to first request.")
+    parser.add_argument('--runs', type=int, default=5, help="cold starts to measure (default: 5)")
+    parser.add_argument('--top', type=int, default=15, help="modules to list from -X importtime (default: 15)")
+    parser.add_argument('--max-first-request-ms', type=float, default=None,
+                        help="fail if the median total time to first request exceeds this")
+    args = parser.parse_args(argv)
+
+    # Warm the filesystem cache and bytecode once so runs are comparable
+    measure_first_request()
+    runs = [measure_first_request() for _ in range(args.runs)]
+
+    report = {
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+        'first_request': {
+            key: _summarize([run[key] for run in runs])
+            for key in ('total_ms', 'import_ms', 'create_app_ms', 'first_request_ms')
+        },
+        'importtime': measure_importtime(args.top),
+    }
+    print(json.dumps(report, indent=2))
+
+    limit = args.max_first_request_ms
+    if limit is not None and report['first_request']['total_ms']['median'] > limit:
+        print(f"Median time to first request exceeds {limit} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())